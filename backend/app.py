@@ -21,11 +21,15 @@ from routes.health_routes import health_bp
 from routes.server_time_routes import server_time_routes
 from routes.admin_routes import admin_bp
 from routes.public_routes import public_bp
+from routes.bootstrap_routes import bootstrap_bp
+from routes.batch_routes import batch_bp
 
 # Import services
 from services.supabase_service import SupabaseService
 from services.payment_service import PaymentService
 from services.auth_service import AuthService
+from services.plan_catalog import PlanCatalog
+from services.revenue_metrics import RevenueAggregator
 
 # Import database
 from database import DatabaseConnectionPool
@@ -72,6 +76,10 @@ def initialize_services():
         
         if supabase_url and supabase_key:
             app.supabase_service = SupabaseService(supabase_url, supabase_key)
+            # Resume image uploads left behind by a restarted worker, and expire stuck ones
+            app.supabase_service.image_uploads.start_sweeper()
+            # Flush active-user sketches even when no further activity arrives
+            app.supabase_service.activity_sketches.start_flusher()
             logger.info("Supabase service initialized successfully")
         else:
             logger.warning("SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY not found - Supabase service will be disabled")
@@ -80,13 +88,29 @@ def initialize_services():
         logger.error(f"Failed to initialize Supabase service: {e}")
         app.supabase_service = None
 
+    # Load the subscription plan catalog
+    try:
+        if app.supabase_service:
+            app.plan_catalog = PlanCatalog(app.supabase_service.supabase,
+                                           generations=app.supabase_service.cache_generations)
+            app.plan_catalog.load()
+            logger.info("Plan catalog loaded successfully")
+        else:
+            app.plan_catalog = None
+    except Exception as e:
+        logger.error(f"Failed to load plan catalog: {e}")
+        app.plan_catalog = None
+
+    # Revenue aggregator keeps closed days cached for the admin dashboard
+    app.revenue_aggregator = RevenueAggregator(app.supabase_service.supabase) if app.supabase_service else None
+
     # Initialize payment service
     try:
         paystack_secret_key = os.environ.get('PAYSTACK_SECRET_KEY')
         
         if paystack_secret_key and app.supabase_service:
             logger.info("Initializing Paystack payment service...")
-            app.payment_service = PaymentService(app.supabase_service.supabase)
+            app.payment_service = PaymentService(app.supabase_service.supabase, app.plan_catalog)
             logger.info("Payment service initialized successfully")
         else:
             logger.warning("PAYSTACK_SECRET_KEY not found or Supabase service not available - payment features will be disabled")
@@ -119,6 +143,8 @@ app.register_blueprint(ai_session_bp, url_prefix='/api')
 app.register_blueprint(session_bp, url_prefix='/api')
 app.register_blueprint(settings_bp, url_prefix='/api')
 app.register_blueprint(server_time_routes, url_prefix='/api')
+app.register_blueprint(bootstrap_bp, url_prefix='/api')
+app.register_blueprint(batch_bp, url_prefix='/api')
 app.register_blueprint(health_bp)  # Health routes don't need API prefix
 app.register_blueprint(admin_bp, url_prefix='/api/admin')  # Admin routes
 app.register_blueprint(public_bp, url_prefix='/api/public')  # Public routes
@@ -164,6 +190,8 @@ def ensure_services():
             
             if supabase_url and supabase_key:
                 app.supabase_service = SupabaseService(supabase_url, supabase_key)
+                app.supabase_service.image_uploads.start_sweeper()
+                app.supabase_service.activity_sketches.start_flusher()
                 logger.info("Supabase service initialized in request context")
             else:
                 logger.warning("Missing Supabase environment variables in request context")
@@ -14,13 +14,75 @@ PAID_PLANS = {
     'monthly': 30
 }
 
-# Feature limits for free tier
-FREE_FEATURE_LIMITS = {
-    'food_detection': 3,  # per week
-    'meal_planning': 0,   # not available in free tier
-    'recipe_generation': 5  # per week
+# How long the in-memory plan catalog is trusted before it re-reads subscription_plans
+PLAN_CATALOG_TTL_SECONDS = int(os.getenv('PLAN_CATALOG_TTL_SECONDS', '300'))
+
+# Plans served when the subscription_plans table is unavailable.
+# -1 means unlimited.
+_UNLIMITED_LIMITS = {
+    'food_detection': -1,
+    'meal_planning': -1,
+    'ai_kitchen': -1
+}
+
+_PAID_FEATURES = {
+    'food_detection': True,
+    'meal_planning': True,
+    'ai_kitchen': True,
+    'priority_support': True
 }
 
+DEFAULT_PLANS = [
+    {
+        'id': 'free',
+        'name': 'free',
+        'display_name': 'Free Plan',
+        'price_monthly': 0.00,
+        'price_yearly': 0.00,
+        'features': {
+            'food_detection': True,
+            'ai_kitchen': True,
+            'basic_support': True
+        },
+        'limits': {
+            'food_detection': 5,
+            'meal_planning': 3,
+            'ai_kitchen': 5
+        }
+    },
+    {
+        'id': 'weekly',
+        'name': 'weekly',
+        'display_name': 'Weekly Plan',
+        'price_monthly': 2.50,
+        'price_yearly': 0.00,
+        'features': dict(_PAID_FEATURES),
+        'limits': dict(_UNLIMITED_LIMITS)
+    },
+    {
+        'id': 'two_weeks',
+        'name': 'two_weeks',
+        'display_name': 'Two Weeks Plan',
+        'price_monthly': 5.00,
+        'price_yearly': 0.00,
+        'features': dict(_PAID_FEATURES),
+        'limits': dict(_UNLIMITED_LIMITS)
+    },
+    {
+        'id': 'monthly',
+        'name': 'monthly',
+        'display_name': 'Monthly Plan',
+        'price_monthly': 10.00,
+        'price_yearly': 0.00,
+        'features': dict(_PAID_FEATURES),
+        'limits': dict(_UNLIMITED_LIMITS)
+    }
+]
+
+# Feature limits for free tier, per FREE_RESET_PERIOD. Derived from the default
+# free plan so there is one source of truth; the catalog serves the live values.
+FREE_FEATURE_LIMITS = dict(DEFAULT_PLANS[0]['limits'])
+
 # Feature access for paid tiers
 PAID_FEATURE_ACCESS = {
     'food_detection': True,
@@ -57,7 +119,7 @@ def get_paid_plan_duration(plan_name: str) -> int:
 
 def is_feature_allowed_for_free_tier(feature_name: str) -> bool:
     """Check if a feature is allowed for free tier users."""
-    return feature_name in FREE_FEATURE_LIMITS
+    return FREE_FEATURE_LIMITS.get(feature_name, 0) != 0
 
 def is_feature_allowed_for_paid_tier(feature_name: str) -> bool:
     """Check if a feature is allowed for paid tier users."""
@@ -1,13 +1,46 @@
-from flask import Blueprint, request, jsonify, current_app
-from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context, send_file, g
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any, List
-import csv
-import io
+import os
+import uuid
+from functools import wraps
 from services.auth_service import AuthService
+from services.cache_generations import CACHE_GENERATION_SYNC_SECONDS, CacheGenerations
 from supabase import Client
+from utils.concurrency import fan_out
+from utils.swr_cache import StaleWhileRevalidateCache
+from werkzeug.test import EnvironBuilder
+from services.usage_rollups import UsageRollupService
+from services.revenue_metrics import RevenueAggregator
+from services.export_service import ExportService, EXPORT_DATASETS, EXPORT_WATERMARK_LAG_SECONDS, parquet_available
 
 admin_bp = Blueprint('admin', __name__)
 
+# Shared deadline for the independent queries an admin handler runs together
+ADMIN_QUERY_TIMEOUT_SECONDS = float(os.environ.get('ADMIN_QUERY_TIMEOUT_SECONDS', '10'))
+
+# Dashboard responses are served from cache while fresh, then served stale
+# while a background refresh runs, and recomputed once fully expired
+ADMIN_CACHE_FRESH_SECONDS = float(os.environ.get('ADMIN_CACHE_FRESH_SECONDS', '30'))
+ADMIN_CACHE_STALE_SECONDS = float(os.environ.get('ADMIN_CACHE_STALE_SECONDS', '300'))
+ADMIN_CACHE_MAX_ENTRIES = int(os.environ.get('ADMIN_CACHE_MAX_ENTRIES', '500'))
+
+# Each gunicorn worker has its own cache, so purges are published as shared
+# generations (services/cache_generations.py) that every worker checks
+ADMIN_CACHE_PURGE_ALL = '*'
+ADMIN_CACHE_REVENUE_TOTALS = 'revenue_totals'
+
+# Bulk subscription operations
+BULK_MAX_IDS = int(os.environ.get('ADMIN_BULK_MAX_IDS', '500'))
+BULK_CHUNK_SIZE = 100
+BULK_OPERATIONS = ('cancel', 'update', 'extend')
+
+admin_response_cache = StaleWhileRevalidateCache(
+    fresh_seconds=ADMIN_CACHE_FRESH_SECONDS,
+    stale_seconds=ADMIN_CACHE_STALE_SECONDS,
+    max_entries=ADMIN_CACHE_MAX_ENTRIES
+)
+
 
 def get_auth_service() -> Optional[AuthService]:
     """Helper function to get the AuthService from the app context."""
@@ -29,8 +62,21 @@ def get_supabase_client() -> Optional[Client]:
         return None
 
 
+def get_revenue_aggregator(supabase: Client) -> RevenueAggregator:
+    """Get the app-wide revenue aggregator, creating it if startup skipped it."""
+    aggregator = getattr(current_app, 'revenue_aggregator', None)
+    if aggregator is None:
+        aggregator = RevenueAggregator(supabase)
+        current_app.revenue_aggregator = aggregator
+    return aggregator
+
+
 def verify_admin_access():
     """Verify that the current user has admin privileges."""
+    # Already verified for this request (see swr_cached)
+    if g.get('admin_user_id'):
+        return g.admin_user_id, None
+    
     try:
         auth_service = get_auth_service()
         if not auth_service:
@@ -78,6 +124,149 @@ def verify_admin_access():
         return None, f"Admin verification error: {str(e)}"
 
 
+def swr_cached(view):
+    """
+    Serve an admin GET endpoint from admin_response_cache, keyed by its query parameters.
+
+    Admin access is always checked before the cache is consulted. Only 200
+    responses are cached; stale entries are refreshed in the background by
+    re-running the view with the same query string.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        admin_user_id, error = verify_admin_access()
+        if error:
+            # Let the view build its usual error response
+            return view(*args, **kwargs)
+        g.admin_user_id = admin_user_id
+        
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        app = current_app._get_current_object()
+        environ = EnvironBuilder(path=request.path, query_string=request.query_string.decode('latin-1')).get_environ()
+        
+        def compute():
+            response = current_app.make_response(view(*args, **kwargs))
+            return (response.get_data(), response.mimetype, response.status_code), response.status_code == 200
+        
+        def refresh():
+            with app.request_context(environ):
+                g.admin_user_id = admin_user_id
+                return compute()
+        
+        sync_admin_cache()
+        (body, mimetype, status_code), state, age = admin_response_cache.get(key, compute, refresh)
+        response = Response(body, status=status_code, mimetype=mimetype)
+        response.headers['X-Cache'] = state
+        response.headers['Age'] = str(int(age))
+        return response
+    return wrapper
+
+
+def _apply_purge(name: str, app=None) -> int:
+    """Purge one path, every cached response ('*') or the revenue totals in this worker."""
+    if name == ADMIN_CACHE_REVENUE_TOTALS:
+        aggregator = getattr(app or current_app, 'revenue_aggregator', None)
+        if aggregator:
+            aggregator.invalidate()
+        return 0
+    if name == ADMIN_CACHE_PURGE_ALL:
+        return admin_response_cache.purge()
+    return admin_response_cache.purge(lambda key: key[0] == name)
+
+
+def _is_admin_cache_name(name: str) -> bool:
+    return name in (ADMIN_CACHE_PURGE_ALL, ADMIN_CACHE_REVENUE_TOTALS) or name.startswith('/')
+
+
+def get_cache_generations() -> Optional[CacheGenerations]:
+    """
+    Get the shared cache generations, listening for admin cache purges made by
+    other workers. None if the Supabase service isn't available.
+    """
+    generations = getattr(getattr(current_app, 'supabase_service', None), 'cache_generations', None)
+    if generations is not None:
+        app = current_app._get_current_object()
+        generations.listen('admin_cache', _is_admin_cache_name, lambda name: _apply_purge(name, app))
+    return generations
+
+
+def sync_admin_cache() -> bool:
+    """
+    Apply purges published by other workers since the last check.
+
+    Returns False if the shared generations are unavailable, in which case
+    purges only reach the worker that handled them.
+    """
+    generations = get_cache_generations()
+    return generations.sync() if generations else False
+
+
+def publish_admin_cache_purge(*names: str) -> bool:
+    """Bump the shared generation of each name so other workers purge it too. Returns False if that failed."""
+    generations = get_cache_generations()
+    if not generations:
+        return False
+    return all([generations.publish(name) for name in names])
+
+
+def invalidate_admin_cache(*paths: str) -> tuple[int, bool]:
+    """
+    Drop cached admin responses for the given paths, or all of them if none are given.
+
+    Returns:
+        tuple: (responses purged in this worker, whether other workers will purge too).
+    """
+    names = paths or (ADMIN_CACHE_PURGE_ALL,)
+    shared = publish_admin_cache_purge(*names)
+    purged = sum(_apply_purge(name) for name in names)
+    return purged, shared
+
+
+def add_active_user_sketches(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Replace the active-user figures in a usage metrics payload with HyperLogLog
+    estimates and add DAU/WAU/MAU with their trends.
+
+    Leaves the payload untouched if the activity sketches aren't set up.
+    """
+    supabase_service = getattr(current_app, 'supabase_service', None)
+    sketch_store = getattr(supabase_service, 'activity_sketches', None)
+    if not sketch_store:
+        return metrics
+    
+    active, error = sketch_store.get_active_user_metrics()
+    if error:
+        current_app.logger.warning(error)
+        return metrics
+    
+    metrics['active_users_today'] = active['dau']
+    metrics['active_users_week'] = active['wau']
+    daily_users = {entry['date']: entry['users'] for entry in active['daily_active_users']}
+    for entry in metrics.get('daily_usage', []):
+        entry['users'] = daily_users.get(entry['date'], entry['users'])
+    metrics['active_users'] = active
+    return metrics
+
+
+def run_admin_queries(queries: Dict[str, Any]) -> tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Execute independent Supabase queries concurrently under one shared deadline.
+
+    Args:
+        queries: Mapping of name to an unexecuted query builder.
+
+    Returns:
+        tuple: (responses, errors) keyed by query name.
+    """
+    responses, errors = fan_out(
+        {name: query.execute for name, query in queries.items()},
+        timeout=ADMIN_QUERY_TIMEOUT_SECONDS
+    )
+    for name, error in errors.items():
+        current_app.logger.warning(f"Admin query {name} failed: {error}")
+    return responses, errors
+
+
 @admin_bp.route('/test', methods=['GET'])
 def test_admin():
     """Test route to check if admin routes are working."""
@@ -110,7 +299,100 @@ def check_config():
     })
 
 
+def format_admin_user(user: Dict[str, Any], subscription: Dict[str, Any], plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a profile and its subscription into an /api/admin/users entry."""
+    # Handle potential missing fields gracefully
+    created_at = user.get('created_at') or user.get('createdAt') or datetime.utcnow().isoformat()
+    
+    return {
+        'id': user['id'],
+        'email': user.get('email', ''),
+        'first_name': user.get('first_name', ''),
+        'last_name': user.get('last_name', ''),
+        'role': user.get('role', 'user'),
+        'created_at': created_at,
+        'subscription_tier': plan.get('name') or 'free',
+        'subscription_status': subscription.get('status') or 'none',
+        'subscription_start': subscription.get('current_period_start'),
+        'subscription_end': subscription.get('current_period_end'),
+        'is_active': subscription.get('status') == 'active' and 
+                    subscription.get('current_period_end') and
+                    subscription.get('current_period_end') > datetime.utcnow().isoformat()
+    }
+
+
+def search_admin_users(supabase: Client, search: str, limit: int, offset: int) -> tuple[List[Dict[str, Any]], int]:
+    """
+    Get one page of users matching search, plus the total number of matches.
+    
+    Uses the admin_search_users RPC (scripts/create_admin_user_search.sql), which
+    returns the page, total and subscriptions in one trigram-indexed query. Falls
+    back to separate profile, count and subscription queries if it isn't installed.
+    """
+    try:
+        result = supabase.rpc('admin_search_users', {
+            'p_search': search or None,
+            'p_limit': limit,
+            'p_offset': offset
+        }).execute().data or {}
+        users = []
+        for row in result.get('users') or []:
+            subscription = {
+                'status': row.get('subscription_status'),
+                'current_period_start': row.get('current_period_start'),
+                'current_period_end': row.get('current_period_end')
+            }
+            users.append(format_admin_user(row, subscription, {'name': row.get('plan_name')}))
+        return users, result.get('total') or 0
+    except Exception as e:
+        current_app.logger.warning(f"admin_search_users RPC unavailable, using separate queries: {str(e)}")
+    
+    search_filter = f'email.ilike.%{search}%,first_name.ilike.%{search}%,last_name.ilike.%{search}%'
+    
+    # Build the query - get all profiles first, then get subscriptions separately
+    query = supabase.table('profiles').select('*')
+    if search:
+        query = query.or_(search_filter)
+    users = query.range(offset, offset + limit - 1).order('created_at', desc=True).execute().data or []
+    
+    # Get total count for pagination
+    try:
+        count_query = supabase.table('profiles').select('id', count='exact')
+        if search:
+            count_query = count_query.or_(search_filter)
+        total_count = count_query.execute().count or 0
+    except Exception as e:
+        current_app.logger.warning(f"Error getting user count: {str(e)}")
+        total_count = len(users)  # Fallback to current page count
+    
+    # Get subscriptions for all users
+    subscriptions_lookup = {}
+    user_ids = [user['id'] for user in users]
+    if user_ids:
+        try:
+            subscriptions_response = supabase.table('user_subscriptions').select('*, subscription_plans(*)').in_('user_id', user_ids).execute()
+            for sub in subscriptions_response.data or []:
+                subscriptions_lookup[sub['user_id']] = sub
+        except Exception as e:
+            current_app.logger.warning(f"Exception fetching subscriptions: {str(e)}")
+    
+    # Format user data
+    formatted_users = []
+    for user in users:
+        try:
+            subscription = subscriptions_lookup.get(user['id']) or {}
+            plan = subscription.get('subscription_plans') or {}
+            formatted_users.append(format_admin_user(user, subscription, plan))
+        except Exception as e:
+            current_app.logger.error(f"Error formatting user {user.get('id', 'unknown')}: {str(e)}")
+            # Skip this user and continue with others
+            continue
+    
+    return formatted_users, total_count
+
+
 @admin_bp.route('/users', methods=['GET'])
+@swr_cached
 def get_all_users():
     """Get all users with their subscription and profile information."""
     try:
@@ -142,89 +424,12 @@ def get_all_users():
         # Calculate offset
         offset = (page - 1) * limit
         
-        # Build the query - get all profiles first, then get subscriptions separately
-        query = supabase.table('profiles').select('*')
-        
-        # Apply search filter
-        if search:
-            query = query.or_(f'email.ilike.%{search}%,first_name.ilike.%{search}%,last_name.ilike.%{search}%')
-        
-        # Execute query with pagination
         try:
-            response = query.range(offset, offset + limit - 1).order('created_at', desc=True).execute()
-            
-            if response.error:
-                current_app.logger.error(f"Database error: {response.error}")
-                return jsonify({'status': 'error', 'message': 'Database query failed'}), 500
-            
-            users = response.data or []
+            formatted_users, total_count = search_admin_users(supabase, search, limit, offset)
         except Exception as e:
             current_app.logger.error(f"Exception executing user query: {str(e)}")
             return jsonify({'status': 'error', 'message': 'Database query failed'}), 500
         
-        # Get total count for pagination
-        try:
-            count_query = supabase.table('profiles').select('id', count='exact')
-            if search:
-                count_query = count_query.or_(f'email.ilike.%{search}%,first_name.ilike.%{search}%,last_name.ilike.%{search}%')
-            
-            count_response = count_query.execute()
-            total_count = count_response.count if count_response.count else 0
-        except Exception as e:
-            current_app.logger.warning(f"Error getting user count: {str(e)}")
-            total_count = len(users)  # Fallback to current page count
-        
-        # Get subscriptions for all users
-        user_ids = [user['id'] for user in users]
-        subscriptions_data = []
-        
-        if user_ids:
-            try:
-                subscriptions_response = supabase.table('user_subscriptions').select('*, subscription_plans(*)').in_('user_id', user_ids).execute()
-                if not subscriptions_response.error:
-                    subscriptions_data = subscriptions_response.data
-                else:
-                    current_app.logger.warning(f"Error fetching subscriptions: {subscriptions_response.error}")
-            except Exception as e:
-                current_app.logger.warning(f"Exception fetching subscriptions: {str(e)}")
-                subscriptions_data = []
-        
-        # Create subscription lookup
-        subscriptions_lookup = {}
-        for sub in subscriptions_data:
-            subscriptions_lookup[sub['user_id']] = sub
-        
-        # Format user data
-        formatted_users = []
-        for user in users:
-            try:
-                subscription = subscriptions_lookup.get(user['id'], {})
-                plan = subscription.get('subscription_plans', {}) if subscription else {}
-                
-                # Handle potential missing fields gracefully
-                created_at = user.get('created_at') or user.get('createdAt') or datetime.utcnow().isoformat()
-                
-                formatted_user = {
-                    'id': user['id'],
-                    'email': user.get('email', ''),
-                    'first_name': user.get('first_name', ''),
-                    'last_name': user.get('last_name', ''),
-                    'role': user.get('role', 'user'),
-                    'created_at': created_at,
-                    'subscription_tier': plan.get('name', 'free'),
-                    'subscription_status': subscription.get('status', 'none'),
-                    'subscription_start': subscription.get('current_period_start'),
-                    'subscription_end': subscription.get('current_period_end'),
-                    'is_active': subscription.get('status') == 'active' and 
-                                subscription.get('current_period_end') and
-                                subscription.get('current_period_end') > datetime.utcnow().isoformat()
-                }
-                formatted_users.append(formatted_user)
-            except Exception as e:
-                current_app.logger.error(f"Error formatting user {user.get('id', 'unknown')}: {str(e)}")
-                # Skip this user and continue with others
-                continue
-        
         return jsonify({
             'status': 'success',
             'data': {
@@ -244,6 +449,7 @@ def get_all_users():
 
 
 @admin_bp.route('/subscriptions/summary', methods=['GET'])
+@swr_cached
 def get_subscription_summary():
     """Get subscription summary statistics."""
     try:
@@ -268,35 +474,39 @@ def get_subscription_summary():
         # Get subscription statistics
         now = datetime.utcnow().isoformat()
         
-        # Try to get subscription data, handle missing tables gracefully
-        try:
-            # Active subscriptions
-            active_response = supabase.table('user_subscriptions').select('*').eq('status', 'active').execute()
-            active_subscriptions = active_response.data if not active_response.error else []
-        except Exception as e:
-            current_app.logger.warning(f"user_subscriptions table not found or error: {e}")
-            active_subscriptions = []
+        # Revenue comes from the daily rollups; only scan raw payments if they aren't set up
+        revenue, revenue_error = get_revenue_aggregator(supabase).get_revenue_summary()
         
-        try:
-            # Get payment transactions for revenue calculation
-            payment_response = supabase.table('payment_transactions').select('*').eq('status', 'success').execute()
-            payments = payment_response.data if not payment_response.error else []
-        except Exception as e:
-            current_app.logger.warning(f"payment_transactions table not found or error: {e}")
-            payments = []
+        # Run the independent queries together; missing tables just come back empty
+        queries = {
+            'active_subscriptions': supabase.table('user_subscriptions').select('*').eq('status', 'active'),
+            'users': supabase.table('profiles').select('id', count='exact')
+        }
+        if revenue is None:
+            current_app.logger.warning(f"{revenue_error}; summing raw payment transactions")
+            queries['payments'] = supabase.table('payment_transactions').select('amount, currency, created_at').eq('status', 'success')
+        responses, _ = run_admin_queries(queries)
         
-        # Calculate revenue from payments
-        total_revenue = sum(float(payment.get('amount', 0)) for payment in payments)
-        monthly_revenue = sum(float(payment.get('amount', 0)) for payment in payments 
-                           if payment.get('created_at', '').startswith(now[:7]))  # Current month
+        active_response = responses.get('active_subscriptions')
+        active_subscriptions = (active_response.data or []) if active_response else []
+        
+        if revenue is None:
+            payment_response = responses.get('payments')
+            payments = (payment_response.data or []) if payment_response else []
+            
+            # Calculate revenue from payments
+            revenue = {'total_revenue': 0.0, 'monthly_revenue': 0.0, 'revenue_by_currency': {}}
+            for payment in payments:
+                amount = float(payment.get('amount') or 0)
+                currency = payment.get('currency') or 'USD'
+                revenue['total_revenue'] += amount
+                revenue['revenue_by_currency'][currency] = revenue['revenue_by_currency'].get(currency, 0.0) + amount
+                if (payment.get('created_at') or '').startswith(now[:7]):  # Current month
+                    revenue['monthly_revenue'] += amount
         
         # Get total users
-        try:
-            users_response = supabase.table('profiles').select('id', count='exact').execute()
-            total_users = users_response.count if users_response.count else 0
-        except Exception as e:
-            current_app.logger.warning(f"Error getting user count: {e}")
-            total_users = 0
+        users_response = responses.get('users')
+        total_users = users_response.count if users_response and users_response.count else 0
         
         # Calculate trial users (users without active subscriptions)
         trial_users = max(0, total_users - len(active_subscriptions))
@@ -305,8 +515,9 @@ def get_subscription_summary():
             'total_active': len(active_subscriptions),
             'total_trials': trial_users,
             'total_cancelled': 0,  # Placeholder
-            'total_revenue': total_revenue,
-            'monthly_revenue': monthly_revenue,
+            'total_revenue': revenue['total_revenue'],
+            'monthly_revenue': revenue['monthly_revenue'],
+            'revenue_by_currency': revenue['revenue_by_currency'],
             'subscriptions': []  # Will be populated if needed
         }
         
@@ -322,7 +533,7 @@ def get_subscription_summary():
 
 @admin_bp.route('/subscriptions/export', methods=['GET'])
 def export_subscriptions():
-    """Export subscription data to CSV."""
+    """Export subscription data to CSV, streamed page by page."""
     try:
         # Verify admin access
         user_id, error = verify_admin_access()
@@ -333,55 +544,19 @@ def export_subscriptions():
         if not supabase:
             return jsonify({'status': 'error', 'message': 'Database connection failed'}), 500
         
-        # Get all subscriptions with user and plan data
-        response = supabase.table('user_subscriptions').select('''
-            *,
-            profiles(*),
-            subscription_plans(*)
-        ''').execute()
-        
-        if response.error:
-            current_app.logger.error(f"Database error: {response.error}")
-            return jsonify({'status': 'error', 'message': 'Database query failed'}), 500
-        
-        subscriptions = response.data
-        
-        # Create CSV
-        output = io.StringIO()
-        writer = csv.writer(output)
+        # The first page is read here so query errors still get a JSON response
+        chunks = ExportService(supabase).iter_subscription_csv()
+        logger = current_app.logger
         
-        # Write header
-        writer.writerow([
-            'User ID', 'Email', 'First Name', 'Last Name',
-            'Plan Name', 'Status', 'Start Date', 'End Date',
-            'Monthly Price', 'Created At'
-        ])
+        def generate():
+            try:
+                yield from chunks
+            except Exception as e:
+                # Headers are already sent, so all we can do is log and end the stream
+                logger.error(f"Subscription export aborted mid-stream: {str(e)}")
         
-        # Write data
-        for sub in subscriptions:
-            profile = sub.get('profiles', {})
-            plan = sub.get('subscription_plans', {})
-            
-            writer.writerow([
-                sub.get('user_id', ''),
-                profile.get('email', ''),
-                profile.get('first_name', ''),
-                profile.get('last_name', ''),
-                plan.get('name', ''),
-                sub.get('status', ''),
-                sub.get('current_period_start', ''),
-                sub.get('current_period_end', ''),
-                plan.get('price_monthly', 0),
-                sub.get('created_at', '')
-            ])
-        
-        # Prepare response
-        output.seek(0)
-        csv_data = output.getvalue()
-        
-        from flask import Response
         return Response(
-            csv_data,
+            stream_with_context(generate()),
             mimetype='text/csv',
             headers={'Content-Disposition': 'attachment; filename=subscriptions.csv'}
         )
@@ -391,7 +566,96 @@ def export_subscriptions():
         return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
 
 
+@admin_bp.route('/export/<dataset>', methods=['GET'])
+def export_dataset(dataset):
+    """
+    Export users, subscriptions, detections or transactions as NDJSON or Parquet.
+
+    Query params:
+        format: 'ndjson' (default, streamed) or 'parquet' (requires pyarrow)
+        since: ISO timestamp; only rows created at or after it are exported
+
+    The X-Export-Watermark response header holds the upper bound of this
+    export. Pass it back as since= on the next run to fetch only newer rows.
+    The bound trails the clock by EXPORT_WATERMARK_LAG_SECONDS so rows that
+    commit late aren't skipped; the newest rows arrive one export later.
+    """
+    try:
+        # Verify admin access
+        user_id, error = verify_admin_access()
+        if error:
+            return jsonify({'status': 'error', 'message': error}), 403
+        
+        if dataset not in EXPORT_DATASETS:
+            return jsonify({
+                'status': 'error',
+                'message': f"Unknown dataset. Choose one of: {', '.join(EXPORT_DATASETS)}"
+            }), 404
+        
+        export_format = request.args.get('format', 'ndjson').lower()
+        if export_format not in ('ndjson', 'parquet'):
+            return jsonify({'status': 'error', 'message': 'format must be ndjson or parquet'}), 400
+        if export_format == 'parquet' and not parquet_available():
+            return jsonify({'status': 'error', 'message': 'Parquet export requires pyarrow on the server'}), 501
+        
+        since = request.args.get('since')
+        since_at = None
+        if since:
+            try:
+                since_at = datetime.fromisoformat(since.replace('Z', '+00:00'))
+                if since_at.tzinfo is None:
+                    since_at = since_at.replace(tzinfo=timezone.utc)
+                since = since_at.isoformat()
+            except ValueError:
+                return jsonify({'status': 'error', 'message': 'since must be an ISO 8601 timestamp'}), 400
+        
+        supabase = get_supabase_client()
+        if not supabase:
+            return jsonify({'status': 'error', 'message': 'Database connection failed'}), 500
+        
+        # Rows created from here on belong to the next export. Lagging the
+        # bound lets in-flight transactions commit before their rows are due;
+        # a since= already past it gives an empty export that keeps the cursor.
+        watermark_at = datetime.now(timezone.utc) - timedelta(seconds=EXPORT_WATERMARK_LAG_SECONDS)
+        watermark = max(watermark_at, since_at).isoformat() if since_at else watermark_at.isoformat()
+        export_service = ExportService(supabase)
+        filename = f"{dataset}-{watermark[:19].replace(':', '')}"
+        headers = {'X-Export-Watermark': watermark}
+        
+        if export_format == 'parquet':
+            output = export_service.write_parquet(dataset, since, watermark)
+            return send_file(
+                output,
+                mimetype='application/vnd.apache.parquet',
+                as_attachment=True,
+                download_name=f'{filename}.parquet'
+            ), 200, headers
+        
+        # The first page is read here so query errors still get a JSON response
+        chunks = export_service.iter_ndjson(dataset, since, watermark)
+        logger = current_app.logger
+        
+        def generate():
+            try:
+                yield from chunks
+            except Exception as e:
+                # Headers are already sent, so all we can do is log and end the stream
+                logger.error(f"{dataset} export aborted mid-stream: {str(e)}")
+        
+        headers['Content-Disposition'] = f'attachment; filename={filename}.ndjson'
+        return Response(
+            stream_with_context(generate()),
+            mimetype='application/x-ndjson',
+            headers=headers
+        )
+        
+    except Exception as e:
+        current_app.logger.error(f"Error exporting {dataset}: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
+
 @admin_bp.route('/metrics/revenue', methods=['GET'])
+@swr_cached
 def get_revenue_metrics():
     """Get revenue metrics over time."""
     try:
@@ -417,6 +681,12 @@ def get_revenue_metrics():
         period = request.args.get('period', 'monthly')  # daily, weekly, monthly
         days = request.args.get('days', 30, type=int)
         
+        # Prefer the daily rollups; fall back to scanning raw transactions if they aren't set up
+        metrics, rollup_error = get_revenue_aggregator(supabase).get_revenue_metrics(period, days)
+        if metrics is not None:
+            return jsonify({'status': 'success', 'data': metrics})
+        current_app.logger.warning(f"{rollup_error}; computing revenue from raw transactions")
+        
         # Calculate date range
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
@@ -424,7 +694,7 @@ def get_revenue_metrics():
         # Try to get payment transactions, handle missing tables gracefully
         try:
             response = supabase.table('payment_transactions').select('*').gte('created_at', start_date.isoformat()).lte('created_at', end_date.isoformat()).execute()
-            transactions = response.data if not response.error else []
+            transactions = response.data or []
         except Exception as e:
             current_app.logger.warning(f"payment_transactions table not found or error: {e}")
             transactions = []
@@ -474,6 +744,7 @@ def get_revenue_metrics():
 
 
 @admin_bp.route('/metrics/usage', methods=['GET'])
+@swr_cached
 def get_usage_metrics():
     """Get feature usage metrics."""
     try:
@@ -488,31 +759,24 @@ def get_usage_metrics():
         
         # Get time period from query params
         days = request.args.get('days', 30, type=int)
-        start_date = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d')
         
-        # Try to get usage data, handle missing tables gracefully
-        try:
-            response = supabase.table('usage_tracking').select('*').gte('usage_date', start_date).execute()
-            usage_data = response.data if not response.error else []
-        except Exception as e:
-            current_app.logger.warning(f"usage_tracking table not found or error: {e}")
-            usage_data = []
+        # Prefer the daily rollups; fall back to scanning the raw tables if they aren't set up
+        metrics, rollup_error = UsageRollupService(supabase).get_usage_metrics(days)
+        if metrics is not None:
+            return jsonify({'status': 'success', 'data': add_active_user_sketches(metrics)})
+        current_app.logger.warning(f"{rollup_error}; computing usage metrics from raw tables")
         
-        # Try to get detection history for usage metrics
-        try:
-            detection_response = supabase.table('detection_history').select('*').gte('created_at', start_date).execute()
-            detections = detection_response.data if not detection_response.error else []
-        except Exception as e:
-            current_app.logger.warning(f"detection_history table not found or error: {e}")
-            detections = []
+        start_date = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d')
         
-        # Try to get meal plans for usage metrics
-        try:
-            meal_plans_response = supabase.table('meal_plans').select('*').gte('created_at', start_date).execute()
-            meal_plans = meal_plans_response.data if not meal_plans_response.error else []
-        except Exception as e:
-            current_app.logger.warning(f"meal_plans table not found or error: {e}")
-            meal_plans = []
+        # Fetch usage, detections and meal plans together; missing tables come back empty
+        responses, _ = run_admin_queries({
+            'usage_tracking': supabase.table('usage_tracking').select('*').gte('usage_date', start_date),
+            'detection_history': supabase.table('detection_history').select('*').gte('created_at', start_date),
+            'meal_plans': supabase.table('meal_plans').select('*').gte('created_at', start_date)
+        })
+        usage_data = (responses['usage_tracking'].data or []) if 'usage_tracking' in responses else []
+        detections = (responses['detection_history'].data or []) if 'detection_history' in responses else []
+        meal_plans = (responses['meal_plans'].data or []) if 'meal_plans' in responses else []
         
         # Calculate feature usage from available data
         feature_usage = {
@@ -560,7 +824,7 @@ def get_usage_metrics():
         
         return jsonify({
             'status': 'success',
-            'data': {
+            'data': add_active_user_sketches({
                 'total_detections': len(detections),
                 'total_meal_plans': len(meal_plans),
                 'active_users_today': len([u for u in unique_users if any(
@@ -570,7 +834,7 @@ def get_usage_metrics():
                 'active_users_week': len(unique_users),
                 'feature_usage': feature_usage,
                 'daily_usage': daily_usage
-            }
+            })
         })
         
     except Exception as e:
@@ -578,9 +842,112 @@ def get_usage_metrics():
         return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
 
 
+# Slim projections for the details dialog; full rows load on drill-down
+USER_RECORD_TYPES = {
+    'detections': {
+        'table': 'detection_history',
+        'summary_columns': 'id, analysis_id, recipe_type, detected_foods, created_at',
+        'order_column': 'created_at',
+        'order_type': 'timestamp',
+        'id_type': uuid.UUID
+    },
+    'meal_plans': {
+        'table': 'meal_plans',
+        'summary_columns': 'id, name, start_date, end_date, created_at',
+        'order_column': 'created_at',
+        'order_type': 'timestamp',
+        'id_type': uuid.UUID
+    },
+    'usage': {
+        'table': 'usage_tracking',
+        'summary_columns': 'feature_name, usage_date, usage_count',
+        'order_column': 'usage_date',
+        'order_type': 'date',
+        'id_type': uuid.UUID
+    }
+}
+USER_DETAILS_RECENT_LIMIT = 20
+
+
+def parse_record_cursor(spec: Dict[str, Any], before: Optional[str],
+                        before_id: Optional[str]) -> tuple[Optional[str], Optional[str]]:
+    """
+    Normalise a user records cursor to the types of its order column and key.
+
+    The values end up inside a PostgREST filter string, so anything that does
+    not parse as an ISO timestamp/date or a key raises ValueError.
+    """
+    if before:
+        if spec['order_type'] == 'date':
+            before = datetime.strptime(before, '%Y-%m-%d').date().isoformat()
+        else:
+            before_at = datetime.fromisoformat(before.replace('Z', '+00:00'))
+            if before_at.tzinfo is None:
+                before_at = before_at.replace(tzinfo=timezone.utc)
+            before = before_at.isoformat()
+    if before_id:
+        before_id = str(spec['id_type'](before_id))
+    return before, before_id
+
+
+def get_user_summary_fallback(supabase: Client, user_id: str) -> tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Build the admin_user_summary payload from separate queries when the RPC isn't installed.
+
+    Each activity query returns its slim page and exact total together. Sections
+    whose query failed are listed in missing_sections rather than shown as empty.
+
+    Returns:
+        tuple: (user_details, error). user_details is None with no error if the
+        user doesn't exist; an error means the profile itself couldn't be read.
+    """
+    queries = {
+        'profile': supabase.table('profiles').select('*').eq('id', user_id),
+        'subscription': supabase.table('user_subscriptions').select('*, subscription_plans(*)').eq('user_id', user_id)
+            .order('created_at', desc=True).limit(1)
+    }
+    for record_type, spec in USER_RECORD_TYPES.items():
+        queries[record_type] = supabase.table(spec['table']).select(spec['summary_columns'], count='exact') \
+            .eq('user_id', user_id).order(spec['order_column'], desc=True).limit(USER_DETAILS_RECENT_LIMIT)
+    responses, errors = run_admin_queries(queries)
+    
+    if 'profile' in errors:
+        return None, f"Could not load user profile: {errors['profile']}"
+    profile_response = responses.get('profile')
+    if not profile_response or not profile_response.data:
+        return None, None
+    subscription_response = responses.get('subscription')
+    
+    recent = {}
+    counts = {}
+    last_activity = {}
+    for record_type, spec in USER_RECORD_TYPES.items():
+        response = responses.get(record_type)
+        rows = (response.data or []) if response else []
+        recent[record_type] = rows
+        if response:
+            counts[record_type] = response.count or 0
+            last_activity[record_type] = rows[0].get(spec['order_column']) if rows else None
+    
+    return {
+        'profile': profile_response.data[0],
+        'subscription': subscription_response.data[0] if subscription_response and subscription_response.data else None,
+        'summary': {'counts': counts, 'last_activity': last_activity},
+        'detection_history': recent['detections'],
+        'meal_plans': recent['meal_plans'],
+        'usage_tracking': recent['usage'],
+        'missing_sections': sorted(errors)
+    }, None
+
+
 @admin_bp.route('/users/<user_id>/details', methods=['GET'])
 def get_user_details(user_id):
-    """Get detailed information about a specific user."""
+    """
+    Get a summary of a specific user: profile, subscription, activity counts,
+    last-activity times and slim recent activity.
+
+    Full records are available from /users/<user_id>/records/<record_type>.
+    """
     try:
         # Verify admin access
         admin_user_id, error = verify_admin_access()
@@ -591,44 +958,93 @@ def get_user_details(user_id):
         if not supabase:
             return jsonify({'status': 'error', 'message': 'Database connection failed'}), 500
         
-        # Get user profile
-        profile_response = supabase.table('profiles').select('*').eq('id', user_id).execute()
-        if profile_response.error or not profile_response.data:
-            return jsonify({'status': 'error', 'message': 'User not found'}), 404
+        # One round trip through the admin_user_summary RPC when it is installed
+        try:
+            user_details = supabase.rpc('admin_user_summary', {
+                'p_user_id': user_id,
+                'p_recent_limit': USER_DETAILS_RECENT_LIMIT
+            }).execute().data
+        except Exception as e:
+            current_app.logger.warning(f"admin_user_summary RPC unavailable, using separate queries: {str(e)}")
+            user_details, summary_error = get_user_summary_fallback(supabase, user_id)
+            if summary_error:
+                current_app.logger.error(summary_error)
+                return jsonify({'status': 'error', 'message': 'Could not load user details, please retry'}), 503
         
-        profile = profile_response.data[0]
+        if not user_details:
+            return jsonify({'status': 'error', 'message': 'User not found'}), 404
+        # The RPC reads everything in one statement, so nothing is ever partially missing
+        user_details.setdefault('missing_sections', [])
         
-        # Get user subscription
-        subscription_response = supabase.table('user_subscriptions').select('*, subscription_plans(*)').eq('user_id', user_id).execute()
-        subscription = subscription_response.data[0] if subscription_response.data else None
+        return jsonify({
+            'status': 'success',
+            'data': user_details
+        })
         
-        # Get detection history
-        detection_response = supabase.table('detection_history').select('*').eq('user_id', user_id).order('created_at', desc=True).limit(50).execute()
-        detection_history = detection_response.data if not detection_response.error else []
+    except Exception as e:
+        current_app.logger.error(f"Error getting user details: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
+
+@admin_bp.route('/users/<user_id>/records/<record_type>', methods=['GET'])
+def get_user_records(user_id, record_type):
+    """
+    Get full detections, meal plans or usage rows for a user, newest first.
+
+    Query params:
+        limit: Page size (max 100, default 20)
+        before, before_id: Cursor from the previous page's next_cursor; records are
+                ordered by (created_at or usage_date, id) so ties are never skipped.
+                Malformed values are rejected with 400
+    """
+    try:
+        # Verify admin access
+        admin_user_id, error = verify_admin_access()
+        if error:
+            return jsonify({'status': 'error', 'message': error}), 403
         
-        # Get meal plans
-        meal_plans_response = supabase.table('meal_plans').select('*').eq('user_id', user_id).order('created_at', desc=True).limit(20).execute()
-        meal_plans = meal_plans_response.data if not meal_plans_response.error else []
+        spec = USER_RECORD_TYPES.get(record_type)
+        if not spec:
+            return jsonify({
+                'status': 'error',
+                'message': f"Unknown record type. Choose one of: {', '.join(USER_RECORD_TYPES)}"
+            }), 404
         
-        # Get usage tracking
-        usage_response = supabase.table('usage_tracking').select('*').eq('user_id', user_id).order('usage_date', desc=True).limit(100).execute()
-        usage_tracking = usage_response.data if not usage_response.error else []
+        supabase = get_supabase_client()
+        if not supabase:
+            return jsonify({'status': 'error', 'message': 'Database connection failed'}), 500
         
-        user_details = {
-            'profile': profile,
-            'subscription': subscription,
-            'detection_history': detection_history,
-            'meal_plans': meal_plans,
-            'usage_tracking': usage_tracking
-        }
+        limit = max(1, min(request.args.get('limit', USER_DETAILS_RECENT_LIMIT, type=int), 100))
+        try:
+            before, before_id = parse_record_cursor(spec, request.args.get('before'), request.args.get('before_id'))
+        except ValueError:
+            return jsonify({
+                'status': 'error',
+                'message': f"before must be an ISO 8601 {spec['order_type']} and before_id a valid id"
+            }), 400
+        column = spec['order_column']
+        
+        query = supabase.table(spec['table']).select('*').eq('user_id', user_id)
+        if before and before_id:
+            query = query.or_(f'{column}.lt."{before}",and({column}.eq."{before}",id.lt."{before_id}")')
+        elif before:
+            query = query.lt(column, before)
+        records = query.order(column, desc=True).order('id', desc=True).limit(limit).execute().data or []
+        
+        next_cursor = None
+        if len(records) == limit:
+            next_cursor = {'before': records[-1].get(column), 'before_id': records[-1].get('id')}
         
         return jsonify({
             'status': 'success',
-            'data': user_details
+            'data': {
+                'records': records,
+                'next_cursor': next_cursor
+            }
         })
         
     except Exception as e:
-        current_app.logger.error(f"Error getting user details: {str(e)}")
+        current_app.logger.error(f"Error getting {record_type} for user {user_id}: {str(e)}")
         return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
 
 
@@ -669,13 +1085,11 @@ def update_subscription(subscription_id):
         
         response = supabase.table('user_subscriptions').update(update_data).eq('id', subscription_id).execute()
         
-        if response.error:
-            current_app.logger.error(f"Database error: {response.error}")
-            return jsonify({'status': 'error', 'message': 'Failed to update subscription'}), 500
-        
         if not response.data:
             return jsonify({'status': 'error', 'message': 'Subscription not found'}), 404
         
+        invalidate_admin_cache()
+        
         return jsonify({
             'status': 'success',
             'message': 'Subscription updated successfully',
@@ -709,13 +1123,11 @@ def cancel_subscription(subscription_id):
         
         response = supabase.table('user_subscriptions').update(update_data).eq('id', subscription_id).execute()
         
-        if response.error:
-            current_app.logger.error(f"Database error: {response.error}")
-            return jsonify({'status': 'error', 'message': 'Failed to cancel subscription'}), 500
-        
         if not response.data:
             return jsonify({'status': 'error', 'message': 'Subscription not found'}), 404
         
+        invalidate_admin_cache()
+        
         return jsonify({
             'status': 'success',
             'message': 'Subscription cancelled successfully',
@@ -724,4 +1136,223 @@ def cancel_subscription(subscription_id):
         
     except Exception as e:
         current_app.logger.error(f"Error cancelling subscription: {str(e)}")
-        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500 
\ No newline at end of file
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500 
+
+
+def is_missing_function_error(error: Exception) -> bool:
+    """Whether a PostgREST error means the called function isn't installed (PGRST202 / 42883)."""
+    code = getattr(error, 'code', None)
+    return code in ('PGRST202', '42883') or 'PGRST202' in str(error) or '42883' in str(error)
+
+
+def extend_subscriptions(supabase: Client, ids: List[str], days: int) -> tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Push each subscription's end date out by days.
+
+    Uses the admin_extend_subscriptions RPC (one statement per chunk); only if the
+    function isn't installed, reads the current end dates in one query and runs the
+    per-row updates concurrently. Any other RPC error is raised: the call may
+    already have committed, and extending again would extend twice.
+
+    Returns:
+        tuple: (updated rows, ids whose individual update failed or timed out).
+    """
+    try:
+        return supabase.rpc('admin_extend_subscriptions', {'p_ids': ids, 'p_days': days}).execute().data or [], []
+    except Exception as e:
+        if not is_missing_function_error(e):
+            raise
+        current_app.logger.warning(f"admin_extend_subscriptions RPC unavailable, updating rows individually: {str(e)}")
+    
+    current = supabase.table('user_subscriptions').select('*').in_('id', ids).execute().data or []
+    now = datetime.now(timezone.utc)
+    updated_at = now.isoformat()
+    queries = {}
+    for sub in current:
+        update_data = {'updated_at': updated_at}
+        for column in ('current_period_end', 'end_date'):
+            if column not in sub:
+                continue
+            base = sub.get(column) or sub.get('end_date') or sub.get('current_period_end')
+            base_date = datetime.fromisoformat(base.replace('Z', '+00:00')) if base else now
+            update_data[column] = (base_date + timedelta(days=days)).isoformat()
+        queries[sub['id']] = supabase.table('user_subscriptions').update(update_data).eq('id', sub['id'])
+    
+    responses, errors = run_admin_queries(queries)
+    rows = [row for response in responses.values() for row in (response.data or [])]
+    return rows, list(errors)
+
+
+@admin_bp.route('/subscriptions/bulk', methods=['POST'])
+def bulk_update_subscriptions():
+    """
+    Apply one operation to many subscriptions (admin only).
+
+    Body: {"ids": [...], "operation": "cancel" | "update" | "extend", "data": {...}}
+        cancel: no data
+        update: {"status": ..., "current_period_end"?: ..., "cancel_at_period_end"?: ...}
+        extend: {"days": N}
+
+    Updates run in chunks of BULK_CHUNK_SIZE ids per query. Every id gets its own
+    result ('updated', 'not_found' or 'failed'), and admin caches are purged once.
+    """
+    try:
+        # Verify admin access
+        user_id, error = verify_admin_access()
+        if error:
+            return jsonify({'status': 'error', 'message': error}), 403
+        
+        supabase = get_supabase_client()
+        if not supabase:
+            return jsonify({'status': 'error', 'message': 'Database connection failed'}), 500
+        
+        body = request.get_json(silent=True) or {}
+        operation = body.get('operation')
+        data = body.get('data') or {}
+        ids = body.get('ids')
+        
+        if operation not in BULK_OPERATIONS:
+            return jsonify({'status': 'error', 'message': f"operation must be one of: {', '.join(BULK_OPERATIONS)}"}), 400
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, str) and i for i in ids):
+            return jsonify({'status': 'error', 'message': 'ids must be a non-empty list of subscription ids'}), 400
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > BULK_MAX_IDS:
+            return jsonify({'status': 'error', 'message': f'At most {BULK_MAX_IDS} ids are allowed per request'}), 400
+        
+        update_data = None
+        if operation == 'cancel':
+            update_data = {'status': 'cancelled', 'cancel_at_period_end': True}
+        elif operation == 'update':
+            if 'status' not in data:
+                return jsonify({'status': 'error', 'message': 'Missing required field: status'}), 400
+            update_data = {'status': data['status']}
+            for field in ('current_period_end', 'cancel_at_period_end'):
+                if field in data:
+                    update_data[field] = data[field]
+        else:
+            days = data.get('days')
+            if not isinstance(days, int) or isinstance(days, bool) or not 0 < days <= 366:
+                return jsonify({'status': 'error', 'message': 'data.days must be an integer between 1 and 366'}), 400
+        
+        results = {}
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            chunk = ids[start:start + BULK_CHUNK_SIZE]
+            failed_ids = []
+            try:
+                if operation == 'extend':
+                    rows, failed_ids = extend_subscriptions(supabase, chunk, days)
+                else:
+                    chunk_update = dict(update_data, updated_at=datetime.utcnow().isoformat())
+                    rows = supabase.table('user_subscriptions').update(chunk_update).in_('id', chunk).execute().data or []
+                updated = {str(row.get('id')): row for row in rows}
+                for subscription_id in chunk:
+                    if subscription_id in updated:
+                        results[subscription_id] = {'id': subscription_id, 'status': 'updated', 'data': updated[subscription_id]}
+                    elif subscription_id in failed_ids:
+                        results[subscription_id] = {'id': subscription_id, 'status': 'failed', 'message': 'Database update failed'}
+                    else:
+                        results[subscription_id] = {'id': subscription_id, 'status': 'not_found'}
+            except Exception as e:
+                current_app.logger.error(f"Bulk {operation} failed for {len(chunk)} subscriptions: {str(e)}")
+                for subscription_id in chunk:
+                    results[subscription_id] = {'id': subscription_id, 'status': 'failed', 'message': 'Database update failed'}
+        
+        counts = {'updated': 0, 'not_found': 0, 'failed': 0}
+        for result in results.values():
+            counts[result['status']] += 1
+        if counts['updated']:
+            invalidate_admin_cache()
+        
+        return jsonify({
+            'status': 'success' if not counts['failed'] else 'partial',
+            'message': f"{operation}: {counts['updated']} updated, {counts['not_found']} not found, {counts['failed']} failed",
+            'data': {
+                'operation': operation,
+                'counts': counts,
+                'results': [results[subscription_id] for subscription_id in ids]
+            }
+        })
+        
+    except Exception as e:
+        current_app.logger.error(f"Error running bulk subscription operation: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
+
+@admin_bp.route('/plans/refresh', methods=['POST'])
+def refresh_plan_catalog():
+    """
+    Reload the in-memory subscription plan catalog after pricing edits (admin only).
+
+    Other workers reload through the shared cache generations; data.scope
+    says whether that reached them.
+    """
+    try:
+        # Verify admin access
+        user_id, error = verify_admin_access()
+        if error:
+            return jsonify({'status': 'error', 'message': error}), 403
+        
+        plan_catalog = getattr(current_app, 'plan_catalog', None)
+        if not plan_catalog:
+            return jsonify({'status': 'error', 'message': 'Plan catalog not available'}), 503
+        
+        shared = plan_catalog.invalidate()
+        plan_catalog.load()
+        
+        if shared:
+            scope, note = 'all_workers', f'other workers reload within {CACHE_GENERATION_SYNC_SECONDS:g}s'
+        else:
+            scope, note = 'worker', f'other workers reload within {plan_catalog.ttl_seconds}s'
+        return jsonify({
+            'status': 'success',
+            'message': f'Plan catalog refreshed in this worker; {note}',
+            'data': {**plan_catalog.get_status(), 'scope': scope}
+        })
+        
+    except Exception as e:
+        current_app.logger.error(f"Error refreshing plan catalog: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
+
+@admin_bp.route('/cache/purge', methods=['POST'])
+def purge_admin_cache():
+    """
+    Drop cached admin dashboard responses (admin only).
+
+    Optional JSON body: {"paths": ["/api/admin/metrics/revenue", ...]} to purge
+    only those endpoints. Purging everything also drops the cached closed-day
+    revenue totals, e.g. after a refund changes an old payment.
+
+    The purge is published to every worker through admin_cache_generations;
+    if that table is missing it only applies to the worker that handled the
+    request, and the response says so in data.scope.
+    """
+    try:
+        # Verify admin access
+        user_id, error = verify_admin_access()
+        if error:
+            return jsonify({'status': 'error', 'message': error}), 403
+        
+        data = request.get_json(silent=True) or {}
+        paths = data.get('paths') or []
+        if not isinstance(paths, list):
+            return jsonify({'status': 'error', 'message': 'paths must be a list'}), 400
+        
+        purged, shared = invalidate_admin_cache(*paths)
+        if not paths:
+            shared = publish_admin_cache_purge(ADMIN_CACHE_REVENUE_TOTALS) and shared
+            _apply_purge(ADMIN_CACHE_REVENUE_TOTALS)
+        
+        if shared:
+            scope, note = 'all_workers', f'other workers purge within {CACHE_GENERATION_SYNC_SECONDS:g}s'
+        else:
+            scope, note = 'worker', 'other workers keep serving theirs until they expire'
+        return jsonify({
+            'status': 'success',
+            'message': f'Purged {purged} cached responses in this worker; {note}',
+            'data': {**admin_response_cache.get_status(), 'scope': scope}
+        })
+        
+    except Exception as e:
+        current_app.logger.error(f"Error purging admin cache: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
@@ -435,6 +435,9 @@ def _create_user_profile(supabase: Client, user_id: str, email: str,
             'updated_at': 'now()'
         }
         result = supabase.table('profiles').update(update_data).eq('id', user_id).execute()
+        supabase_service = getattr(current_app, 'supabase_service', None)
+        if supabase_service:
+            supabase_service.profile_cache.invalidate(user_id)
         if result.data:
             current_app.logger.info(f"Successfully updated profile for user {user_id}")
             return True, None
@@ -575,122 +578,13 @@ def get_user_profile():
         if not supabase_service:
             return jsonify({'status': 'error', 'message': 'Database service not available'}), 500
 
-        # Get user profile from profiles table
-        try:
-            profile_result = supabase_service.supabase.table('profiles').select('*').eq('id', user_id).single().execute()
-            
-            if not profile_result.data:
-                # Create a default profile if none exists
-                default_profile = {
-                    'id': user_id,
-                    'email': '',  # Will be filled from auth
-                    'first_name': '',
-                    'last_name': '',
-                    'role': 'user',  # Default role
-                    'gender': '',
-                    'age': 0,
-                    'mobile_number': '',
-                    'has_health_condition': False,
-                    'health_conditions': [],
-                    'allergies': [],
-                    'dietary_preferences': [],
-                    'medical_history': [],
-                    'emergency_contact': {},
-                    'currency': 'NGN',
-                    'country': '',
-                    'state': '',
-                    'city': '',
-                    'address': '',
-                    'postal_code': '',
-                    'payment_methods': []
-                }
-                
-                # Try to get email from auth.users table
-                try:
-                    auth_result = supabase_service.supabase.auth.admin.get_user_by_id(user_id)
-                    if auth_result.user:
-                        default_profile['email'] = auth_result.user.email
-                except:
-                    pass
-                
-                # Insert default profile
-                insert_result = supabase_service.supabase.table('profiles').insert(default_profile).execute()
-                if insert_result.data:
-                    profile = insert_result.data[0]
-                else:
-                    return jsonify({'status': 'error', 'message': 'Failed to create profile'}), 500
-            else:
-                profile = profile_result.data
-        except Exception as e:
-            print(f"Error accessing profiles table: {str(e)}")
-            # Return a minimal profile if table doesn't exist
-            return jsonify({
-                'status': 'success',
-                'profile': {
-                    'id': user_id,
-                    'email': '',
-                    'first_name': '',
-                    'last_name': '',
-                    'display_name': '',
-                    'gender': '',
-                    'age': 0,
-                    'mobile_number': '',
-                    'has_health_condition': False,
-                    'health_conditions': [],
-                    'allergies': [],
-                    'dietary_preferences': [],
-                    'medical_history': [],
-                    'emergency_contact': {},
-                    'currency': 'NGN',
-                    'country': '',
-                    'state': '',
-                    'city': '',
-                    'address': '',
-                    'postal_code': '',
-                                    'payment_methods': [],
-                'has_sickness': False,
-                'sickness_type': '',
-                'date_of_birth': None,
-                'weight': 0,
-                'height': 0,
-                'created_at': None,
-                'updated_at': None
-                }
-            }), 200
-        
+        profile, error = supabase_service.get_profile_payload(user_id)
+        if error:
+            return jsonify({'status': 'error', 'message': error}), 500
+
         return jsonify({
             'status': 'success',
-            'profile': {
-                'id': profile.get('id'),
-                'email': profile.get('email'),
-                'first_name': profile.get('first_name'),
-                'last_name': profile.get('last_name'),
-                'display_name': f"{profile.get('first_name', '')} {profile.get('last_name', '')}".strip(),
-                'role': profile.get('role', 'user'),
-                'gender': profile.get('gender'),
-                'age': profile.get('age'),
-                'mobile_number': profile.get('mobile_number'),
-                'has_health_condition': profile.get('has_health_condition', False),
-                'health_conditions': profile.get('health_conditions', []),
-                'allergies': profile.get('allergies', []),
-                'dietary_preferences': profile.get('dietary_preferences', []),
-                'medical_history': profile.get('medical_history', []),
-                'emergency_contact': profile.get('emergency_contact', {}),
-                'currency': profile.get('currency'),
-                'country': profile.get('country'),
-                'state': profile.get('state'),
-                'city': profile.get('city'),
-                'address': profile.get('address'),
-                'postal_code': profile.get('postal_code'),
-                'payment_methods': profile.get('payment_methods', []),
-                'has_sickness': profile.get('has_sickness', False),
-                'sickness_type': profile.get('sickness_type', ''),
-                'date_of_birth': profile.get('date_of_birth'),
-                'weight': profile.get('weight'),
-                'height': profile.get('height'),
-                'created_at': profile.get('created_at'),
-                'updated_at': profile.get('updated_at')
-            }
+            'profile': profile
         }), 200
 
     except Exception as e:
@@ -790,6 +684,7 @@ def update_user_profile():
             return jsonify({'status': 'error', 'message': 'Profile not found'}), 404
 
         updated_profile = result.data[0]
+        supabase_service.profile_cache.put(user_id, updated_profile, changed=True)
         
         return jsonify({
             'status': 'success',
@@ -0,0 +1,167 @@
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from flask import Blueprint, request, jsonify, current_app
+from werkzeug.test import EnvironBuilder
+
+from services.auth_service import VERIFIED_TOKEN_ENVIRON_KEY, token_cache_key
+
+batch_bp = Blueprint('batch', __name__)
+
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', '20'))
+BATCH_MAX_PAYLOAD_BYTES = int(os.environ.get('BATCH_MAX_PAYLOAD_BYTES', str(1024 * 1024)))
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', '4'))
+BATCH_ALLOWED_METHODS = {'GET', 'POST', 'PUT', 'DELETE'}
+
+# Sub-requests get their own pool so a batched /api/bootstrap can still use
+# the shared fan-out pool without waiting on itself.
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_batch_executor() -> ThreadPoolExecutor:
+    """Get the thread pool that runs batched sub-requests."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix='batch')
+    return _executor
+
+
+def get_user_id_from_token():
+    """Extract user ID from token with proper error handling"""
+    try:
+        auth_service = current_app.auth_service
+        auth_header = request.headers.get('Authorization')
+
+        if not auth_header:
+            return None, "No Authorization header provided"
+
+        user_id, auth_type = auth_service.get_supabase_user_id_from_token(auth_header)
+
+        if not user_id:
+            return None, f"Token verification failed. Auth type attempted: {auth_type}"
+
+        return user_id, None
+    except Exception as e:
+        current_app.logger.error(f"Error extracting user ID from token: {str(e)}")
+        return None, f"Token processing error: {str(e)}"
+
+
+def _validate_item(item) -> Optional[str]:
+    """Return an error message if a sub-request is malformed."""
+    if not isinstance(item, dict):
+        return 'Each request must be an object'
+    method = str(item.get('method', 'GET')).upper()
+    path = item.get('path')
+    if method not in BATCH_ALLOWED_METHODS:
+        return f'Method {method} is not allowed'
+    if not isinstance(path, str) or not path.startswith('/api/'):
+        return 'Path must start with /api/'
+    if path.split('?', 1)[0].rstrip('/') == '/api/batch':
+        return 'Batch requests cannot be nested'
+    return None
+
+
+def _dispatch(app, item: dict, headers: dict, verified_token: tuple) -> dict:
+    """Run one sub-request through the app's URL map and capture its response."""
+    method = str(item.get('method', 'GET')).upper()
+    builder_args = {'path': item['path'], 'method': method, 'headers': headers}
+    if item.get('body') is not None:
+        builder_args['json'] = item['body']
+
+    environ = EnvironBuilder(**builder_args).get_environ()
+    environ[VERIFIED_TOKEN_ENVIRON_KEY] = verified_token
+    try:
+        with app.request_context(environ):
+            response = app.full_dispatch_request()
+            body = response.get_json(silent=True)
+            if body is None:
+                body = response.get_data(as_text=True)
+            return {'status': response.status_code, 'body': body}
+    except Exception as e:
+        app.logger.error(f"Batch sub-request {method} {item['path']} failed: {str(e)}")
+        return {'status': 500, 'body': {'status': 'error', 'message': 'Sub-request failed'}}
+
+
+@batch_bp.route('/batch', methods=['POST'])
+def run_batch():
+    """
+    Run several API calls in one round trip.
+
+    Expects {"requests": [{"method": "GET", "path": "/api/...", "body": {...}}, ...]}.
+    The caller's token is verified once and forwarded to every sub-request.
+    Consecutive GETs run in parallel; any other method runs on its own, in
+    order, so writes are never reordered around the reads next to them.
+    Results come back in request order with each call's status and body.
+    """
+    try:
+        if request.content_length and request.content_length > BATCH_MAX_PAYLOAD_BYTES:
+            return jsonify({
+                'status': 'error',
+                'message': f'Batch payload exceeds {BATCH_MAX_PAYLOAD_BYTES} bytes'
+            }), 413
+
+        user_id, error = get_user_id_from_token()
+        if error:
+            return jsonify({'status': 'error', 'message': f'Authentication failed: {error}'}), 401
+
+        data = request.get_json(silent=True)
+        items = data.get('requests') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return jsonify({'status': 'error', 'message': 'A non-empty requests array is required'}), 400
+        if len(items) > BATCH_MAX_REQUESTS:
+            return jsonify({
+                'status': 'error',
+                'message': f'At most {BATCH_MAX_REQUESTS} requests are allowed per batch'
+            }), 400
+        if request.content_length is None and len(json.dumps(items)) > BATCH_MAX_PAYLOAD_BYTES:
+            return jsonify({
+                'status': 'error',
+                'message': f'Batch payload exceeds {BATCH_MAX_PAYLOAD_BYTES} bytes'
+            }), 413
+
+        app = current_app._get_current_object()
+        headers = {'Authorization': request.headers.get('Authorization')}
+        # Sub-requests reuse this verification instead of repeating it per call
+        verified_token = (token_cache_key(headers['Authorization']), user_id, 'supabase')
+        if request.headers.get('Accept'):
+            headers['Accept'] = request.headers.get('Accept')
+
+        executor = get_batch_executor()
+        results = [None] * len(items)
+        pending_reads = []
+
+        def flush_reads():
+            futures = [(index, executor.submit(_dispatch, app, items[index], headers, verified_token)) for index in pending_reads]
+            for index, future in futures:
+                results[index] = future.result()
+            pending_reads.clear()
+
+        for index, item in enumerate(items):
+            error = _validate_item(item)
+            if error:
+                results[index] = {'status': 400, 'body': {'status': 'error', 'message': error}}
+                continue
+            if str(item.get('method', 'GET')).upper() == 'GET':
+                pending_reads.append(index)
+                continue
+            flush_reads()
+            results[index] = executor.submit(_dispatch, app, item, headers, verified_token).result()
+        flush_reads()
+
+        for index, item in enumerate(items):
+            results[index]['id'] = item.get('id', index) if isinstance(item, dict) else index
+
+        return jsonify({
+            'status': 'success',
+            'responses': results
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Error running batch request: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Failed to run batch'}), 500
@@ -0,0 +1,103 @@
+from flask import Blueprint, request, jsonify, current_app
+
+from routes.server_time_routes import get_server_time_payload
+from utils.concurrency import fan_out
+
+bootstrap_bp = Blueprint('bootstrap', __name__)
+
+
+def get_user_id_from_token():
+    """Extract user ID from token with proper error handling"""
+    try:
+        auth_service = current_app.auth_service
+        auth_header = request.headers.get('Authorization')
+
+        if not auth_header:
+            return None, "No Authorization header provided"
+
+        user_id, auth_type = auth_service.get_supabase_user_id_from_token(auth_header)
+
+        if not user_id:
+            return None, f"Token verification failed. Auth type attempted: {auth_type}"
+
+        return user_id, None
+    except Exception as e:
+        current_app.logger.error(f"Error extracting user ID from token: {str(e)}")
+        return None, f"Token processing error: {str(e)}"
+
+
+def _load_profile(supabase_service, user_id: str) -> dict:
+    profile, error = supabase_service.get_profile_payload(user_id)
+    if error:
+        raise Exception(error)
+    return profile
+
+
+@bootstrap_bp.route('/bootstrap', methods=['GET'])
+def get_bootstrap():
+    """
+    Return everything the app needs on startup in one response: profile,
+    subscription status, plans, feature usage and server time.
+
+    The token is verified once and the sections are fetched concurrently.
+    A failing section is reported in its own entry instead of failing the
+    whole request.
+    """
+    try:
+        user_id, error = get_user_id_from_token()
+        if error:
+            return jsonify({'status': 'error', 'message': f'Authentication failed: {error}'}), 401
+
+        supabase_service = getattr(current_app, 'supabase_service', None)
+        payment_service = getattr(current_app, 'payment_service', None)
+
+        tasks = {}
+        unavailable = {}
+        if supabase_service:
+            tasks['profile'] = lambda: _load_profile(supabase_service, user_id)
+        else:
+            unavailable['profile'] = 'Database service not available'
+        if payment_service:
+            tasks['subscription'] = lambda: payment_service.get_subscription_status(user_id)
+            tasks['plans'] = lambda: {
+                'plans': payment_service.plan_catalog.get_plans(),
+                'etag': payment_service.plan_catalog.get_etag()
+            }
+            # One task per feature so usage checks run side by side
+            for feature in payment_service.plan_catalog.get_limits('free'):
+                tasks[f'usage:{feature}'] = (
+                    lambda feature=feature: payment_service.can_use_feature(user_id, feature)
+                )
+        else:
+            for section in ('subscription', 'plans', 'usage'):
+                unavailable[section] = 'Payment service not available'
+
+        results, errors = fan_out(tasks)
+        errors.update(unavailable)
+
+        usage_keys = [name for name in tasks if name.startswith('usage:')]
+        if usage_keys:
+            usage_errors = {key[len('usage:'):]: errors.pop(key) for key in usage_keys if key in errors}
+            if usage_errors:
+                errors['usage'] = '; '.join(f"{feature}: {message}" for feature, message in usage_errors.items())
+            else:
+                results['usage'] = {key[len('usage:'):]: results.pop(key) for key in usage_keys}
+        results['server_time'] = get_server_time_payload()
+
+        sections = {}
+        for name in ('profile', 'subscription', 'plans', 'usage', 'server_time'):
+            if name in results:
+                sections[name] = {'status': 'success', 'data': results[name]}
+            else:
+                current_app.logger.warning(f"Bootstrap section {name} failed for user {user_id}: {errors.get(name)}")
+                sections[name] = {'status': 'error', 'message': errors.get(name, 'Unavailable')}
+
+        return jsonify({
+            'status': 'partial' if errors else 'success',
+            'user_id': user_id,
+            'sections': sections
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Error building bootstrap response: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Failed to load app data'}), 500
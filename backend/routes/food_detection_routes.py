@@ -6,12 +6,13 @@ from flask import Blueprint, request, jsonify, current_app
 import os
 import uuid # For generating unique IDs
 import json # For handling JSON strings
+import base64
 from marshmallow import Schema, fields, ValidationError
 
 # Import utilities and services
-from utils.file_utils import allowed_file
-from utils.image_utils import compress_image, validate_image_data
-from werkzeug.utils import secure_filename
+from utils.file_utils import allowed_file, check_image_upload, STORAGE_UPLOAD_MAX_BYTES
+from utils.image_utils import process_image, process_image_variants, stored_output_format
+from utils.image_pool import ImagePoolFullError
 
 # TEMPORARY TESTING MODE: Disable all usage limits
 TESTING_MODE = True  # Set to False to re-enable usage limits
@@ -55,6 +56,7 @@ def record_usage(user_id: str, feature_name: str, count: int = 1) -> bool:
             'p_feature_name': feature_name,
             'p_count': count
         }).execute()
+        current_app.supabase_service.record_activity(user_id, feature_name)
         return True
     except Exception as e:
         print(f"Error recording usage: {e}")
@@ -101,6 +103,7 @@ def process_food_input():
 
   analysis_id = str(uuid.uuid4()) # Generate a unique analysis ID for tracking
   input_data_value = None
+  upload_job = None
   
   if input_type == 'ingredient_list':
       ingredients_text = request.form.get('ingredient_list')
@@ -110,20 +113,25 @@ def process_food_input():
       print(f"Received ingredient list from user {user_id}: {ingredients_text}")
 
   elif input_type == 'image':
+      if request.content_length and request.content_length > STORAGE_UPLOAD_MAX_BYTES:
+          return jsonify({'status': 'error', 'message': f'Image exceeds maximum upload size of {STORAGE_UPLOAD_MAX_BYTES} bytes.'}), 413
       if 'image' not in request.files:
           return jsonify({'status': 'error', 'message': 'No image uploaded.'}), 400
       file = request.files['image']
       if file and allowed_file(file.filename): # allowed_file now only checks extension
-          # Upload image to Supabase Storage
-          filename = secure_filename(file.filename)
-          # Use a unique path to avoid overwrites, e.g., user_id/analysis_id/filename
-          storage_path = f"detection_images/{user_id}/{analysis_id}/{filename}"
-          image_url, upload_error = supabase_service.upload_file(file, 'detection_images', storage_path)
-          if upload_error:
-              print(f"Error uploading image to Supabase Storage: {upload_error}")
-              return jsonify({'status': 'error', 'message': f'Failed to upload image: {upload_error}'}), 500
-          input_data_value = image_url
-          print(f'Image uploaded to Supabase Storage: {image_url} for user {user_id}')
+          # Reject non-images and decompression bombs from the header, before anything is stored
+          image_error = check_image_upload(file)
+          if image_error:
+              return jsonify({'status': 'error', 'message': f'Invalid image: {image_error}'}), 400
+          # Spool to disk now, since the request stream closes with the response; the
+          # Storage upload runs after responding and patches input_data/image_url on the row
+          try:
+              upload_job, spool_error = supabase_service.image_uploads.spool(file, analysis_id)
+          except OSError as e:
+              print(f"Error spooling image for upload: {e}")
+              return jsonify({'status': 'error', 'message': 'Failed to accept image. Please try again.'}), 500
+          if spool_error:
+              return jsonify({'status': 'error', 'message': spool_error}), 413
       else:
           return jsonify({'status': 'error', 'message': 'Invalid file type.'}), 400
   else:
@@ -136,20 +144,118 @@ def process_food_input():
       suggestion=food_suggestions[0] if food_suggestions else None,
       detected_foods=json.dumps(detected_ingredients), # Store as JSON string
       analysis_id=analysis_id,
-      input_data=input_data_value
+      input_data=input_data_value,
+      image_upload_status='pending' if upload_job else None
   )
   if not success:
+      if upload_job:
+          supabase_service.image_uploads.discard(upload_job)
       print(f"Error saving initial detection history: {error}")
       return jsonify({'status': 'error', 'message': 'Failed to save detection history.'}), 500
 
+  response = {
+      'status': 'success',
+      'analysis_id': analysis_id,
+      'message': 'Initial detection data received and saved.',
+      'usage_info': usage_info
+  }
+  if upload_job:
+      # Content-addressed, so a repeat of the same photo reuses the stored copy
+      supabase_service.image_uploads.submit(upload_job, user_id, 'detection_images')
+      response['image_upload_status'] = 'pending'
+
   # Record usage for ingredient detection
   record_usage(user_id, 'ingredient_detection', 1)
 
+  return jsonify(response), 200
+
+@food_detection_bp.route('/process/<analysis_id>/image_status', methods=['GET'])
+def get_image_upload_status(analysis_id):
+  """
+  Reports whether the image sent to /process has reached Storage:
+  'pending', 'uploaded' (with image_url) or 'failed'. A failed image can be
+  re-sent to POST /process/<analysis_id>/image.
+  """
+  auth_service = current_app.auth_service
+  supabase_service = current_app.supabase_service
+  user_id, auth_type = auth_service.get_supabase_user_id_from_token(request.headers.get('Authorization'))
+
+  if not user_id:
+      return jsonify({'status': 'error', 'message': 'Authentication required.'}), 401
+
+  upload_status, error = supabase_service.image_uploads.get_status(analysis_id, user_id)
+  if error:
+      code = 404 if error == 'Detection not found' else 500
+      return jsonify({'status': 'error', 'message': error}), code
+
+  response = {
+      'status': 'success',
+      'analysis_id': analysis_id,
+      'image_upload_status': upload_status['status'],
+      'image_url': upload_status.get('image_url')
+  }
+  if upload_status['status'] == 'failed':
+      response['message'] = 'The image could not be stored. Please send it again.'
+      response['resend_url'] = f"{request.script_root}/api/food_detection/process/{analysis_id}/image"
+  return jsonify(response), 200
+
+@food_detection_bp.route('/process/<analysis_id>/image', methods=['POST'])
+def resend_detection_image(analysis_id):
+  """
+  Re-sends the image for a detection whose upload failed (or was lost), using
+  the same multipart 'image' field as /process. The upload runs in the background
+  again; poll /process/<analysis_id>/image_status.
+  """
+  auth_service = current_app.auth_service
+  supabase_service = current_app.supabase_service
+  user_id, auth_type = auth_service.get_supabase_user_id_from_token(request.headers.get('Authorization'))
+
+  if not user_id:
+      return jsonify({'status': 'error', 'message': 'Authentication required.'}), 401
+
+  try:
+      analysis_id = str(uuid.UUID(analysis_id))
+  except ValueError:
+      return jsonify({'status': 'error', 'message': 'Detection not found'}), 404
+
+  image_uploads = supabase_service.image_uploads
+  upload_status, error = image_uploads.get_status(analysis_id, user_id)
+  if error:
+      code = 404 if error == 'Detection not found' else 500
+      return jsonify({'status': 'error', 'message': error}), code
+  if upload_status['status'] == 'uploaded':
+      return jsonify({'status': 'error', 'message': 'Image already uploaded.', 'image_url': upload_status.get('image_url')}), 409
+  if upload_status['status'] == 'pending' and image_uploads.has_job(analysis_id):
+      return jsonify({'status': 'error', 'message': 'Image upload still in progress.'}), 409
+
+  if request.content_length and request.content_length > STORAGE_UPLOAD_MAX_BYTES:
+      return jsonify({'status': 'error', 'message': f'Image exceeds maximum upload size of {STORAGE_UPLOAD_MAX_BYTES} bytes.'}), 413
+  file = request.files.get('image')
+  if not file or not allowed_file(file.filename):
+      return jsonify({'status': 'error', 'message': 'Invalid file type.'}), 400
+  image_error = check_image_upload(file)
+  if image_error:
+      return jsonify({'status': 'error', 'message': f'Invalid image: {image_error}'}), 400
+
+  try:
+      upload_job, spool_error = image_uploads.spool(file, analysis_id)
+  except OSError as e:
+      print(f"Error spooling image for upload: {e}")
+      return jsonify({'status': 'error', 'message': 'Failed to accept image. Please try again.'}), 500
+  if spool_error:
+      return jsonify({'status': 'error', 'message': spool_error}), 413
+
+  success, error = image_uploads.mark_pending(analysis_id, user_id)
+  if not success:
+      image_uploads.discard(upload_job)
+      print(f"Error resetting image upload status: {error}")
+      return jsonify({'status': 'error', 'message': 'Failed to update detection history.'}), 500
+  image_uploads.submit(upload_job, user_id, 'detection_images')
+
   return jsonify({
       'status': 'success',
       'analysis_id': analysis_id,
-      'message': 'Initial detection data received and saved.',
-      'usage_info': usage_info
+      'image_upload_status': 'pending'
   }), 200
 
 @food_detection_bp.route('/instructions', methods=['POST'])
@@ -256,6 +362,8 @@ def food_detect():
       print(f"[DEBUG] TESTING MODE: Skipping usage limit check for user {user_id}")
       usage_info = {'message': 'Testing mode - no limits enforced'}
 
+  if request.content_length and request.content_length > STORAGE_UPLOAD_MAX_BYTES:
+      return jsonify({'status': 'error', 'message': f'Image exceeds maximum upload size of {STORAGE_UPLOAD_MAX_BYTES} bytes.'}), 413
   if 'image' not in request.files:
       return jsonify({'status': 'error', 'message': 'No image uploaded.'}), 400
   file = request.files['image']
@@ -274,10 +382,11 @@ def food_detect():
   analysis_id = str(uuid.uuid4()) # Generate a unique analysis ID
 
   if file and allowed_file(file.filename):
-      filename = secure_filename(file.filename)
-      # Upload image to Supabase Storage
-      storage_path = f"detection_images/{user_id}/{analysis_id}/{filename}"
-      image_url, upload_error = supabase_service.upload_file(file, 'detection_images', storage_path)
+      image_error = check_image_upload(file)
+      if image_error:
+          return jsonify({'status': 'error', 'message': f'Invalid image: {image_error}'}), 400
+      # Upload image to content-addressed Storage; a repeat of the same photo reuses the stored copy
+      image_url, upload_error = supabase_service.upload_image_deduplicated(file, 'detection_images', user_id)
       if upload_error:
           print(f"Error uploading image to Supabase Storage: {upload_error}")
           return jsonify({'status': 'error', 'message': f'Failed to upload image: {upload_error}'}), 500
@@ -475,14 +584,40 @@ def create_detection_history():
 
     # Handle image compression if image_data is provided
     image_data = validated.get('image_data')
+    image_url = None
+    image_variants = None
     if image_data:
-        if validate_image_data(image_data):
-            print("Compressing image data...")
-            compressed_image = compress_image(image_data, max_size=(800, 600), quality=85)
-            validated['image_data'] = compressed_image
-            print(f"Image compressed successfully. Original size: {len(image_data)} chars, Compressed: {len(compressed_image)} chars")
+        # Decode once and render medium/full, in the image worker pool
+        output_format = stored_output_format()
+        try:
+            image_result, image_error = process_image_variants(image_data, output_format=output_format)
+        except ImagePoolFullError as e:
+            print(f"[WARNING] Rejecting detection history save, image workers busy: {e}")
+            response = jsonify({'status': 'error', 'message': 'Server is busy processing images. Please try again shortly.'})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        if image_result:
+            sizes = ', '.join(f"{name} {variant['width']}x{variant['height']}" for name, variant in image_result['variants'].items())
+            print(f"Image variants rendered: {image_result['input_bytes']} -> {image_result['output_bytes']} bytes "
+                  f"({sizes}) in {image_result['timings_ms']['total']}ms")
+            image_variants, upload_error = supabase_service.upload_image_variants(user_id, image_result)
+            if image_variants:
+                image_url = image_variants['full']['url']
+                validated['image_data'] = None
+            else:
+                # Storage unavailable: keep the full-size rendition inline as before
+                print(f"[WARNING] Could not store image variants, keeping inline image: {upload_error}")
+                full_image = image_result['variants']['full']['bytes']
+                if image_result['format'] != 'JPEG':
+                    # Inline images are rendered as data:image/jpeg by clients
+                    try:
+                        jpeg_result, _ = process_image(image_data, max_size=(800, 600), quality=85)
+                    except ImagePoolFullError:
+                        jpeg_result = None
+                    full_image = jpeg_result['bytes'] if jpeg_result else None
+                validated['image_data'] = base64.b64encode(full_image).decode('ascii') if full_image else None
         else:
-            print("Invalid image data provided, removing from payload")
+            print(f"Invalid image data provided, removing from payload: {image_error}")
             validated['image_data'] = None
 
     print("Payload being passed to save_detection_history:", {
@@ -497,7 +632,8 @@ def create_detection_history():
         'google': validated.get('google'),
         'resources': validated.get('resources'),
         'input_data': validated.get('input_data'),
-        'image_data': 'COMPRESSED_IMAGE' if validated.get('image_data') else None
+        'image_data': 'COMPRESSED_IMAGE' if validated.get('image_data') else None,
+        'image_url': image_url
     })
 
     # Insert all validated fields, including shared_recipes fields
@@ -513,7 +649,9 @@ def create_detection_history():
         google=validated.get('google'),
         resources=validated.get('resources'),
         input_data=validated.get('input_data'),
-        image_data=validated.get('image_data')
+        image_data=validated.get('image_data'),
+        image_url=image_url,
+        image_variants=image_variants
     )
     if not success:
         print(f"[ERROR] Failed to save detection history: {error}")
@@ -3,6 +3,8 @@ from datetime import datetime
 import psutil
 import os
 from database import check_database_health, get_connection_pool
+from utils.image_pool import get_image_pool
+from utils.image_utils import get_pipeline_stats
 
 health_bp = Blueprint('health', __name__)
 
@@ -144,4 +146,34 @@ def pool_health_check():
             'status': 'unhealthy',
             'error': str(e),
             'timestamp': datetime.utcnow().isoformat()
-        }), 503 
\ No newline at end of file
+        }), 503 
+
+@health_bp.route('/health/images', methods=['GET'])
+def image_pool_health_check():
+    """
+    Image worker pool health check endpoint.
+    Reports queue depth, job latency, cumulative image pipeline stats and
+    background upload counters.
+    """
+    try:
+        pool_stats = get_image_pool().get_stats()
+        is_healthy = pool_stats['utilization_percent'] < 90
+        
+        response = {
+            'status': 'healthy' if is_healthy else 'degraded',
+            'image_pool': pool_stats,
+            'pipeline': get_pipeline_stats(),
+            'uploads': current_app.supabase_service.image_uploads.get_stats() if current_app.supabase_service else None,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        
+        status_code = 200 if is_healthy else 503
+        return jsonify(response), status_code
+        
+    except Exception as e:
+        current_app.logger.error(f"Image pool health check failed: {str(e)}")
+        return jsonify({
+            'status': 'unhealthy',
+            'error': str(e),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 503
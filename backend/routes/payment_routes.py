@@ -37,7 +37,7 @@ def authenticate_user():
             return None
         
         token = auth_header.split(' ')[1]
-        auth_service = AuthService(current_app.supabase_service.supabase)
+        auth_service = getattr(current_app, 'auth_service', None) or AuthService(current_app.supabase_service.supabase)
         user_id, auth_type = auth_service.get_supabase_user_id_from_token(token)
         return user_id
     except Exception as e:
@@ -72,97 +72,15 @@ def get_subscription_plans():
         if not payment_service:
             return jsonify({'error': 'Payment service not available'}), 503
         
-        # Get subscription plans from database
-        try:
-            result = payment_service.supabase.table('subscription_plans').select('*').eq('is_active', True).execute()
-            plans = result.data if result.data else []
-            
-            return jsonify({
-                'status': 'success',
-                'plans': plans
-            }), 200
-            
-        except Exception as db_error:
-            print(f"Database error getting plans: {db_error}")
-            # Return default plans if database is not available
-            default_plans = [
-                {
-                    'id': 'free',
-                    'name': 'free',
-                    'display_name': 'Free Plan',
-                    'price_monthly': 0.00,
-                    'price_yearly': 0.00,
-                    'features': {
-                        'food_detection': True,
-                        'ai_kitchen': True,
-                        'basic_support': True
-                    },
-                    'limits': {
-                        'food_detection': 5,
-                        'meal_planning': 3,
-                        'ai_kitchen': 5
-                    }
-                },
-                {
-                    'id': 'weekly',
-                    'name': 'weekly',
-                    'display_name': 'Weekly Plan',
-                    'price_monthly': 2.50,
-                    'price_yearly': 0.00,
-                    'features': {
-                        'food_detection': True,
-                        'meal_planning': True,
-                        'ai_kitchen': True,
-                        'priority_support': True
-                    },
-                    'limits': {
-                        'food_detection': -1,
-                        'meal_planning': -1,
-                        'ai_kitchen': -1
-                    }
-                },
-                {
-                    'id': 'two_weeks',
-                    'name': 'two_weeks',
-                    'display_name': 'Two Weeks Plan',
-                    'price_monthly': 5.00,
-                    'price_yearly': 0.00,
-                    'features': {
-                        'food_detection': True,
-                        'meal_planning': True,
-                        'ai_kitchen': True,
-                        'priority_support': True
-                    },
-                    'limits': {
-                        'food_detection': -1,
-                        'meal_planning': -1,
-                        'ai_kitchen': -1
-                    }
-                },
-                {
-                    'id': 'monthly',
-                    'name': 'monthly',
-                    'display_name': 'Monthly Plan',
-                    'price_monthly': 10.00,
-                    'price_yearly': 0.00,
-                    'features': {
-                        'food_detection': True,
-                        'meal_planning': True,
-                        'ai_kitchen': True,
-                        'priority_support': True
-                    },
-                    'limits': {
-                        'food_detection': -1,
-                        'meal_planning': -1,
-                        'ai_kitchen': -1
-                    }
-                }
-            ]
-            
-            return jsonify({
-                'status': 'success',
-                'plans': default_plans
-            }), 200
+        # Plans come from the in-memory catalog; clients revalidate with If-None-Match
+        plan_catalog = payment_service.plan_catalog
+        response = jsonify({
+            'status': 'success',
+            'plans': plan_catalog.get_plans()
+        })
+        response.set_etag(plan_catalog.get_etag())
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
             
     except Exception as e:
         print(f"Error getting subscription plans: {e}")
@@ -344,6 +262,9 @@ def record_usage(feature_name):
         # Record usage
         payment_service = get_payment_service()
         result = payment_service.record_usage(user_id, feature_name)
+        supabase_service = getattr(current_app, 'supabase_service', None)
+        if supabase_service and result.get('status') == 'success':
+            supabase_service.record_activity(user_id, feature_name)
         
         return jsonify(result), 200
 
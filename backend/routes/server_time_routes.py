@@ -4,24 +4,30 @@ import pytz
 
 server_time_routes = Blueprint('server_time', __name__)
 
+def get_server_time_payload() -> dict:
+    """Build the server time payload shared by /server-time and /bootstrap."""
+    # Get current UTC time
+    utc_time = datetime.utcnow()
+    
+    # Convert to a specific timezone (e.g., UTC)
+    utc_tz = pytz.UTC
+    server_time = utc_tz.localize(utc_time)
+    
+    return {
+        'serverTime': server_time.isoformat(),
+        'timezone': 'UTC',
+        'timestamp': server_time.timestamp()
+    }
+
 @server_time_routes.route('/server-time', methods=['GET'])
 def get_server_time():
     """
     Get the current server time to prevent client-side clock manipulation
     """
     try:
-        # Get current UTC time
-        utc_time = datetime.utcnow()
-        
-        # Convert to a specific timezone (e.g., UTC)
-        utc_tz = pytz.UTC
-        server_time = utc_tz.localize(utc_time)
-        
         return jsonify({
             'status': 'success',
-            'serverTime': server_time.isoformat(),
-            'timezone': 'UTC',
-            'timestamp': server_time.timestamp()
+            **get_server_time_payload()
         }), 200
         
     except Exception as e:
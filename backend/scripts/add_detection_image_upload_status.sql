@@ -0,0 +1,24 @@
+-- Deferred image upload status on detection_history
+-- Run this in your Supabase SQL Editor (safe to re-run)
+--
+-- /api/food_detection/process saves the detection before its image reaches
+-- Storage and uploads it in the background. image_upload_status tracks that:
+--   'pending'  - saved, upload in progress (input_data and image_url still empty)
+--   'uploaded' - input_data and image_url hold the Storage URL
+--   'failed'   - the upload gave up; re-send the image to
+--                POST /api/food_detection/process/<analysis_id>/image
+-- NULL means the row was saved with its image already in place.
+-- image_upload_requested_at is when the image was (re-)sent; rows still
+-- pending well past IMAGE_UPLOAD_DEADLINE_SECONDS are marked 'failed'.
+
+ALTER TABLE public.detection_history ADD COLUMN IF NOT EXISTS image_upload_status TEXT;
+ALTER TABLE public.detection_history ADD COLUMN IF NOT EXISTS image_upload_requested_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE public.detection_history ADD COLUMN IF NOT EXISTS image_url TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_detection_history_analysis_id
+    ON public.detection_history (analysis_id);
+
+-- The sweep for stuck uploads only looks at pending rows
+CREATE INDEX IF NOT EXISTS idx_detection_history_pending_uploads
+    ON public.detection_history (image_upload_requested_at)
+    WHERE image_upload_status = 'pending';
@@ -0,0 +1,9 @@
+-- Image variant URLs on detection_history
+-- Run this in your Supabase SQL Editor (safe to re-run)
+--
+-- Detection images are stored in Storage as medium and full renditions.
+-- image_url holds the full-size URL and image_variants holds all of them:
+--   {"medium": {"url": ..., "width": 400, "height": 300}, "full": {...}}
+
+ALTER TABLE public.detection_history ADD COLUMN IF NOT EXISTS image_url TEXT;
+ALTER TABLE public.detection_history ADD COLUMN IF NOT EXISTS image_variants JSONB;
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark image output formats (JPEG, WebP, AVIF)
+
+Resizes a corpus of photos to the detection image size once, then encodes
+each one in every output format this Pillow build supports. Reports output
+bytes, encode time and PSNR against the resized source, so the per-format
+quality offsets in utils.image_utils.OUTPUT_FORMATS can be checked.
+
+Usage (from the backend directory):
+    python scripts/benchmark_image_formats.py
+    python scripts/benchmark_image_formats.py --corpus /path/to/photos --quality 85 --repeat 5
+"""
+
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+import io
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops, ImageStat
+
+from benchmark_jpeg_draft import load_corpus
+from utils.image_utils import (OUTPUT_FORMATS, _encode, _open_for_resize, _to_rgb,
+                               sniff_image_format, supported_output_formats)
+
+
+def psnr(reference: Image.Image, encoded: bytes) -> float:
+    """Peak signal-to-noise ratio of the decoded output against the reference, in dB."""
+    decoded = Image.open(io.BytesIO(encoded)).convert(reference.mode)
+    rms = ImageStat.Stat(ImageChops.difference(reference, decoded)).rms
+    mse = sum(value ** 2 for value in rms) / len(rms)
+    return float('inf') if mse == 0 else 20 * math.log10(255 / math.sqrt(mse))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='Directory of JPEG photos (default: generate sample photos)')
+    parser.add_argument('--count', type=int, default=10, help='Number of sample photos to generate')
+    parser.add_argument('--repeat', type=int, default=3, help='Encodes per image and format')
+    parser.add_argument('--quality', type=int, default=85, help='JPEG-equivalent quality')
+    parser.add_argument('--max-size', default='800x600', help='Target bounding box, WIDTHxHEIGHT')
+    args = parser.parse_args()
+
+    max_size = tuple(int(part) for part in args.max_size.lower().split('x'))
+    photos = load_corpus(args.corpus, args.count)
+    if not photos:
+        print("❌ No JPEG photos found in corpus")
+        sys.exit(1)
+
+    # Resize once so only the encoders are compared
+    sources = []
+    for _, data in photos:
+        image, _ = _open_for_resize(data, sniff_image_format(data[:16]), max_size, use_draft=True)
+        image = _to_rgb(image)
+        image.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=None)
+        sources.append(image)
+
+    formats = supported_output_formats()
+    print(f"📷 Corpus: {len(sources)} photos resized to fit {max_size[0]}x{max_size[1]}, quality {args.quality}")
+    print(f"🧪 Formats: {', '.join(reversed(formats))}")
+
+    results = {}
+    for image_format in reversed(formats):
+        sizes, encode_ms, scores = [], [], []
+        for image in sources:
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                encoded = _encode(image, image_format, args.quality)
+                encode_ms.append((time.perf_counter() - started) * 1000)
+            sizes.append(len(encoded))
+            scores.append(psnr(image, encoded))
+        results[image_format] = {
+            'quality': max(1, min(100, args.quality + OUTPUT_FORMATS[image_format]['quality_offset'])),
+            'bytes_mean': statistics.mean(sizes),
+            'encode_ms_mean': statistics.mean(encode_ms),
+            'encode_ms_p95': sorted(encode_ms)[max(0, int(len(encode_ms) * 0.95) - 1)],
+            'psnr_db': statistics.mean(scores)
+        }
+
+    jpeg_bytes = results['JPEG']['bytes_mean']
+    print("=" * 78)
+    print(f"{'format':<8}{'quality':>9}{'avg bytes':>12}{'vs JPEG':>10}{'encode ms':>12}{'p95 ms':>10}{'PSNR dB':>10}")
+    for image_format, stats in results.items():
+        change = (stats['bytes_mean'] / jpeg_bytes - 1) * 100
+        print(f"{image_format:<8}{stats['quality']:>9}{stats['bytes_mean']:>12.0f}{change:>+9.1f}%"
+              f"{stats['encode_ms_mean']:>12.1f}{stats['encode_ms_p95']:>10.1f}{stats['psnr_db']:>10.2f}")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
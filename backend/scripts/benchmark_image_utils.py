@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Benchmark utils.image_utils across image sizes, formats and modes
+
+Generates a reproducible corpus (same seed, same images) covering JPEG, PNG,
+WebP and GIF sources in RGB, L, RGBA, P and LA modes at several sizes, then
+times compress_image, validate_image_data (header-only and deep) and
+get_image_info on every image. Each operation and image runs in its own
+process, so peak RSS growth is attributed to that configuration alone. Image
+jobs run inline (IMAGE_POOL_WORKERS=0) to measure the work, not the pool.
+
+Reports throughput, p50/p99 latency, peak RSS growth and output bytes, and
+can save the results as a JSON baseline and compare later runs against it.
+
+Usage (from the backend directory):
+    python scripts/benchmark_image_utils.py
+    python scripts/benchmark_image_utils.py --sizes small,medium --operations compress_image
+    python scripts/benchmark_image_utils.py --save-baseline scripts/benchmark_image_utils_baseline.json
+    python scripts/benchmark_image_utils.py --baseline scripts/benchmark_image_utils_baseline.json
+"""
+
+import argparse
+import base64
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_jpeg_draft import generate_sample_photo, peak_rss_mb
+
+SIZES = {
+    'small': (320, 240),
+    'medium': (1280, 960),
+    'large': (4032, 3024),
+}
+
+# (source format, mode) pairs clients actually send; JPEG can't hold alpha or palettes
+SOURCE_CONFIGS = [
+    ('JPEG', 'RGB'),
+    ('JPEG', 'L'),
+    ('PNG', 'RGB'),
+    ('PNG', 'RGBA'),
+    ('PNG', 'P'),
+    ('PNG', 'LA'),
+    ('WEBP', 'RGB'),
+    ('WEBP', 'RGBA'),
+    ('GIF', 'P'),
+]
+
+OPERATIONS = ['compress_image', 'validate_image_data', 'validate_image_data_deep', 'get_image_info']
+
+
+def generate_image(image_format: str, mode: str, size: tuple, seed: int) -> bytes:
+    """Render a photo-like image in the given mode and encode it in image_format."""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(generate_sample_photo(size, seed)))
+    if mode in ('RGBA', 'LA'):
+        # Radial-ish alpha so transparency isn't trivially constant
+        alpha = Image.radial_gradient('L').resize(size)
+        image = image.convert('RGB' if mode == 'RGBA' else 'L')
+        image.putalpha(alpha)
+    elif mode == 'P':
+        image = image.quantize(colors=256, method=Image.Quantize.MEDIANCUT)
+    else:
+        image = image.convert(mode)
+
+    buffer = io.BytesIO()
+    options = {'quality': 90} if image_format in ('JPEG', 'WEBP') else {}
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def build_corpus(size_names: list, seed: int) -> list:
+    """Every SOURCE_CONFIGS pair at every requested size, deterministic for a given seed."""
+    corpus = []
+    for size_name in size_names:
+        for index, (image_format, mode) in enumerate(SOURCE_CONFIGS):
+            data = generate_image(image_format, mode, SIZES[size_name], seed + index)
+            corpus.append({'format': image_format, 'mode': mode, 'size': size_name, 'data': data})
+    return corpus
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_config(operation: str, image_bytes: bytes, iterations: int, results):
+    """Time one operation on one image, in a fresh process."""
+    os.environ['IMAGE_POOL_WORKERS'] = '0'
+    from utils.image_utils import compress_image, get_image_info, validate_image_data
+
+    calls = {
+        'compress_image': compress_image,
+        'validate_image_data': validate_image_data,
+        'validate_image_data_deep': lambda payload: validate_image_data(payload, deep=True),
+        'get_image_info': get_image_info,
+    }
+    call = calls[operation]
+    payload = base64.b64encode(image_bytes).decode('ascii')
+
+    # Baseline before the warm-up call, which is usually where the peak is reached
+    baseline_mb = peak_rss_mb()
+    output = call(payload)  # Warm-up: first-call imports and lazy setup
+    if output is False or output == {} or (operation == 'compress_image' and output is payload):
+        results.put({'error': f"{operation} failed on this image"})
+        return
+
+    latencies_ms = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        call(payload)
+        latencies_ms.append((time.perf_counter() - call_started) * 1000)
+    elapsed = time.perf_counter() - started
+
+    results.put({
+        'iterations': iterations,
+        'ops_per_s': iterations / elapsed,
+        'input_mb_per_s': len(image_bytes) * iterations / elapsed / (1024 * 1024),
+        'p50_ms': percentile(latencies_ms, 0.50),
+        'p99_ms': percentile(latencies_ms, 0.99),
+        'peak_rss_mb': max(0.0, peak_rss_mb() - baseline_mb),
+        'output_bytes': len(base64.b64decode(output)) if operation == 'compress_image' else None
+    })
+
+
+def measure(operation: str, image_bytes: bytes, iterations: int) -> dict:
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=run_config, args=(operation, image_bytes, iterations, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+
+def config_key(result: dict) -> str:
+    return f"{result['operation']}/{result['format']}/{result['mode']}/{result['size']}"
+
+
+def compare(results: list, baseline: dict, threshold: float) -> list:
+    """
+    Configurations whose p50 latency, peak RSS or output bytes grew by more than threshold.
+
+    p99 is reported but not compared: with the default iteration count it is
+    close to the maximum and too noisy to gate on.
+    """
+    previous = {config_key(entry): entry for entry in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get(config_key(result))
+        if before is None or 'error' in result or 'error' in before:
+            continue
+        for metric, floor in (('p50_ms', 1.0), ('peak_rss_mb', 2.0), ('output_bytes', 0)):
+            old, new = before.get(metric), result.get(metric)
+            # Ignore changes below the noise floor (sub-millisecond timings, small RSS wobble)
+            if old is None or new is None or new - old <= floor:
+                continue
+            if old == 0 or new / old - 1 > threshold:
+                regressions.append((config_key(result), metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=','.join(SIZES), help=f"Comma-separated sizes ({', '.join(SIZES)})")
+    parser.add_argument('--operations', default=','.join(OPERATIONS), help='Comma-separated operations to run')
+    parser.add_argument('--iterations', type=int, default=20, help='Timed calls per configuration')
+    parser.add_argument('--seed', type=int, default=1, help='Corpus seed')
+    parser.add_argument('--save-corpus', help='Also write the generated images to this directory')
+    parser.add_argument('--save-baseline', help='Write results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against this JSON baseline and exit 1 on regressions')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Relative growth counted as a regression')
+    args = parser.parse_args()
+
+    size_names = [name.strip() for name in args.sizes.split(',') if name.strip()]
+    operations = [name.strip() for name in args.operations.split(',') if name.strip()]
+    unknown = [name for name in size_names if name not in SIZES] + [name for name in operations if name not in OPERATIONS]
+    if unknown:
+        print(f"❌ Unknown sizes or operations: {', '.join(unknown)}")
+        sys.exit(2)
+
+    corpus = build_corpus(size_names, args.seed)
+    total_mb = sum(len(entry['data']) for entry in corpus) / (1024 * 1024)
+    print(f"📷 Corpus: {len(corpus)} images ({', '.join(size_names)}), {total_mb:.1f} MB, seed {args.seed}")
+    if args.save_corpus:
+        os.makedirs(args.save_corpus, exist_ok=True)
+        for entry in corpus:
+            name = f"{entry['size']}_{entry['mode']}.{entry['format'].lower()}"
+            with open(os.path.join(args.save_corpus, name), 'wb') as f:
+                f.write(entry['data'])
+        print(f"💾 Corpus written to {args.save_corpus}")
+
+    results = []
+    header = (f"{'operation':<26}{'source':<12}{'size':<8}{'in KB':>9}{'ops/s':>10}{'MB/s':>9}"
+              f"{'p50 ms':>10}{'p99 ms':>10}{'+RSS MB':>9}{'out KB':>9}")
+    print("=" * len(header))
+    print(header)
+    for operation in operations:
+        for entry in corpus:
+            outcome = measure(operation, entry['data'], args.iterations)
+            result = {'operation': operation, 'format': entry['format'], 'mode': entry['mode'],
+                      'size': entry['size'], 'input_bytes': len(entry['data']), **outcome}
+            results.append(result)
+            source = f"{entry['format']}/{entry['mode']}"
+            prefix = f"{operation:<26}{source:<12}{entry['size']:<8}{len(entry['data']) / 1024:>9.1f}"
+            if 'error' in result:
+                print(f"{prefix}  ❌ {result['error']}")
+                continue
+            output_kb = f"{result['output_bytes'] / 1024:.1f}" if result['output_bytes'] is not None else '-'
+            print(f"{prefix}{result['ops_per_s']:>10.1f}{result['input_mb_per_s']:>9.1f}{result['p50_ms']:>10.2f}"
+                  f"{result['p99_ms']:>10.2f}{result['peak_rss_mb']:>9.1f}{output_kb:>9}")
+    print("=" * len(header))
+
+    if args.save_baseline:
+        from PIL import __version__ as pillow_version
+        with open(args.save_baseline, 'w') as f:
+            json.dump({
+                'created_at': datetime.utcnow().isoformat(),
+                'environment': {
+                    'python': platform.python_version(),
+                    'pillow': pillow_version,
+                    'platform': platform.platform(),
+                    'cpu_count': os.cpu_count()
+                },
+                'settings': {'sizes': size_names, 'operations': operations,
+                             'iterations': args.iterations, 'seed': args.seed},
+                'results': results
+            }, f, indent=2)
+            f.write('\n')
+        print(f"💾 Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        environment = baseline.get('environment', {})
+        print(f"📊 Compared with {args.baseline} (Pillow {environment.get('pillow')}, "
+              f"{environment.get('cpu_count')} CPUs); timings are only comparable on similar machines")
+        if regressions:
+            print(f"⚠️  {len(regressions)} regressions over {args.threshold:.0%}:")
+            for key, metric, old, new in regressions:
+                print(f"   {key:<50} {metric:<13} {old:>10.2f} -> {new:>10.2f}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark reduced-scale (draft) JPEG decoding against full decoding
+
+Runs utils.image_utils.process_image over a corpus of photos with draft mode
+on and off and reports CPU time and peak RSS for each path. Each path runs in
+its own process so peak RSS is not shared between them.
+
+Usage (from the backend directory):
+    python scripts/benchmark_jpeg_draft.py
+    python scripts/benchmark_jpeg_draft.py --corpus /path/to/photos --repeat 5
+"""
+
+import argparse
+import base64
+import io
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Typical phone camera resolutions
+SAMPLE_SIZES = [(4032, 3024), (3264, 2448), (4000, 3000), (3024, 4032), (2048, 1536)]
+
+
+def generate_sample_photo(size: tuple, seed: int) -> bytes:
+    """Build a photo-like JPEG: smooth gradients and shapes with sensor noise."""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    rng = random.Random(seed)
+    width, height = size
+    # Render small and upscale so the result has photographic, low-frequency content
+    small = Image.new('RGB', (width // 16, height // 16))
+    draw = ImageDraw.Draw(small)
+    for y in range(small.height):
+        shade = int(255 * y / small.height)
+        draw.line([(0, y), (small.width, y)], fill=(shade, rng.randint(60, 200), 255 - shade))
+    for _ in range(12):
+        x, y = rng.randint(0, small.width), rng.randint(0, small.height)
+        r = rng.randint(5, small.width // 3)
+        draw.ellipse([x - r, y - r, x + r, y + r],
+                     fill=(rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)))
+    image = small.resize(size, Image.Resampling.BICUBIC).filter(ImageFilter.GaussianBlur(2))
+    noise = Image.effect_noise(size, 24).convert('RGB')
+    image = Image.blend(image, noise, 0.08)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=92)
+    return buffer.getvalue()
+
+
+def load_corpus(corpus_dir: str | None, count: int) -> list:
+    """Read .jpg/.jpeg files from corpus_dir, or generate count sample photos."""
+    if corpus_dir:
+        photos = []
+        for name in sorted(os.listdir(corpus_dir)):
+            if name.lower().endswith(('.jpg', '.jpeg')):
+                with open(os.path.join(corpus_dir, name), 'rb') as f:
+                    photos.append((name, f.read()))
+        return photos
+    return [(f"sample_{i}_{SAMPLE_SIZES[i % len(SAMPLE_SIZES)][0]}x{SAMPLE_SIZES[i % len(SAMPLE_SIZES)][1]}.jpg",
+             generate_sample_photo(SAMPLE_SIZES[i % len(SAMPLE_SIZES)], seed=i))
+            for i in range(count)]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process in MB."""
+    # VmHWM belongs to this process image; ru_maxrss on Linux also carries the
+    # parent's peak across fork/exec, which would hide the difference
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_path(payloads: list, use_draft: bool, repeat: int, max_size: tuple, results):
+    """Process every payload repeat times and report timings and peak RSS growth while processing."""
+    from utils.image_utils import process_image
+
+    baseline_mb = peak_rss_mb()
+    cpu_ms = []
+    wall_ms = []
+    decoded = []
+    for _ in range(repeat):
+        for payload in payloads:
+            cpu_start, wall_start = time.process_time(), time.perf_counter()
+            result, error = process_image(payload, max_size=max_size, use_draft=use_draft, offload=False)
+            cpu_ms.append((time.process_time() - cpu_start) * 1000)
+            wall_ms.append((time.perf_counter() - wall_start) * 1000)
+            if error:
+                results.put({'error': error})
+                return
+            decoded.append((result['decoded_width'], result['decoded_height']))
+
+    results.put({
+        'cpu_ms_mean': statistics.mean(cpu_ms),
+        'wall_ms_mean': statistics.mean(wall_ms),
+        'wall_ms_p95': sorted(wall_ms)[int(len(wall_ms) * 0.95) - 1] if len(wall_ms) > 1 else wall_ms[0],
+        'peak_rss_mb': peak_rss_mb() - baseline_mb,
+        'decoded_example': decoded[0]
+    })
+
+
+def measure(payloads: list, use_draft: bool, repeat: int, max_size: tuple) -> dict:
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=run_path, args=(payloads, use_draft, repeat, max_size, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    if 'error' in outcome:
+        raise RuntimeError(outcome['error'])
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='Directory of JPEG photos (default: generate sample photos)')
+    parser.add_argument('--count', type=int, default=10, help='Number of sample photos to generate')
+    parser.add_argument('--repeat', type=int, default=3, help='Passes over the corpus per path')
+    parser.add_argument('--max-size', default='800x600', help='Target bounding box, WIDTHxHEIGHT')
+    args = parser.parse_args()
+
+    max_size = tuple(int(part) for part in args.max_size.lower().split('x'))
+    photos = load_corpus(args.corpus, args.count)
+    if not photos:
+        print("❌ No JPEG photos found in corpus")
+        sys.exit(1)
+
+    total_mb = sum(len(data) for _, data in photos) / (1024 * 1024)
+    print(f"📷 Corpus: {len(photos)} photos, {total_mb:.1f} MB, target {max_size[0]}x{max_size[1]}")
+    payloads = [base64.b64encode(data).decode('ascii') for _, data in photos]
+
+    full = measure(payloads, use_draft=False, repeat=args.repeat, max_size=max_size)
+    draft = measure(payloads, use_draft=True, repeat=args.repeat, max_size=max_size)
+
+    print("=" * 72)
+    print(f"{'path':<8}{'decoded':>14}{'cpu ms':>12}{'wall ms':>12}{'p95 ms':>12}{'peak +RSS MB':>14}")
+    for name, stats in (('full', full), ('draft', draft)):
+        decoded = f"{stats['decoded_example'][0]}x{stats['decoded_example'][1]}"
+        print(f"{name:<8}{decoded:>14}{stats['cpu_ms_mean']:>12.1f}{stats['wall_ms_mean']:>12.1f}"
+              f"{stats['wall_ms_p95']:>12.1f}{stats['peak_rss_mb']:>14.1f}")
+    print("=" * 72)
+    print(f"⚡ CPU time: {full['cpu_ms_mean'] / draft['cpu_ms_mean']:.1f}x faster with draft decoding")
+    print(f"💾 Peak RSS: {full['peak_rss_mb'] / draft['peak_rss_mb']:.1f}x lower with draft decoding")
+
+
+if __name__ == "__main__":
+    main()
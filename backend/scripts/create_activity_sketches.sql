@@ -0,0 +1,68 @@
+-- HyperLogLog activity sketches for DAU/WAU/MAU in the admin usage metrics
+-- Run this in your Supabase SQL Editor (safe to re-run)
+--
+-- One 4096-byte sketch per (day, feature), plus feature = 'any' for activity of
+-- any kind. The backend builds sketches in memory and merges them in here with
+-- merge_activity_sketch; weekly and monthly counts merge the daily sketches.
+
+CREATE TABLE IF NOT EXISTS public.activity_sketches (
+    day DATE NOT NULL,
+    feature TEXT NOT NULL,
+    registers BYTEA NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (day, feature)
+);
+
+ALTER TABLE public.activity_sketches ENABLE ROW LEVEL SECURITY;
+
+-- Register-wise max of the stored sketch and the incoming one
+CREATE OR REPLACE FUNCTION public.merge_activity_sketch(
+    p_day DATE,
+    p_feature TEXT,
+    p_registers BYTEA
+) RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_current BYTEA;
+    i INTEGER;
+BEGIN
+    SELECT registers INTO v_current
+    FROM public.activity_sketches
+    WHERE day = p_day AND feature = p_feature
+    FOR UPDATE;
+
+    IF v_current IS NULL THEN
+        INSERT INTO public.activity_sketches (day, feature, registers)
+        VALUES (p_day, p_feature, p_registers)
+        ON CONFLICT (day, feature) DO NOTHING;
+        IF FOUND THEN
+            RETURN;
+        END IF;
+        -- Lost a race with another insert; merge into the row it created
+        SELECT registers INTO v_current
+        FROM public.activity_sketches
+        WHERE day = p_day AND feature = p_feature
+        FOR UPDATE;
+    END IF;
+
+    IF length(v_current) <> length(p_registers) THEN
+        RAISE EXCEPTION 'Sketch size mismatch: % vs %', length(v_current), length(p_registers);
+    END IF;
+
+    FOR i IN 0 .. length(p_registers) - 1 LOOP
+        IF get_byte(p_registers, i) > get_byte(v_current, i) THEN
+            v_current := set_byte(v_current, i, get_byte(p_registers, i));
+        END IF;
+    END LOOP;
+
+    UPDATE public.activity_sketches
+    SET registers = v_current, updated_at = NOW()
+    WHERE day = p_day AND feature = p_feature;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.merge_activity_sketch(DATE, TEXT, BYTEA) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.merge_activity_sketch(DATE, TEXT, BYTEA) TO service_role;
@@ -0,0 +1,24 @@
+-- Bulk subscription extension for POST /api/admin/subscriptions/bulk
+-- Run this in your Supabase SQL Editor (safe to re-run)
+--
+-- Each subscription moves its own end date, so extending many at once can't
+-- be a single PostgREST update. This function does it in one statement.
+
+CREATE OR REPLACE FUNCTION public.admin_extend_subscriptions(
+    p_ids UUID[],
+    p_days INTEGER
+) RETURNS SETOF public.user_subscriptions
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    UPDATE public.user_subscriptions
+    SET current_period_end = COALESCE(current_period_end, end_date, NOW()) + make_interval(days => p_days),
+        end_date = COALESCE(end_date, current_period_end, NOW()) + make_interval(days => p_days),
+        updated_at = NOW()
+    WHERE id = ANY(p_ids)
+    RETURNING *;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.admin_extend_subscriptions(UUID[], INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.admin_extend_subscriptions(UUID[], INTEGER) TO service_role;
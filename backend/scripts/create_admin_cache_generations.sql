@@ -0,0 +1,33 @@
+-- Shared invalidation generations for the backend's in-process caches
+-- Run this in your Supabase SQL Editor (safe to re-run)
+--
+-- Each gunicorn worker keeps its own in-memory caches (admin responses,
+-- profiles, the plan catalog). An invalidation bumps the generation of what
+-- changed here: an admin path ('*' for every admin response), 'profiles' or
+-- 'plan_catalog'. Every worker reads these generations every few seconds
+-- (services/cache_generations.py) and drops what changed elsewhere.
+
+CREATE TABLE IF NOT EXISTS public.admin_cache_generations (
+    path TEXT PRIMARY KEY,
+    generation BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE public.admin_cache_generations ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION public.bump_admin_cache_generation(
+    p_path TEXT
+) RETURNS BIGINT
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    INSERT INTO public.admin_cache_generations AS g (path, generation, updated_at)
+    VALUES (p_path, 1, NOW())
+    ON CONFLICT (path) DO UPDATE
+    SET generation = g.generation + 1, updated_at = NOW()
+    RETURNING generation;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.bump_admin_cache_generation(TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.bump_admin_cache_generation(TEXT) TO service_role;
@@ -0,0 +1,77 @@
+-- Indexed user search for the admin panel (/api/admin/users)
+-- Run this in your Supabase SQL Editor (safe to re-run)
+--
+-- Trigram indexes let ILIKE '%term%' on email and names use an index, and
+-- admin_search_users returns one page of users, the total match count and
+-- each user's latest subscription in a single call.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_profiles_email_trgm ON public.profiles USING gin (email gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_profiles_first_name_trgm ON public.profiles USING gin (first_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_profiles_last_name_trgm ON public.profiles USING gin (last_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_profiles_created_at ON public.profiles(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_user_subscriptions_user_created ON public.user_subscriptions(user_id, created_at DESC);
+
+CREATE OR REPLACE FUNCTION public.admin_search_users(
+    p_search TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 50,
+    p_offset INTEGER DEFAULT 0
+) RETURNS JSONB
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    WITH params AS (
+        -- Treat the search term literally: escape LIKE wildcards
+        SELECT CASE
+            WHEN COALESCE(btrim(p_search), '') = '' THEN NULL
+            ELSE '%' || replace(replace(replace(btrim(p_search), '\', '\\'), '%', '\%'), '_', '\_') || '%'
+        END AS pattern
+    ),
+    matched AS (
+        SELECT p.id, p.email, p.first_name, p.last_name, p.role, p.created_at
+        FROM public.profiles p, params
+        WHERE params.pattern IS NULL
+           OR p.email ILIKE params.pattern
+           OR p.first_name ILIKE params.pattern
+           OR p.last_name ILIKE params.pattern
+    ),
+    page AS (
+        SELECT *
+        FROM matched
+        ORDER BY created_at DESC NULLS LAST, id
+        LIMIT GREATEST(p_limit, 0) OFFSET GREATEST(p_offset, 0)
+    )
+    SELECT jsonb_build_object(
+        'total', (SELECT COUNT(*) FROM matched),
+        'users', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'id', page.id,
+                'email', page.email,
+                'first_name', page.first_name,
+                'last_name', page.last_name,
+                'role', page.role,
+                'created_at', page.created_at,
+                'subscription_status', sub.status,
+                'current_period_start', sub.current_period_start,
+                'current_period_end', sub.current_period_end,
+                'plan_name', plan.name
+            ) ORDER BY page.created_at DESC NULLS LAST, page.id)
+            FROM page
+            LEFT JOIN LATERAL (
+                SELECT s.status, s.plan_id, s.current_period_start, s.current_period_end
+                FROM public.user_subscriptions s
+                WHERE s.user_id = page.id
+                ORDER BY s.created_at DESC NULLS LAST
+                LIMIT 1
+            ) sub ON true
+            LEFT JOIN public.subscription_plans plan ON plan.id::TEXT = sub.plan_id::TEXT
+        ), '[]'::jsonb)
+    );
+$$;
+
+-- Only the backend (service role) may search users
+REVOKE EXECUTE ON FUNCTION public.admin_search_users(TEXT, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.admin_search_users(TEXT, INTEGER, INTEGER) TO service_role;
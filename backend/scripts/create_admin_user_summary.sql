@@ -0,0 +1,120 @@
+-- Single-call user summary for the admin user details dialog
+-- Run this in your Supabase SQL Editor (safe to re-run)
+--
+-- admin_user_summary returns the profile, latest subscription with its plan,
+-- activity counts, last-activity timestamps and slim recent-activity lists in
+-- one round trip. Full records are loaded on drill-down through
+-- /api/admin/users/<user_id>/records/<record_type>.
+
+DO $$
+BEGIN
+    IF to_regclass('public.detection_history') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_detection_history_user_created
+            ON public.detection_history(user_id, created_at DESC);
+    END IF;
+    IF to_regclass('public.meal_plans') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_meal_plans_user_created
+            ON public.meal_plans(user_id, created_at DESC);
+    END IF;
+    IF to_regclass('public.usage_tracking') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_usage_tracking_user_date
+            ON public.usage_tracking(user_id, usage_date DESC);
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.admin_user_summary(
+    p_user_id UUID,
+    p_recent_limit INTEGER DEFAULT 20
+) RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_profile JSONB;
+    v_subscription JSONB;
+    v_detections JSONB := '[]'::jsonb;
+    v_meal_plans JSONB := '[]'::jsonb;
+    v_usage JSONB := '[]'::jsonb;
+    v_counts JSONB := '{}'::jsonb;
+    v_last_activity JSONB := '{}'::jsonb;
+    v_count BIGINT;
+    v_last TIMESTAMPTZ;
+BEGIN
+    SELECT to_jsonb(p) INTO v_profile FROM public.profiles p WHERE p.id = p_user_id;
+    IF v_profile IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    -- Latest subscription, shaped like select('*, subscription_plans(*)')
+    SELECT to_jsonb(s) || jsonb_build_object('subscription_plans', to_jsonb(plan))
+    INTO v_subscription
+    FROM public.user_subscriptions s
+    LEFT JOIN public.subscription_plans plan ON plan.id::TEXT = s.plan_id::TEXT
+    WHERE s.user_id = p_user_id
+    ORDER BY s.created_at DESC NULLS LAST
+    LIMIT 1;
+
+    IF to_regclass('public.detection_history') IS NOT NULL THEN
+        SELECT COUNT(*), MAX(created_at) INTO v_count, v_last
+        FROM public.detection_history WHERE user_id = p_user_id;
+        v_counts := v_counts || jsonb_build_object('detections', v_count);
+        v_last_activity := v_last_activity || jsonb_build_object('detections', v_last);
+
+        SELECT COALESCE(jsonb_agg(d ORDER BY d.created_at DESC), '[]'::jsonb) INTO v_detections
+        FROM (
+            SELECT id, analysis_id, recipe_type, detected_foods, created_at
+            FROM public.detection_history
+            WHERE user_id = p_user_id
+            ORDER BY created_at DESC
+            LIMIT p_recent_limit
+        ) d;
+    END IF;
+
+    IF to_regclass('public.meal_plans') IS NOT NULL THEN
+        SELECT COUNT(*), MAX(created_at) INTO v_count, v_last
+        FROM public.meal_plans WHERE user_id = p_user_id;
+        v_counts := v_counts || jsonb_build_object('meal_plans', v_count);
+        v_last_activity := v_last_activity || jsonb_build_object('meal_plans', v_last);
+
+        SELECT COALESCE(jsonb_agg(m ORDER BY m.created_at DESC), '[]'::jsonb) INTO v_meal_plans
+        FROM (
+            SELECT id, name, start_date, end_date, created_at
+            FROM public.meal_plans
+            WHERE user_id = p_user_id
+            ORDER BY created_at DESC
+            LIMIT p_recent_limit
+        ) m;
+    END IF;
+
+    IF to_regclass('public.usage_tracking') IS NOT NULL THEN
+        SELECT COUNT(*), MAX(usage_date) INTO v_count, v_last
+        FROM public.usage_tracking WHERE user_id = p_user_id;
+        v_counts := v_counts || jsonb_build_object('usage', v_count);
+        v_last_activity := v_last_activity || jsonb_build_object('usage', v_last);
+
+        SELECT COALESCE(jsonb_agg(u ORDER BY u.usage_date DESC), '[]'::jsonb) INTO v_usage
+        FROM (
+            SELECT feature_name, usage_date, usage_count
+            FROM public.usage_tracking
+            WHERE user_id = p_user_id
+            ORDER BY usage_date DESC
+            LIMIT p_recent_limit
+        ) u;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'profile', v_profile,
+        'subscription', v_subscription,
+        'summary', jsonb_build_object('counts', v_counts, 'last_activity', v_last_activity),
+        'detection_history', v_detections,
+        'meal_plans', v_meal_plans,
+        'usage_tracking', v_usage
+    );
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.admin_user_summary(UUID, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.admin_user_summary(UUID, INTEGER) TO service_role;
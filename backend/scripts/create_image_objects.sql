@@ -0,0 +1,42 @@
+-- Content-addressed image index for detection uploads
+-- Run this in your Supabase SQL Editor (safe to re-run)
+--
+-- Uploaded images are stored once per user at
+-- detection_images/<user_id>/sha256/<hash>.<ext>. This table records which
+-- hashes already exist so repeat uploads (re-scans, client retries) skip the
+-- Storage upload and reuse the existing URL.
+
+CREATE TABLE IF NOT EXISTS public.image_objects (
+    user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    content_hash TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    path TEXT NOT NULL,
+    public_url TEXT NOT NULL,
+    content_type TEXT,
+    size_bytes BIGINT,
+    upload_count INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    last_uploaded_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (user_id, content_hash)
+);
+
+-- Only the backend (service role) reads or writes the index
+ALTER TABLE public.image_objects ENABLE ROW LEVEL SECURITY;
+
+-- Count a repeat upload that reused an existing object
+CREATE OR REPLACE FUNCTION public.touch_image_object(
+    p_user_id UUID,
+    p_content_hash TEXT
+) RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    UPDATE public.image_objects
+    SET upload_count = upload_count + 1,
+        last_uploaded_at = NOW()
+    WHERE user_id = p_user_id AND content_hash = p_content_hash;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.touch_image_object(UUID, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.touch_image_object(UUID, TEXT) TO service_role;
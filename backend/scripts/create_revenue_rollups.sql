@@ -0,0 +1,83 @@
+-- Daily revenue rollups for the admin revenue metrics
+-- Run this in your Supabase SQL Editor (safe to re-run)
+--
+-- A trigger on payment_transactions keeps one row per (day, currency) with the
+-- total and count of successful payments, so the dashboard sums a handful of
+-- rows instead of every transaction.
+
+CREATE TABLE IF NOT EXISTS public.revenue_daily (
+    day DATE NOT NULL,
+    currency TEXT NOT NULL,
+    total NUMERIC(14,2) NOT NULL DEFAULT 0,
+    transaction_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (day, currency)
+);
+
+ALTER TABLE public.revenue_daily ENABLE ROW LEVEL SECURITY;
+
+-- Add (or with a negative sign, remove) one payment from its bucket
+CREATE OR REPLACE FUNCTION public.bump_revenue_daily(
+    p_day DATE,
+    p_currency TEXT,
+    p_amount NUMERIC,
+    p_count INTEGER
+) RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    INSERT INTO public.revenue_daily (day, currency, total, transaction_count)
+    VALUES (p_day, COALESCE(p_currency, 'USD'), p_amount, p_count)
+    ON CONFLICT (day, currency) DO UPDATE SET
+        total = public.revenue_daily.total + EXCLUDED.total,
+        transaction_count = public.revenue_daily.transaction_count + EXCLUDED.transaction_count,
+        updated_at = NOW();
+END;
+$$;
+
+-- Only successful payments count; status changes move a payment in or out
+CREATE OR REPLACE FUNCTION public.revenue_daily_on_payment()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'success' THEN
+        PERFORM public.bump_revenue_daily(
+            COALESCE(OLD.created_at, NOW())::DATE, OLD.currency, -COALESCE(OLD.amount, 0), -1
+        );
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'success' THEN
+        PERFORM public.bump_revenue_daily(
+            COALESCE(NEW.created_at, NOW())::DATE, NEW.currency, COALESCE(NEW.amount, 0), 1
+        );
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_revenue_daily_on_payment ON public.payment_transactions;
+CREATE TRIGGER trg_revenue_daily_on_payment
+    AFTER INSERT OR DELETE OR UPDATE OF status, amount, currency, created_at ON public.payment_transactions
+    FOR EACH ROW EXECUTE FUNCTION public.revenue_daily_on_payment();
+
+-- Backfill from existing payments (rebuilds the rollups from scratch)
+TRUNCATE public.revenue_daily;
+
+INSERT INTO public.revenue_daily (day, currency, total, transaction_count)
+SELECT
+    COALESCE(created_at, NOW())::DATE,
+    COALESCE(currency, 'USD'),
+    SUM(COALESCE(amount, 0)),
+    COUNT(*)
+FROM public.payment_transactions
+WHERE status = 'success'
+GROUP BY 1, 2;
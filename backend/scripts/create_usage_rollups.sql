@@ -0,0 +1,296 @@
+-- Daily usage rollups for /api/admin/metrics/usage
+-- Run this in your Supabase SQL Editor (safe to re-run)
+--
+-- Triggers on detection_history, meal_plans and usage_tracking keep one row per
+-- (day, source, feature) with the event count and distinct active users, so the
+-- admin dashboard reads a few dozen rows instead of the raw tables. Inserts add
+-- to the rollups and deletes take back out, so removing history keeps them exact.
+--
+-- There is no all-sources rollup row: every write would queue on that one row
+-- per day. All-source totals are summed from the per-source rows when read, and
+-- distinct users across sources are counted from usage_daily_active_users.
+
+-- One row per day, source and feature
+CREATE TABLE IF NOT EXISTS public.usage_daily_rollups (
+    day DATE NOT NULL,
+    source TEXT NOT NULL,           -- 'detection_history', 'meal_plans' or 'usage_tracking'
+    feature_name TEXT NOT NULL,     -- usage_tracking.feature_name, otherwise the source name
+    event_count BIGINT NOT NULL DEFAULT 0,
+    active_users INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (day, source, feature_name)
+);
+
+-- Who was active on each day, used to keep active_users distinct. Rows with
+-- source 'any' record activity in any source (one row per user, not a counter).
+CREATE TABLE IF NOT EXISTS public.usage_daily_active_users (
+    day DATE NOT NULL,
+    source TEXT NOT NULL,
+    feature_name TEXT NOT NULL,
+    user_id UUID NOT NULL,
+    PRIMARY KEY (day, source, feature_name, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_usage_daily_active_users_any
+    ON public.usage_daily_active_users(day, user_id) WHERE source = 'any';
+
+ALTER TABLE public.usage_daily_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.usage_daily_active_users ENABLE ROW LEVEL SECURITY;
+
+-- Rollups from before all-source totals were derived on read
+DELETE FROM public.usage_daily_rollups WHERE source = 'any';
+
+-- Record (or with a negative delta, remove) events for a user on a day
+CREATE OR REPLACE FUNCTION public.bump_usage_rollup(
+    p_day DATE,
+    p_source TEXT,
+    p_feature_name TEXT,
+    p_user_id UUID,
+    p_delta BIGINT
+) RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_new_user INTEGER := 0;
+BEGIN
+    IF p_user_id IS NOT NULL AND p_delta >= 0 THEN
+        INSERT INTO public.usage_daily_active_users (day, source, feature_name, user_id)
+        VALUES (p_day, p_source, p_feature_name, p_user_id)
+        ON CONFLICT DO NOTHING;
+        GET DIAGNOSTICS v_new_user = ROW_COUNT;
+
+        INSERT INTO public.usage_daily_active_users (day, source, feature_name, user_id)
+        VALUES (p_day, 'any', 'any', p_user_id)
+        ON CONFLICT DO NOTHING;
+    END IF;
+
+    INSERT INTO public.usage_daily_rollups (day, source, feature_name, event_count, active_users)
+    VALUES (p_day, p_source, p_feature_name, GREATEST(p_delta, 0), v_new_user)
+    ON CONFLICT (day, source, feature_name) DO UPDATE SET
+        event_count = GREATEST(public.usage_daily_rollups.event_count + p_delta, 0),
+        active_users = public.usage_daily_rollups.active_users + EXCLUDED.active_users,
+        updated_at = NOW();
+END;
+$$;
+
+-- Whether a user still has activity on a day, in one source (and feature) or in any
+CREATE OR REPLACE FUNCTION public.usage_user_active_on(
+    p_day DATE,
+    p_user_id UUID,
+    p_source TEXT DEFAULT NULL,
+    p_feature_name TEXT DEFAULT NULL
+) RETURNS BOOLEAN
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF (p_source IS NULL OR p_source = 'detection_history')
+            AND to_regclass('public.detection_history') IS NOT NULL THEN
+        IF EXISTS (
+            SELECT 1 FROM public.detection_history
+            WHERE user_id = p_user_id AND created_at >= p_day AND created_at < p_day + 1
+        ) THEN
+            RETURN TRUE;
+        END IF;
+    END IF;
+
+    IF (p_source IS NULL OR p_source = 'meal_plans')
+            AND to_regclass('public.meal_plans') IS NOT NULL THEN
+        IF EXISTS (
+            SELECT 1 FROM public.meal_plans
+            WHERE user_id = p_user_id AND created_at >= p_day AND created_at < p_day + 1
+        ) THEN
+            RETURN TRUE;
+        END IF;
+    END IF;
+
+    IF (p_source IS NULL OR p_source = 'usage_tracking')
+            AND to_regclass('public.usage_tracking') IS NOT NULL THEN
+        IF EXISTS (
+            SELECT 1 FROM public.usage_tracking
+            WHERE user_id = p_user_id AND usage_date = p_day
+              AND (p_feature_name IS NULL OR COALESCE(feature_name, 'unknown') = p_feature_name)
+        ) THEN
+            RETURN TRUE;
+        END IF;
+    END IF;
+
+    RETURN FALSE;
+END;
+$$;
+
+-- After a source row is deleted, drop the user from the day's active users
+-- once nothing else keeps them there
+CREATE OR REPLACE FUNCTION public.release_usage_rollup_user(
+    p_day DATE,
+    p_source TEXT,
+    p_feature_name TEXT,
+    p_user_id UUID
+) RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_removed INTEGER;
+BEGIN
+    IF p_user_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    IF NOT public.usage_user_active_on(p_day, p_user_id, p_source, p_feature_name) THEN
+        DELETE FROM public.usage_daily_active_users
+        WHERE day = p_day AND source = p_source AND feature_name = p_feature_name AND user_id = p_user_id;
+        GET DIAGNOSTICS v_removed = ROW_COUNT;
+
+        IF v_removed > 0 THEN
+            UPDATE public.usage_daily_rollups
+            SET active_users = GREATEST(active_users - 1, 0), updated_at = NOW()
+            WHERE day = p_day AND source = p_source AND feature_name = p_feature_name;
+        END IF;
+
+        IF NOT public.usage_user_active_on(p_day, p_user_id) THEN
+            DELETE FROM public.usage_daily_active_users
+            WHERE day = p_day AND source = 'any' AND feature_name = 'any' AND user_id = p_user_id;
+        END IF;
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.usage_rollup_on_activity()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM public.bump_usage_rollup(
+            COALESCE(OLD.created_at, NOW())::DATE, TG_TABLE_NAME, TG_TABLE_NAME, OLD.user_id, -1
+        );
+        PERFORM public.release_usage_rollup_user(
+            COALESCE(OLD.created_at, NOW())::DATE, TG_TABLE_NAME, TG_TABLE_NAME, OLD.user_id
+        );
+        RETURN OLD;
+    END IF;
+
+    PERFORM public.bump_usage_rollup(
+        COALESCE(NEW.created_at, NOW())::DATE, TG_TABLE_NAME, TG_TABLE_NAME, NEW.user_id, 1
+    );
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.usage_rollup_on_usage_tracking()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_delta BIGINT;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM public.bump_usage_rollup(
+            OLD.usage_date, 'usage_tracking', COALESCE(OLD.feature_name, 'unknown'), OLD.user_id,
+            -COALESCE(OLD.usage_count, 0)
+        );
+        PERFORM public.release_usage_rollup_user(
+            OLD.usage_date, 'usage_tracking', COALESCE(OLD.feature_name, 'unknown'), OLD.user_id
+        );
+        RETURN OLD;
+    END IF;
+
+    IF TG_OP = 'UPDATE' THEN
+        v_delta := COALESCE(NEW.usage_count, 0) - COALESCE(OLD.usage_count, 0);
+    ELSE
+        v_delta := COALESCE(NEW.usage_count, 0);
+    END IF;
+
+    IF v_delta <> 0 OR TG_OP = 'INSERT' THEN
+        PERFORM public.bump_usage_rollup(
+            NEW.usage_date, 'usage_tracking', COALESCE(NEW.feature_name, 'unknown'), NEW.user_id, v_delta
+        );
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+-- Attach triggers to whichever source tables exist
+DO $$
+BEGIN
+    IF to_regclass('public.detection_history') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS trg_usage_rollup_detection_history ON public.detection_history;
+        CREATE TRIGGER trg_usage_rollup_detection_history
+            AFTER INSERT OR DELETE ON public.detection_history
+            FOR EACH ROW EXECUTE FUNCTION public.usage_rollup_on_activity();
+    END IF;
+
+    IF to_regclass('public.meal_plans') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS trg_usage_rollup_meal_plans ON public.meal_plans;
+        CREATE TRIGGER trg_usage_rollup_meal_plans
+            AFTER INSERT OR DELETE ON public.meal_plans
+            FOR EACH ROW EXECUTE FUNCTION public.usage_rollup_on_activity();
+    END IF;
+
+    IF to_regclass('public.usage_tracking') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS trg_usage_rollup_usage_tracking ON public.usage_tracking;
+        CREATE TRIGGER trg_usage_rollup_usage_tracking
+            AFTER INSERT OR DELETE OR UPDATE OF usage_count ON public.usage_tracking
+            FOR EACH ROW EXECUTE FUNCTION public.usage_rollup_on_usage_tracking();
+    END IF;
+END;
+$$;
+
+-- Distinct active users across all sources since a given day
+CREATE OR REPLACE FUNCTION public.count_active_users_since(p_start DATE)
+RETURNS BIGINT
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT COUNT(DISTINCT user_id)
+    FROM public.usage_daily_active_users
+    WHERE source = 'any' AND day >= p_start;
+$$;
+
+-- Distinct active users across all sources for each day since a given day
+CREATE OR REPLACE FUNCTION public.count_daily_active_users(p_start DATE)
+RETURNS TABLE (day DATE, users BIGINT)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT u.day, COUNT(*)
+    FROM public.usage_daily_active_users u
+    WHERE u.source = 'any' AND u.day >= p_start
+    GROUP BY u.day;
+$$;
+
+-- Backfill from existing rows (rebuilds the rollups from scratch)
+DO $$
+BEGIN
+    TRUNCATE public.usage_daily_rollups, public.usage_daily_active_users;
+
+    IF to_regclass('public.detection_history') IS NOT NULL THEN
+        PERFORM public.bump_usage_rollup(COALESCE(created_at, NOW())::DATE, 'detection_history', 'detection_history', user_id, 1)
+        FROM public.detection_history;
+    END IF;
+
+    IF to_regclass('public.meal_plans') IS NOT NULL THEN
+        PERFORM public.bump_usage_rollup(COALESCE(created_at, NOW())::DATE, 'meal_plans', 'meal_plans', user_id, 1)
+        FROM public.meal_plans;
+    END IF;
+
+    IF to_regclass('public.usage_tracking') IS NOT NULL THEN
+        PERFORM public.bump_usage_rollup(usage_date, 'usage_tracking', COALESCE(feature_name, 'unknown'), user_id, COALESCE(usage_count, 0))
+        FROM public.usage_tracking;
+    END IF;
+END;
+$$;
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Inline Detection Image Migration Script
+Moves base64 images stored in detection_history.image_data into Storage
+
+Each row with inline image data is uploaded to the content-addressed
+detection_images bucket (the same path new detections use), then
+image_url is set and image_data is cleared. Rows are read in batches
+ordered by id and the last processed id is saved to a state file after
+every batch, so the migration can be stopped and resumed at any time.
+
+Usage (from the backend directory):
+    python scripts/migrate_inline_images.py --dry-run
+    python scripts/migrate_inline_images.py --batch-size 50 --sleep 0.5
+    python scripts/migrate_inline_images.py --reset    # start again from the first row
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.supabase_service import SupabaseService
+
+DEFAULT_STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.migrate_inline_images.json')
+
+
+def load_state(path: str) -> dict:
+    """Load the saved cursor and counters, or a fresh state."""
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {'cursor': None, 'processed': 0, 'migrated': 0, 'cleared': 0, 'failed': 0, 'bytes': 0, 'failed_ids': []}
+
+
+def save_state(path: str, state: dict):
+    """Write the state atomically so an interrupted run never leaves a corrupt file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def count_remaining(supabase, cursor) -> int:
+    """Rows with inline images still to be processed after the cursor."""
+    query = supabase.table('detection_history').select('id', count='exact').not_.is_('image_data', 'null')
+    if cursor:
+        query = query.gt('id', cursor)
+    return query.limit(1).execute().count or 0
+
+
+def fetch_batch(supabase, cursor, batch_size: int) -> list:
+    """Next batch of rows with inline images, ordered by id (keyset pagination)."""
+    query = supabase.table('detection_history').select('id, user_id, image_data, image_url') \
+        .not_.is_('image_data', 'null')
+    if cursor:
+        query = query.gt('id', cursor)
+    return query.order('id').limit(batch_size).execute().data or []
+
+
+def migrate_row(supabase, service: SupabaseService, row: dict, dry_run: bool) -> tuple[str, str | None]:
+    """
+    Move one row's image to Storage.
+
+    Returns:
+        tuple[str, str | None]: ('migrated' | 'cleared' | 'failed', error_message).
+    """
+    image_data = (row.get('image_data') or '').strip()
+    update = {'image_data': None}
+    outcome = 'cleared'
+
+    # Rows that already have a Storage copy (or an empty column) only need clearing
+    if image_data and not row.get('image_url'):
+        if dry_run:
+            return 'migrated', None
+        public_url, error = service.upload_base64_image_deduplicated(image_data, 'detection_images', row['user_id'])
+        if error:
+            return 'failed', error
+        update['image_url'] = public_url
+        outcome = 'migrated'
+
+    if not dry_run:
+        try:
+            supabase.table('detection_history').update(update).eq('id', row['id']).execute()
+        except Exception as e:
+            return 'failed', str(e)
+    return outcome, None
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def migrate_inline_images(batch_size: int, limit: int, sleep_seconds: float, dry_run: bool,
+                          state_file: str, reset: bool) -> bool:
+    """Run the migration until no inline images remain (or the limit is reached)."""
+    supabase_url = os.environ.get("SUPABASE_URL")
+    supabase_service_role_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+
+    if not supabase_url or not supabase_service_role_key:
+        print("❌ Missing Supabase credentials")
+        print("Please set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY environment variables")
+        return False
+
+    service = SupabaseService(supabase_url, supabase_service_role_key)
+    supabase = service.supabase
+    print("✅ Connected to Supabase")
+
+    if reset and os.path.exists(state_file):
+        os.remove(state_file)
+    state = load_state(state_file)
+    if state['cursor']:
+        print(f"🔁 Resuming after id {state['cursor']} ({state['processed']} rows already processed)")
+
+    remaining = count_remaining(supabase, state['cursor'])
+    total = state['processed'] + (min(remaining, limit) if limit else remaining)
+    print(f"🔍 {remaining} rows with inline images to migrate{' (dry run)' if dry_run else ''}")
+
+    started = time.time()
+    processed_this_run = 0
+    while not limit or processed_this_run < limit:
+        size = min(batch_size, limit - processed_this_run) if limit else batch_size
+        rows = fetch_batch(supabase, state['cursor'], size)
+        if not rows:
+            break
+
+        for row in rows:
+            outcome, error = migrate_row(supabase, service, row, dry_run)
+            state[outcome] += 1
+            if outcome == 'failed':
+                state['failed_ids'].append(row['id'])
+                print(f"   ❌ {row['id']}: {error}")
+            elif outcome == 'migrated':
+                state['bytes'] += len(row.get('image_data') or '')
+            state['processed'] += 1
+            processed_this_run += 1
+
+        # Failed rows keep their inline image; the cursor moves past them so a
+        # resumed run doesn't retry them forever (see failed_ids in the state file)
+        state['cursor'] = rows[-1]['id']
+        if not dry_run:
+            save_state(state_file, state)
+
+        elapsed = time.time() - started
+        rate = processed_this_run / elapsed if elapsed else 0
+        eta = (total - state['processed']) / rate if rate else 0
+        percent = state['processed'] / total * 100 if total else 100
+        print(f"📦 {state['processed']}/{total} ({percent:.1f}%) | migrated {state['migrated']} | "
+              f"cleared {state['cleared']} | failed {state['failed']} | "
+              f"{state['bytes'] / (1024 * 1024):.1f} MB moved | {rate:.1f} rows/s | ETA {format_duration(eta)}")
+
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    print("=" * 60)
+    print(f"✅ Processed {processed_this_run} rows in {format_duration(time.time() - started)}")
+    if state['failed']:
+        print(f"⚠️  {state['failed']} rows failed and still hold inline images; ids are in {state_file}")
+    if dry_run:
+        print("ℹ️  Dry run: nothing was uploaded or updated")
+    return state['failed'] == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=50, help='Rows fetched per batch')
+    parser.add_argument('--limit', type=int, default=0, help='Stop after this many rows (0 = no limit)')
+    parser.add_argument('--sleep', type=float, default=0.0, help='Seconds to pause between batches')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would be migrated without changing anything')
+    parser.add_argument('--state-file', default=DEFAULT_STATE_FILE, help='Where the resume cursor is kept')
+    parser.add_argument('--reset', action='store_true', help='Ignore any saved cursor and start from the first row')
+    args = parser.parse_args()
+
+    success = migrate_inline_images(args.batch_size, args.limit, args.sleep, args.dry_run,
+                                    args.state_file, args.reset)
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
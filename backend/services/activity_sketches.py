@@ -0,0 +1,196 @@
+import os
+import atexit
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.hyperloglog import HyperLogLog
+
+# How often recorded activity is merged into the activity_sketches table
+ACTIVITY_SKETCH_FLUSH_SECONDS = float(os.environ.get('ACTIVITY_SKETCH_FLUSH_SECONDS', '60'))
+# Unflushed sketches older than this many days are dropped if flushing keeps failing
+ACTIVITY_SKETCH_RETRY_DAYS = 2
+
+ALL_FEATURES = 'any'
+
+
+def _decode_registers(value: Any) -> bytes:
+    """PostgREST returns bytea as a '\\x'-prefixed hex string."""
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    text = str(value)
+    return bytes.fromhex(text[2:] if text.startswith('\\x') else text)
+
+
+class ActivitySketchStore:
+    """
+    Per-day, per-feature HyperLogLog sketches of active users
+    (see scripts/create_activity_sketches.sql).
+
+    Activity is added to in-memory sketches and merged into the database every
+    ACTIVITY_SKETCH_FLUSH_SECONDS. Merging is a register-wise max, so several
+    workers can flush the same day without double counting. start_flusher()
+    adds a timer so idle workers still flush, and a final flush at exit.
+    """
+
+    def __init__(self, supabase_client, flush_seconds: float = ACTIVITY_SKETCH_FLUSH_SECONDS):
+        self.supabase = supabase_client
+        self.flush_seconds = flush_seconds
+        self._pending: Dict[Tuple[str, str], HyperLogLog] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._flushing = False
+        self._flusher: Optional[threading.Thread] = None
+
+    def record(self, user_id: str, feature: str, when: Optional[datetime] = None):
+        """Count a user as active today for a feature (and for 'any')."""
+        if not user_id:
+            return
+        day = (when or datetime.utcnow()).strftime('%Y-%m-%d')
+        with self._lock:
+            for key in ((day, feature or 'unknown'), (day, ALL_FEATURES)):
+                sketch = self._pending.get(key)
+                if sketch is None:
+                    sketch = self._pending[key] = HyperLogLog()
+                sketch.add(user_id)
+            due = not self._flushing and time.monotonic() - self._last_flush >= self.flush_seconds
+            if due:
+                self._flushing = True
+        if due:
+            threading.Thread(target=self._flush_in_background, daemon=True, name='activity-sketch-flush').start()
+
+    def start_flusher(self):
+        """Flush on a timer and at interpreter exit for this process (once)."""
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True, name='activity-sketch-timer')
+        self._flusher.start()
+        atexit.register(self._flush_at_exit)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            with self._lock:
+                due = bool(self._pending) and not self._flushing
+                if due:
+                    self._flushing = True
+            if due:
+                self._flush_in_background()
+
+    def _flush_at_exit(self):
+        # Gunicorn runs atexit handlers when a worker shuts down gracefully
+        if self._pending:
+            error = self.flush()
+            if error:
+                print(f"[WARNING] Activity sketch flush at exit failed: {error}")
+
+    def _flush_in_background(self):
+        try:
+            error = self.flush()
+            if error:
+                print(f"[WARNING] Activity sketch flush failed: {error}")
+        finally:
+            with self._lock:
+                self._flushing = False
+
+    def flush(self) -> Optional[str]:
+        """
+        Merge pending sketches into the database.
+
+        Returns:
+            str | None: The last error if any sketch could not be merged. Those
+            sketches are kept and retried on the next flush.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+
+        error = None
+        failed: Dict[Tuple[str, str], HyperLogLog] = {}
+        for (day, feature), sketch in pending.items():
+            try:
+                self.supabase.rpc('merge_activity_sketch', {
+                    'p_day': day,
+                    'p_feature': feature,
+                    'p_registers': '\\x' + sketch.to_bytes().hex()
+                }).execute()
+            except Exception as e:
+                error = str(e)
+                failed[(day, feature)] = sketch
+
+        if failed:
+            oldest = (datetime.utcnow() - timedelta(days=ACTIVITY_SKETCH_RETRY_DAYS)).strftime('%Y-%m-%d')
+            with self._lock:
+                for key, sketch in failed.items():
+                    if key[0] < oldest:
+                        continue
+                    if key in self._pending:
+                        sketch.merge(self._pending[key])
+                    self._pending[key] = sketch
+        return error
+
+    def _load(self, start_day: str, feature: Optional[str] = None,
+              exclude_feature: Optional[str] = None) -> Dict[Tuple[str, str], HyperLogLog]:
+        query = self.supabase.table('activity_sketches').select('day, feature, registers').gte('day', start_day)
+        if feature:
+            query = query.eq('feature', feature)
+        if exclude_feature:
+            query = query.neq('feature', exclude_feature)
+        sketches = {}
+        for row in query.execute().data or []:
+            sketches[(str(row['day'])[:10], row['feature'])] = HyperLogLog.from_bytes(_decode_registers(row['registers']))
+        return sketches
+
+    def get_active_user_metrics(self) -> tuple[dict | None, str | None]:
+        """
+        Get DAU, WAU and MAU, the previous period of each, a 7-day DAU series
+        and weekly active users per feature.
+
+        Returns:
+            tuple: (metrics, error_message). error_message is set when the
+            sketch table is not available.
+        """
+        self.flush()
+        now = datetime.utcnow()
+        days = [(now - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(60)]
+
+        try:
+            overall = self._load(days[-1], feature=ALL_FEATURES)
+            by_feature = self._load(days[6], exclude_feature=ALL_FEATURES)
+        except Exception as e:
+            return None, f"Activity sketches not available: {str(e)}"
+
+        def distinct(day_range: List[str]) -> int:
+            return HyperLogLog.union(overall[(day, ALL_FEATURES)] for day in day_range
+                                     if (day, ALL_FEATURES) in overall).count()
+
+        def change(current: int, previous: int) -> float:
+            return round(((current - previous) / previous) * 100, 2) if previous else 0
+
+        dau, dau_previous = distinct(days[0:1]), distinct(days[1:2])
+        wau, wau_previous = distinct(days[0:7]), distinct(days[7:14])
+        mau, mau_previous = distinct(days[0:30]), distinct(days[30:60])
+
+        feature_sketches: Dict[str, List[HyperLogLog]] = {}
+        for (day, feature), sketch in by_feature.items():
+            feature_sketches.setdefault(feature, []).append(sketch)
+
+        return {
+            'dau': dau,
+            'wau': wau,
+            'mau': mau,
+            'trends': {
+                'dau_previous': dau_previous,
+                'wau_previous': wau_previous,
+                'mau_previous': mau_previous,
+                'dau_change_percent': change(dau, dau_previous),
+                'wau_change_percent': change(wau, wau_previous),
+                'mau_change_percent': change(mau, mau_previous)
+            },
+            'daily_active_users': [{'date': day, 'users': distinct([day])} for day in days[:7]],
+            'feature_active_users_week': {
+                feature: HyperLogLog.union(sketches).count() for feature, sketches in feature_sketches.items()
+            }
+        }, None
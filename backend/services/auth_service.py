@@ -1,6 +1,38 @@
 import os
+import json
+import time
+import base64
+import hashlib
+from flask import has_request_context, request
 from supabase import Client # Import Client for type hinting
 from typing import Optional, Tuple
+from utils.cache import TTLCache
+
+# Optionally remember verified tokens across requests. Off by default: a cached
+# token keeps working after it is revoked (e.g. on sign-out) until the entry
+# expires. Entries never outlive the token's own exp claim.
+AUTH_TOKEN_CACHE_TTL_SECONDS = int(os.environ.get('AUTH_TOKEN_CACHE_TTL_SECONDS', '0'))
+
+# WSGI environ key a batch request uses to hand its verified token to its
+# sub-requests, so the token is checked once per batch rather than per call
+VERIFIED_TOKEN_ENVIRON_KEY = 'meallens.verified_token'
+
+
+def token_cache_key(token: str) -> str:
+    """Hash of a bearer token (with or without the 'Bearer ' prefix), used to key verified tokens."""
+    if token.startswith('Bearer '):
+        token = token[7:]
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def token_expires_in(token: str) -> Optional[float]:
+    """Seconds until a JWT's exp claim (negative once expired), or None if it has none."""
+    try:
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp']) - time.time()
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
 
 class AuthService:
     """
@@ -14,6 +46,7 @@ class AuthService:
             supabase_admin_client (Client): Supabase client initialized with service_role key.
         """
         self.supabase_admin = supabase_admin_client
+        self._verified_tokens = TTLCache(ttl_seconds=AUTH_TOKEN_CACHE_TTL_SECONDS, max_entries=10000)
         print("AuthService initialized with Supabase-only authentication.")
 
     def _verify_supabase_token(self, token: str) -> Tuple[Optional[str], str]:
@@ -44,6 +77,9 @@ class AuthService:
     def get_supabase_user_id_from_token(self, token: str) -> Tuple[Optional[str], str]:
         """
         Verifies a Supabase JWT token and returns the user ID.
+
+        Inside a batch the batch's own verification is reused; otherwise the
+        token goes to Supabase Auth unless AUTH_TOKEN_CACHE_TTL_SECONDS is set.
         
         Args:
             token (str): Supabase JWT token (with or without 'Bearer ' prefix)
@@ -59,10 +95,26 @@ class AuthService:
         if token.startswith('Bearer '):
             token = token[7:]
             
+        token_key = token_cache_key(token)
+        # Batch sub-request: the batch already verified this exact token
+        if has_request_context():
+            verified = request.environ.get(VERIFIED_TOKEN_ENVIRON_KEY)
+            if verified and verified[0] == token_key:
+                return verified[1], verified[2]
+        if AUTH_TOKEN_CACHE_TTL_SECONDS > 0:
+            cached = self._verified_tokens.get(token_key)
+            if cached:
+                return cached
+            
         # Verify Supabase token
         try:
             user_id, auth_type = self._verify_supabase_token(token)
             if user_id:
+                if AUTH_TOKEN_CACHE_TTL_SECONDS > 0:
+                    expires_in = token_expires_in(token)
+                    ttl = AUTH_TOKEN_CACHE_TTL_SECONDS if expires_in is None else min(AUTH_TOKEN_CACHE_TTL_SECONDS, expires_in)
+                    if ttl > 0:
+                        self._verified_tokens.set(token_key, (user_id, auth_type), ttl_seconds=ttl)
                 return user_id, auth_type
         except Exception as e:
             print(f"Supabase verification failed: {str(e)}")
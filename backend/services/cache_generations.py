@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How often each worker checks for invalidations published by other workers
+CACHE_GENERATION_SYNC_SECONDS = float(os.environ.get('CACHE_GENERATION_SYNC_SECONDS',
+                                                     os.environ.get('ADMIN_CACHE_SYNC_SECONDS', '2')))
+
+
+class CacheGenerations:
+    """
+    Cross-worker invalidation for in-process caches
+    (see scripts/create_admin_cache_generations.sql).
+
+    Every gunicorn worker keeps its own caches. A worker that changes shared
+    data publishes the name of what changed, which bumps a generation row.
+    Each worker reads the generations at most every sync_seconds, when one of
+    its caches is read, and calls the listeners whose names moved. Without the
+    table, invalidations stay in the worker that made them and caches fall
+    back on their TTLs.
+    """
+
+    def __init__(self, supabase_client, sync_seconds: float = CACHE_GENERATION_SYNC_SECONDS):
+        self.supabase = supabase_client
+        self.sync_seconds = sync_seconds
+        self._lock = threading.Lock()
+        self._listeners: Dict[str, Tuple[Callable[[str], bool], Callable[[str], None]]] = {}
+        self._seen: Dict[str, int] = {}
+        self._checked_at = 0.0
+        self._shared: Optional[bool] = None
+
+    def listen(self, key: str, matches: Callable[[str], bool], callback: Callable[[str], None]):
+        """Call callback(name) for every changed name that matches. Re-registering a key replaces it."""
+        with self._lock:
+            self._listeners[key] = (matches, callback)
+
+    def sync(self) -> bool:
+        """
+        Apply invalidations published by other workers since the last check.
+
+        Checks at most every sync_seconds. Returns False if the shared
+        generations are unavailable.
+        """
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.sync_seconds:
+                return self._shared is not False
+            self._checked_at = time.monotonic()
+
+        try:
+            rows = self.supabase.table('admin_cache_generations').select('path, generation').execute().data or []
+        except Exception as e:
+            with self._lock:
+                if self._shared is not False:
+                    logger.warning(f"Cache generations unavailable, invalidations are per-worker: {e}")
+                self._shared = False
+            return False
+
+        with self._lock:
+            changed = [row['path'] for row in rows if row['generation'] > self._seen.get(row['path'], 0)]
+            for row in rows:
+                self._seen[row['path']] = max(row['generation'], self._seen.get(row['path'], 0))
+            self._shared = True
+            listeners = list(self._listeners.values())
+
+        for name in changed:
+            for matches, callback in listeners:
+                if matches(name):
+                    try:
+                        callback(name)
+                    except Exception as e:
+                        logger.warning(f"Cache invalidation for {name} failed: {e}")
+        return True
+
+    def publish(self, name: str) -> bool:
+        """Bump the shared generation of name so other workers invalidate it. Returns False if that failed."""
+        try:
+            generation = self.supabase.rpc('bump_admin_cache_generation', {'p_path': name}).execute().data
+        except Exception as e:
+            logger.warning(f"Could not publish invalidation of {name}, it only applies to this worker: {e}")
+            return False
+        # The publisher invalidates its own cache directly; don't repeat it on the next sync
+        with self._lock:
+            self._seen[name] = max(int(generation or 0), self._seen.get(name, 0))
+        return True
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get sync state for monitoring."""
+        with self._lock:
+            return {
+                'shared': self._shared,
+                'sync_seconds': self.sync_seconds,
+                'generations': dict(self._seen),
+                'listeners': sorted(self._listeners)
+            }
@@ -0,0 +1,269 @@
+import os
+import csv
+import io
+import json
+import tempfile
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, IO
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet exports are disabled without pyarrow
+    pa = None
+    pq = None
+
+EXPORT_PAGE_SIZE = int(os.environ.get('EXPORT_PAGE_SIZE', '500'))
+# Streamed responses are sent in chunks of roughly this many bytes
+EXPORT_CHUNK_BYTES = int(os.environ.get('EXPORT_CHUNK_BYTES', str(64 * 1024)))
+# Parquet files are built in memory up to this size, then on disk
+EXPORT_SPOOL_BYTES = int(os.environ.get('EXPORT_SPOOL_BYTES', str(32 * 1024 * 1024)))
+# The export upper bound trails the clock by this much, so rows whose
+# created_at was set by a transaction that hadn't committed yet are picked up
+# by the next export instead of falling behind its since= bound
+EXPORT_WATERMARK_LAG_SECONDS = int(os.environ.get('EXPORT_WATERMARK_LAG_SECONDS', '300'))
+
+# Columns written by /api/admin/subscriptions/export, in order
+SUBSCRIPTION_CSV_HEADER = [
+    'User ID', 'Email', 'First Name', 'Last Name',
+    'Plan Name', 'Status', 'Start Date', 'End Date',
+    'Monthly Price', 'Created At'
+]
+SUBSCRIPTION_EXPORT_COLUMNS = (
+    'id, user_id, status, current_period_start, current_period_end, created_at, '
+    'profiles(email, first_name, last_name), subscription_plans(name, price_monthly)'
+)
+
+# Datasets served by /api/admin/export/<dataset>: table and typed columns.
+# Every table is paged by id and filtered by created_at for since= exports.
+EXPORT_DATASETS = {
+    'users': {
+        'table': 'profiles',
+        'columns': {
+            'id': 'string', 'email': 'string', 'first_name': 'string', 'last_name': 'string',
+            'role': 'string', 'country': 'string', 'currency': 'string',
+            'created_at': 'timestamp', 'updated_at': 'timestamp'
+        }
+    },
+    'subscriptions': {
+        'table': 'user_subscriptions',
+        'columns': {
+            'id': 'string', 'user_id': 'string', 'plan_id': 'string', 'status': 'string',
+            'billing_cycle': 'string', 'amount_paid': 'float', 'currency': 'string',
+            'start_date': 'timestamp', 'end_date': 'timestamp',
+            'current_period_start': 'timestamp', 'current_period_end': 'timestamp',
+            'created_at': 'timestamp', 'updated_at': 'timestamp'
+        }
+    },
+    'detections': {
+        'table': 'detection_history',
+        'columns': {
+            'id': 'string', 'user_id': 'string', 'analysis_id': 'string', 'recipe_type': 'string',
+            'detected_foods': 'string', 'created_at': 'timestamp'
+        }
+    },
+    'transactions': {
+        'table': 'payment_transactions',
+        'columns': {
+            'id': 'string', 'user_id': 'string', 'paystack_reference': 'string', 'amount': 'float',
+            'currency': 'string', 'status': 'string', 'payment_method': 'string',
+            'created_at': 'timestamp', 'updated_at': 'timestamp'
+        }
+    }
+}
+
+
+def parquet_available() -> bool:
+    """Whether pyarrow is installed for Parquet exports."""
+    return pa is not None
+
+
+class ExportService:
+    """
+    Reads large tables page by page for the admin exports.
+
+    Pages are fetched by keyset (id > last id seen) rather than by offset, so
+    each page is an index range scan and only one page is held in memory at a time.
+    """
+
+    def __init__(self, supabase_client, page_size: int = EXPORT_PAGE_SIZE):
+        self.supabase = supabase_client
+        self.page_size = page_size
+
+    def iter_rows(self, table: str, columns: str,
+                  filters: Optional[List[tuple]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every row of a table in id order.
+
+        Args:
+            table (str): Table to read.
+            columns (str): PostgREST select list; must include id.
+            filters (list): Optional (method, column, value) tuples, e.g. ('gte', 'created_at', since).
+        """
+        last_id = None
+        while True:
+            query = self.supabase.table(table).select(columns)
+            for method, column, value in filters or []:
+                query = getattr(query, method)(column, value)
+            if last_id is not None:
+                query = query.gt('id', last_id)
+            rows = query.order('id').limit(self.page_size).execute().data or []
+
+            yield from rows
+            if len(rows) < self.page_size:
+                return
+            last_id = rows[-1]['id']
+
+    def iter_subscription_csv(self) -> Iterator[str]:
+        """
+        Yield the subscriptions export as CSV text in chunks of about EXPORT_CHUNK_BYTES.
+
+        The first page is fetched before anything is yielded, so a failing
+        query raises here and can still be reported as an error response.
+        """
+        rows = self.iter_rows('user_subscriptions', SUBSCRIPTION_EXPORT_COLUMNS)
+        first = next(rows, None)
+
+        def generate():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+
+            def flush() -> str:
+                chunk = buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+                return chunk
+
+            writer.writerow(SUBSCRIPTION_CSV_HEADER)
+            if first is None:
+                yield flush()
+                return
+
+            for sub in _chain(first, rows):
+                profile = sub.get('profiles') or {}
+                plan = sub.get('subscription_plans') or {}
+                writer.writerow([
+                    sub.get('user_id', ''),
+                    profile.get('email', ''),
+                    profile.get('first_name', ''),
+                    profile.get('last_name', ''),
+                    plan.get('name', ''),
+                    sub.get('status', ''),
+                    sub.get('current_period_start', ''),
+                    sub.get('current_period_end', ''),
+                    plan.get('price_monthly', 0),
+                    sub.get('created_at', '')
+                ])
+                if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                    yield flush()
+            yield flush()
+
+        return generate()
+
+
+    def iter_dataset(self, dataset: str, since: Optional[str] = None,
+                     until: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the rows of an export dataset created in [since, until).
+
+        Args:
+            dataset (str): Key of EXPORT_DATASETS.
+            since (str): ISO timestamp; only rows created at or after it are returned.
+            until (str): ISO timestamp; rows created at or after it are left for the next export.
+        """
+        spec = EXPORT_DATASETS[dataset]
+        filters = []
+        if since:
+            filters.append(('gte', 'created_at', since))
+        if until:
+            filters.append(('lt', 'created_at', until))
+        return self.iter_rows(spec['table'], ', '.join(spec['columns']), filters)
+
+    def iter_ndjson(self, dataset: str, since: Optional[str] = None,
+                    until: Optional[str] = None) -> Iterator[str]:
+        """
+        Yield a dataset as newline-delimited JSON in chunks of about EXPORT_CHUNK_BYTES.
+
+        Like iter_subscription_csv, the first page is fetched before this returns.
+        """
+        rows = self.iter_dataset(dataset, since, until)
+        first = next(rows, None)
+
+        def generate():
+            if first is None:
+                return
+            lines: List[str] = []
+            size = 0
+            for row in _chain(first, rows):
+                line = json.dumps(row, default=str) + '\n'
+                lines.append(line)
+                size += len(line)
+                if size >= EXPORT_CHUNK_BYTES:
+                    yield ''.join(lines)
+                    lines, size = [], 0
+            if lines:
+                yield ''.join(lines)
+
+        return generate()
+
+    def write_parquet(self, dataset: str, since: Optional[str] = None,
+                      until: Optional[str] = None) -> IO[bytes]:
+        """
+        Write a dataset to a Parquet file with one row group per page.
+
+        The file is spooled to disk once it outgrows memory, and is returned
+        rewound and ready to send. Requires pyarrow.
+        """
+        if pa is None:
+            raise RuntimeError('pyarrow is not installed')
+
+        columns = EXPORT_DATASETS[dataset]['columns']
+        schema = pa.schema([(name, _ARROW_TYPES[kind]()) for name, kind in columns.items()])
+        output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+
+        with pq.ParquetWriter(output, schema, compression='snappy') as writer:
+            page: List[Dict[str, Any]] = []
+            for row in self.iter_dataset(dataset, since, until):
+                page.append(row)
+                if len(page) >= self.page_size:
+                    writer.write_table(_to_arrow_table(page, columns, schema))
+                    page = []
+            if page:
+                writer.write_table(_to_arrow_table(page, columns, schema))
+
+        output.seek(0)
+        return output
+
+
+_ARROW_TYPES = {
+    'string': lambda: pa.string(),
+    'float': lambda: pa.float64(),
+    'timestamp': lambda: pa.timestamp('us', tz='UTC')
+}
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+
+def _to_arrow_table(rows: List[Dict[str, Any]], columns: Dict[str, str], schema) -> 'pa.Table':
+    """Convert a page of PostgREST rows into a typed Arrow table."""
+    arrays = {}
+    for name, kind in columns.items():
+        values = [row.get(name) for row in rows]
+        if kind == 'timestamp':
+            values = [_parse_timestamp(value) for value in values]
+        elif kind == 'float':
+            values = [float(value) if value is not None else None for value in values]
+        else:
+            values = [value if value is None or isinstance(value, str) else json.dumps(value, default=str)
+                      for value in values]
+        arrays[name] = values
+    return pa.Table.from_pydict(arrays, schema=schema)
+
+
+def _chain(first: Dict[str, Any], rest: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    yield first
+    yield from rest
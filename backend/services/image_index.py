@@ -0,0 +1,97 @@
+import os
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from utils.cache import TTLCache
+
+IMAGE_INDEX_CACHE_TTL_SECONDS = int(os.environ.get('IMAGE_INDEX_CACHE_TTL_SECONDS', '3600'))
+IMAGE_INDEX_CACHE_MAX_ENTRIES = int(os.environ.get('IMAGE_INDEX_CACHE_MAX_ENTRIES', '10000'))
+
+
+def content_addressed_path(user_id: str, content_hash: str, extension: str = '') -> str:
+    """Deterministic Storage key for an image; identical bytes always map to the same key."""
+    return f"detection_images/{user_id}/sha256/{content_hash}{extension}"
+
+
+def image_variant_path(user_id: str, variant_key: str, name: str, extension: str = '.jpg') -> str:
+    """Deterministic Storage key for one rendition of an image (see utils.image_utils.variant_set_key)."""
+    return f"detection_images/{user_id}/variants/{variant_key}/{name}{extension}"
+
+
+class ImageIndex:
+    """
+    Existence index for content-addressed images (see scripts/create_image_objects.sql).
+
+    Lookups go through an in-process cache first, then the image_objects
+    table. Entries are scoped per user so one user's upload never reveals
+    that another user stored the same image. Re-uploads bump the row's
+    upload_count through touch_image_object.
+    """
+
+    def __init__(self, supabase_client, ttl_seconds: int = IMAGE_INDEX_CACHE_TTL_SECONDS,
+                 max_entries: int = IMAGE_INDEX_CACHE_MAX_ENTRIES):
+        self.supabase = supabase_client
+        self._cache = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._table_available = True
+
+    def lookup(self, user_id: str, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the indexed object for this user and hash, or None if it isn't stored yet."""
+        key = (user_id, content_hash)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        if not self._table_available:
+            return None
+
+        try:
+            result = self.supabase.table('image_objects').select('bucket, path, public_url, size_bytes') \
+                .eq('user_id', user_id).eq('content_hash', content_hash).limit(1).execute()
+        except Exception as e:
+            self._disable_if_missing(e)
+            return None
+        if not result.data:
+            return None
+        self._cache.set(key, result.data[0])
+        return result.data[0]
+
+    def record(self, user_id: str, content_hash: str, bucket: str, path: str, public_url: str,
+               content_type: str = None, size_bytes: int = None, existing: bool = False):
+        """
+        Add an uploaded object to the index, or bump its upload count when it was already there.
+
+        Never raises: a missing index only costs a redundant upload next time.
+        """
+        entry = {'bucket': bucket, 'path': path, 'public_url': public_url, 'size_bytes': size_bytes}
+        self._cache.set((user_id, content_hash), entry)
+        if not self._table_available:
+            return
+
+        try:
+            if existing:
+                self.supabase.rpc('touch_image_object', {
+                    'p_user_id': user_id,
+                    'p_content_hash': content_hash
+                }).execute()
+            else:
+                self.supabase.table('image_objects').upsert({
+                    'user_id': user_id,
+                    'content_hash': content_hash,
+                    'content_type': content_type,
+                    'last_uploaded_at': datetime.utcnow().isoformat(),
+                    **entry
+                }, on_conflict='user_id,content_hash').execute()
+        except Exception as e:
+            self._disable_if_missing(e)
+            print(f"[WARNING] Could not record image {content_hash[:12]} in image index: {e}")
+
+    def _disable_if_missing(self, error: Exception):
+        message = str(error)
+        if 'image_objects' in message and ('does not exist' in message or 'PGRST205' in message or '42P01' in message):
+            if self._table_available:
+                print("[WARNING] image_objects table not found; run scripts/create_image_objects.sql. "
+                      "Duplicate uploads are still detected by Storage, but not skipped.")
+            self._table_available = False
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get index cache statistics for monitoring."""
+        return {'table_available': self._table_available, 'cache': self._cache.get_status()}
@@ -0,0 +1,418 @@
+import os
+import json
+import time
+import uuid
+import fcntl
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any
+
+from utils.cache import TTLCache
+from utils.file_utils import spool_stream, STORAGE_UPLOAD_MAX_BYTES
+
+# Threads uploading detection images to Storage after the response is sent
+IMAGE_UPLOAD_WORKERS = int(os.environ.get('IMAGE_UPLOAD_WORKERS', '4'))
+# Uploads allowed to wait for a thread; beyond that the request uploads inline
+IMAGE_UPLOAD_MAX_PENDING = int(os.environ.get('IMAGE_UPLOAD_MAX_PENDING', '32'))
+# Upload attempts per pass; failed jobs are retried by the sweeper until the deadline
+IMAGE_UPLOAD_ATTEMPTS = int(os.environ.get('IMAGE_UPLOAD_ATTEMPTS', '3'))
+# Where accepted images wait for upload. Jobs survive worker restarts here; point
+# it at a persistent volume for them to survive container replacement too.
+IMAGE_UPLOAD_SPOOL_DIR = os.environ.get('IMAGE_UPLOAD_SPOOL_DIR',
+                                        os.path.join(tempfile.gettempdir(), 'meallens-image-uploads'))
+# How long an image may stay pending before it is marked failed and must be re-sent
+IMAGE_UPLOAD_DEADLINE_SECONDS = int(os.environ.get('IMAGE_UPLOAD_DEADLINE_SECONDS', '900'))
+# How often each worker retries due jobs and fails rows stuck in pending
+IMAGE_UPLOAD_SWEEP_SECONDS = float(os.environ.get('IMAGE_UPLOAD_SWEEP_SECONDS', '30'))
+# How long finished upload statuses are kept in memory for the status endpoint
+IMAGE_UPLOAD_STATUS_TTL_SECONDS = int(os.environ.get('IMAGE_UPLOAD_STATUS_TTL_SECONDS', '3600'))
+
+UPLOAD_PENDING = 'pending'
+UPLOAD_DONE = 'uploaded'
+UPLOAD_FAILED = 'failed'
+
+# Added by scripts/add_detection_image_upload_status.sql; writes drop them if missing
+STATUS_COLUMNS = ('image_upload_status', 'image_upload_requested_at')
+
+
+class ImageUploadQueue:
+    """
+    Uploads detection images to Storage after the request has been answered
+    (see scripts/add_detection_image_upload_status.sql).
+
+    The request writes the image and a small JSON job file to
+    IMAGE_UPLOAD_SPOOL_DIR and saves the detection row with
+    image_upload_status 'pending' before it responds, so an accepted image is
+    on disk rather than only in a thread. A worker thread then stores it through
+    the content-addressed path and patches input_data, image_url and
+    image_upload_status on the row.
+
+    Jobs are claimed with an flock on the job file, which the kernel releases if
+    the process dies. Every app worker runs a sweeper that retries due jobs
+    (including ones left behind by a restarted worker) and, after
+    IMAGE_UPLOAD_DEADLINE_SECONDS, marks the row 'failed' so the client can
+    re-send the image. Rows whose job was lost entirely (e.g. with a replaced
+    container) are failed by the same sweep.
+
+    Terminal statuses are also kept in memory for a while, so the status
+    endpoint can answer for recent uploads without a database read.
+    """
+
+    def __init__(self, supabase_service, workers: int = IMAGE_UPLOAD_WORKERS,
+                 max_pending: int = IMAGE_UPLOAD_MAX_PENDING, attempts: int = IMAGE_UPLOAD_ATTEMPTS,
+                 spool_dir: str = IMAGE_UPLOAD_SPOOL_DIR, deadline_seconds: int = IMAGE_UPLOAD_DEADLINE_SECONDS,
+                 sweep_seconds: float = IMAGE_UPLOAD_SWEEP_SECONDS):
+        self.supabase_service = supabase_service
+        self.workers = workers
+        self.attempts = max(1, attempts)
+        self.spool_dir = spool_dir
+        self.deadline_seconds = deadline_seconds
+        self.sweep_seconds = sweep_seconds
+        self._slots = threading.BoundedSemaphore(max(1, workers) + max_pending)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._sweeper: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self._status_columns = True
+        self._statuses = TTLCache(ttl_seconds=IMAGE_UPLOAD_STATUS_TTL_SECONDS, max_entries=10000)
+        self._stats = {'queued': 0, 'inline': 0, 'uploaded': 0, 'failed': 0, 'retries': 0,
+                       'swept_jobs': 0, 'expired_rows': 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=max(1, self.workers),
+                                                        thread_name_prefix='image-upload')
+        return self._executor
+
+    def _paths(self, analysis_id: str) -> tuple[str, str]:
+        """Image and job file for a detection. Raises ValueError unless analysis_id is a UUID."""
+        base = os.path.join(self.spool_dir, str(uuid.UUID(str(analysis_id))))
+        return f"{base}.img", f"{base}.json"
+
+    def spool(self, file, analysis_id: str,
+              max_bytes: int = STORAGE_UPLOAD_MAX_BYTES) -> tuple[dict | None, str | None]:
+        """
+        Copy an uploaded file into the spool directory, hashing it on the way.
+
+        Returns:
+            tuple: (job, None) to pass to submit (or discard), or (None, error_message).
+        """
+        image_path, _ = self._paths(analysis_id)
+        os.makedirs(self.spool_dir, exist_ok=True)
+        part_path = f"{image_path}.{os.getpid()}.part"
+        digest = hashlib.sha256()
+        with open(part_path, 'wb') as target:
+            spooled, size_or_error = spool_stream(file.stream, max_bytes=max_bytes, digest=digest, target=target)
+            if spooled is not None:
+                target.flush()
+                os.fsync(target.fileno())
+        if spooled is None:
+            self._unlink(part_path)
+            return None, size_or_error
+        return {
+            'analysis_id': str(analysis_id),
+            'part_path': part_path,
+            'size': size_or_error,
+            'content_hash': digest.hexdigest(),
+            'content_type': file.content_type or 'application/octet-stream'
+        }, None
+
+    def discard(self, job: dict):
+        """Drop a spooled image that won't be submitted (e.g. the row couldn't be saved)."""
+        self._unlink(job['part_path'])
+
+    def submit(self, job: dict, user_id: str, bucket_name: str = 'detection_images'):
+        """
+        Make a spooled image a durable upload job, then start it in the background
+        when a worker slot is free and inline otherwise.
+
+        Call this only after the detection row exists, since the job patches it.
+        """
+        analysis_id = job['analysis_id']
+        image_path, meta_path = self._paths(analysis_id)
+        os.replace(job['part_path'], image_path)
+        self._write_meta(meta_path, {
+            'analysis_id': analysis_id,
+            'user_id': user_id,
+            'bucket': bucket_name,
+            'content_hash': job['content_hash'],
+            'content_type': job['content_type'],
+            'size': job['size'],
+            'created_at': time.time(),
+            'attempts': 0,
+            'next_attempt_at': 0,
+            'last_error': None
+        })
+        self._statuses.delete(analysis_id)
+        self._dispatch(analysis_id, inline_when_full=True)
+
+    def _dispatch(self, analysis_id: str, inline_when_full: bool):
+        with self._lock:
+            if analysis_id in self._in_flight:
+                return
+            self._in_flight.add(analysis_id)
+
+        if self.workers > 0 and self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['queued'] += 1
+            try:
+                future = self._get_executor().submit(self._process, analysis_id)
+            except RuntimeError:
+                # Executor shut down (process exiting); the sweeper of the next process picks it up
+                self._slots.release()
+                with self._lock:
+                    self._in_flight.discard(analysis_id)
+                return
+            future.add_done_callback(lambda _: self._done(analysis_id, release=True))
+            return
+
+        if inline_when_full:
+            with self._lock:
+                self._stats['inline'] += 1
+            try:
+                self._process(analysis_id)
+            finally:
+                self._done(analysis_id, release=False)
+        else:
+            # Busy; the next sweep tries again
+            with self._lock:
+                self._in_flight.discard(analysis_id)
+
+    def _done(self, analysis_id: str, release: bool):
+        with self._lock:
+            self._in_flight.discard(analysis_id)
+        if release:
+            self._slots.release()
+
+    def _process(self, analysis_id: str):
+        """Upload one job while holding its lock; keep it for a retry or give up past the deadline."""
+        image_path, meta_path = self._paths(analysis_id)
+        try:
+            meta_file = open(meta_path, 'r+')
+        except FileNotFoundError:
+            return  # Finished by another worker
+        with meta_file:
+            try:
+                fcntl.flock(meta_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # Another worker is uploading it right now
+            if not os.path.exists(meta_path):
+                return  # Finished and removed while we waited for the lock
+            try:
+                meta = json.load(meta_file)
+            except ValueError:
+                return
+
+            error = self._upload(image_path, meta)
+            if error is None:
+                self._remove_job(image_path, meta_path)
+                return
+
+            meta['attempts'] += 1
+            meta['last_error'] = error
+            if time.time() - meta['created_at'] >= self.deadline_seconds or error == 'Detection not found':
+                print(f"[ERROR] Giving up on image upload for analysis {analysis_id}: {error}")
+                self._finish(meta, {'status': UPLOAD_FAILED, 'error': error}, {'image_upload_status': UPLOAD_FAILED})
+                self._remove_job(image_path, meta_path)
+                return
+
+            # Back off between sweeps, never past the deadline
+            delay = min(self.sweep_seconds * 2 ** (meta['attempts'] - 1), 300)
+            meta['next_attempt_at'] = time.time() + delay
+            print(f"[WARNING] Image upload for analysis {analysis_id} failed, retrying in {delay:.0f}s: {error}")
+            meta_file.seek(0)
+            meta_file.truncate()
+            json.dump(meta, meta_file)
+            meta_file.flush()
+
+    def _upload(self, image_path: str, meta: dict) -> str | None:
+        """Store the image and patch the row. Returns None on success, else the error."""
+        try:
+            public_url, error = None, None
+            with open(image_path, 'rb') as image:
+                for attempt in range(self.attempts):
+                    if attempt:
+                        with self._lock:
+                            self._stats['retries'] += 1
+                        time.sleep(0.5 * 2 ** (attempt - 1))
+                    image.seek(0)
+                    public_url, error = self.supabase_service.store_content_addressed(
+                        image, meta['size'], meta['content_hash'], meta['bucket'], meta['user_id'],
+                        meta['content_type'], close=False)
+                    if not error:
+                        break
+        except FileNotFoundError:
+            return "Spooled image is missing"
+        except Exception as e:
+            return str(e)
+        if error:
+            return error
+        # The row keeps the job alive until it is patched; a retry re-uses the stored object
+        return self._finish(meta, {'status': UPLOAD_DONE, 'image_url': public_url},
+                            {'input_data': public_url, 'image_url': public_url, 'image_upload_status': UPLOAD_DONE})
+
+    def _finish(self, meta: dict, status: dict, updates: dict) -> str | None:
+        success, error = self._update_row(meta['analysis_id'], meta['user_id'], updates)
+        if not success:
+            if error and 'No records updated' in error:
+                return 'Detection not found'
+            return f"Could not update detection: {error}"
+        self._statuses.set(meta['analysis_id'], {**status, 'user_id': meta['user_id']})
+        with self._lock:
+            self._stats['uploaded' if status['status'] == UPLOAD_DONE else 'failed'] += 1
+        return None
+
+    def _update_row(self, analysis_id: str, user_id: str, updates: dict) -> tuple[bool, str | None]:
+        if not self._status_columns:
+            updates = {key: value for key, value in updates.items() if key not in STATUS_COLUMNS}
+            if not updates:
+                return True, None
+        success, error = self.supabase_service.update_detection_history(analysis_id, user_id, updates)
+        if not success and error and any(column in error for column in STATUS_COLUMNS):
+            print("[WARNING] detection_history upload status columns missing; "
+                  "run scripts/add_detection_image_upload_status.sql")
+            self._status_columns = False
+            return self._update_row(analysis_id, user_id, updates)
+        return success, error
+
+    def mark_pending(self, analysis_id: str, user_id: str) -> tuple[bool, str | None]:
+        """Reset a detection to 'pending' before its image is re-sent."""
+        self._statuses.delete(analysis_id)
+        return self._update_row(analysis_id, user_id, {
+            'image_upload_status': UPLOAD_PENDING,
+            'image_upload_requested_at': datetime.utcnow().isoformat()
+        })
+
+    def has_job(self, analysis_id: str) -> bool:
+        """Whether this machine still holds an upload job for the detection."""
+        return os.path.exists(self._paths(analysis_id)[1])
+
+    def _write_meta(self, meta_path: str, meta: dict):
+        tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, meta_path)
+
+    def _remove_job(self, image_path: str, meta_path: str):
+        self._unlink(image_path)
+        self._unlink(meta_path)
+
+    @staticmethod
+    def _unlink(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def start_sweeper(self):
+        """Start the background sweep for this process (once)."""
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(target=self._sweep_loop, daemon=True, name='image-upload-sweep')
+        self._sweeper.start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_seconds)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[WARNING] Image upload sweep failed: {e}")
+
+    def sweep(self):
+        """
+        Retry spooled jobs that are due (including ones orphaned by a dead worker),
+        clear abandoned partial spools, and fail rows left pending past the deadline.
+        """
+        now = time.time()
+        try:
+            names = os.listdir(self.spool_dir)
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            path = os.path.join(self.spool_dir, name)
+            if name.endswith('.json'):
+                try:
+                    with open(path) as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    continue  # Removed or being rewritten; next sweep
+                if meta.get('next_attempt_at', 0) <= now:
+                    with self._lock:
+                        self._stats['swept_jobs'] += 1
+                    self._dispatch(meta['analysis_id'], inline_when_full=False)
+            elif name.endswith(('.part', '.tmp')):
+                try:
+                    if now - os.path.getmtime(path) > self.deadline_seconds:
+                        self._unlink(path)  # The request died while spooling
+                except FileNotFoundError:
+                    pass
+
+        if not self._status_columns:
+            return
+        # Jobs that lived on a lost disk never come back; give their rows a terminal status
+        cutoff = datetime.utcnow() - timedelta(seconds=self.deadline_seconds + 2 * self.sweep_seconds)
+        try:
+            result = self.supabase_service.supabase.table('detection_history') \
+                .update({'image_upload_status': UPLOAD_FAILED}) \
+                .eq('image_upload_status', UPLOAD_PENDING) \
+                .lt('image_upload_requested_at', cutoff.isoformat()).execute()
+        except Exception as e:
+            if any(column in str(e) for column in STATUS_COLUMNS):
+                self._status_columns = False
+            raise
+        if result.data:
+            with self._lock:
+                self._stats['expired_rows'] += len(result.data)
+            print(f"[WARNING] Marked {len(result.data)} stuck image uploads as failed")
+
+    def get_status(self, analysis_id: str, user_id: str) -> tuple[dict | None, str | None]:
+        """
+        Upload status for one detection: {'status', 'image_url'} (and 'error' when known).
+
+        Returns:
+            tuple: (status, None), or (None, error_message) if the detection isn't found.
+        """
+        cached = self._statuses.get(analysis_id)
+        if cached is not None and cached['user_id'] == user_id:
+            return {key: value for key, value in cached.items() if key != 'user_id'}, None
+
+        try:
+            try:
+                result = self.supabase_service.supabase.table('detection_history') \
+                    .select('image_url, image_upload_status').eq('analysis_id', analysis_id) \
+                    .eq('user_id', user_id).limit(1).execute()
+            except Exception as e:
+                if 'image_upload_status' not in str(e):
+                    raise
+                result = self.supabase_service.supabase.table('detection_history') \
+                    .select('image_url').eq('analysis_id', analysis_id).eq('user_id', user_id).limit(1).execute()
+        except Exception as e:
+            return None, str(e)
+        if not result.data:
+            return None, "Detection not found"
+
+        row = result.data[0]
+        status = row.get('image_upload_status')
+        if status is None:
+            # Rows saved before uploads were deferred had the image by the time they were written
+            status = UPLOAD_DONE if row.get('image_url') else None
+        return {'status': status, 'image_url': row.get('image_url')}, None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get upload counters for monitoring."""
+        with self._lock:
+            stats = {'workers': self.workers, 'in_flight': len(self._in_flight), **self._stats}
+        try:
+            stats['spooled_jobs'] = sum(1 for name in os.listdir(self.spool_dir) if name.endswith('.json'))
+        except FileNotFoundError:
+            stats['spooled_jobs'] = 0
+        return stats
@@ -2,10 +2,12 @@ import os
 import requests
 from datetime import datetime, timedelta
 from typing import Dict, Optional
+from services.plan_catalog import PlanCatalog
 
 class PaymentService:
-    def __init__(self, supabase_client):
+    def __init__(self, supabase_client, plan_catalog: Optional[PlanCatalog] = None):
         self.supabase = supabase_client
+        self.plan_catalog = plan_catalog or PlanCatalog(supabase_client)
         self.paystack_secret_key = os.getenv('PAYSTACK_SECRET_KEY')
         self.paystack_public_key = os.getenv('PAYSTACK_PUBLIC_KEY')
         
@@ -192,12 +194,10 @@ class PaymentService:
                 return {'status': False, 'message': 'User ID not found in metadata'}
             
             # Get plan details
-            plan_result = self.supabase.table('subscription_plans').select('*').eq('id', plan_id).execute()
-            if not plan_result.data:
+            plan = self.plan_catalog.get_plan(plan_id)
+            if not plan:
                 return {'status': False, 'message': 'Plan not found'}
             
-            plan = plan_result.data[0]
-            
             # Calculate subscription end date
             billing_cycle = plan.get('billing_cycle', 'monthly')
             if billing_cycle == 'weekly':
@@ -387,17 +387,12 @@ class PaymentService:
 
             subscription = subscription_result.data[0]
             
-            # Get plan details from subscription_plans table
-            try:
-                plan_result = self.supabase.table('subscription_plans').select('name, display_name').eq('id', subscription.get('plan_id')).execute()
-                if plan_result.data:
-                    plan_name = plan_result.data[0].get('name', 'free')
-                    plan_display_name = plan_result.data[0].get('display_name', 'Free Plan')
-                else:
-                    plan_name = 'free'
-                    plan_display_name = 'Free Plan'
-            except Exception as plan_error:
-                print(f"subscription_plans table not available: {plan_error}")
+            # Get plan details from the plan catalog
+            plan = self.plan_catalog.get_plan(subscription.get('plan_id'))
+            if plan:
+                plan_name = plan.get('name', 'free')
+                plan_display_name = plan.get('display_name', 'Free Plan')
+            else:
                 plan_name = 'free'
                 plan_display_name = 'Free Plan'
             
@@ -461,16 +456,8 @@ class PaymentService:
                 print(f"usage_tracking table not available: {usage_table_error}")
                 current_usage = 0
 
-            # Get plan limits from subscription_plans table
-            try:
-                plan_result = self.supabase.table('subscription_plans').select('limits').eq('id', plan_id).execute()
-                if plan_result.data:
-                    plan_limits = plan_result.data[0].get('limits', {})
-                else:
-                    plan_limits = self._get_plan_limits('free')
-            except Exception as plan_error:
-                print(f"subscription_plans table not available: {plan_error}")
-                plan_limits = self._get_plan_limits('free')
+            # Get plan limits from the plan catalog
+            plan_limits = self._get_plan_limits(plan_id)
 
             limit = plan_limits.get(feature_name, 0)
 
@@ -559,26 +546,4 @@ class PaymentService:
 
     def _get_plan_limits(self, plan_name: str) -> Dict:
         """Get feature limits for a plan"""
-        limits = {
-            'free': {
-                    'food_detection': 5,
-                    'meal_planning': 3,
-                'ai_kitchen': 5
-            },
-            'weekly': {
-                'food_detection': -1,
-                'meal_planning': -1,
-                'ai_kitchen': -1
-            },
-            'two_weeks': {
-                'food_detection': -1,
-                'meal_planning': -1,
-                'ai_kitchen': -1
-            },
-            'monthly': {
-                'food_detection': -1,
-                'meal_planning': -1,
-                'ai_kitchen': -1
-            }
-        }
-        return limits.get(plan_name, limits['free']) 
\ No newline at end of file
+        return self.plan_catalog.get_limits(plan_name) or {}
@@ -0,0 +1,157 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+import logging
+from typing import Optional, Dict, Any, List
+
+from config.subscription import DEFAULT_PLANS, PLAN_CATALOG_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class PlanCatalog:
+    """
+    In-memory catalog of subscription plans.
+
+    Plans are read from the subscription_plans table once at startup and kept
+    in memory. Every plan is loaded, including deactivated ones, so payments
+    and subscriptions on a plan retired after checkout still resolve;
+    get_plans() lists only the active ones. The snapshot is re-read when it
+    is older than the TTL or when invalidate() bumps the version, so pricing
+    edits show up without a restart. Lookups by plan id or plan name are
+    plain dict reads.
+
+    With shared cache generations, invalidate() also publishes a
+    'plan_catalog' generation, and every worker bumps its own version when
+    it next syncs (at most every CACHE_GENERATION_SYNC_SECONDS).
+    """
+
+    GENERATION = 'plan_catalog'
+
+    def __init__(self, supabase_client, ttl_seconds: int = PLAN_CATALOG_TTL_SECONDS, generations=None):
+        self.supabase = supabase_client
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._version = 0
+        self._loaded_version = -1
+        self._generations = generations
+        if generations:
+            generations.listen(self.GENERATION, lambda name: name == self.GENERATION, lambda _: self._bump())
+
+    def load(self) -> Dict[str, Any]:
+        """Read all plans from the database and swap in a new snapshot."""
+        with self._lock:
+            return self._load_locked()
+
+    def _bump(self):
+        with self._lock:
+            self._version += 1
+
+    def invalidate(self) -> bool:
+        """
+        Bump the catalog version so the next read reloads the plans, in this
+        worker and (through the shared generations) every other one.
+
+        Returns:
+            bool: Whether the other workers were notified.
+        """
+        self._bump()
+        return self._generations.publish(self.GENERATION) if self._generations else False
+
+    def _load_locked(self) -> Dict[str, Any]:
+        source = 'database'
+        try:
+            result = self.supabase.table('subscription_plans').select('*').execute()
+            plans = result.data or []
+        except Exception as e:
+            logger.warning(f"Could not load subscription plans, using defaults: {e}")
+            plans = []
+
+        if not plans:
+            if self._snapshot and self._snapshot['source'] == 'database':
+                # Keep serving the last good copy rather than falling back to defaults
+                self._snapshot['loaded_at'] = time.time()
+                self._loaded_version = self._version
+                return self._snapshot
+            plans = copy.deepcopy(DEFAULT_PLANS)
+            source = 'defaults'
+
+        by_key: Dict[str, Dict[str, Any]] = {}
+        for plan in plans:
+            by_key[str(plan.get('name'))] = plan
+        for plan in plans:
+            # Ids win over names if the two ever collide
+            by_key[str(plan.get('id'))] = plan
+
+        # Plans without is_active (the defaults) count as active
+        active_plans = [plan for plan in plans if plan.get('is_active', True) is not False]
+
+        body = json.dumps(active_plans, sort_keys=True, default=str)
+        etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+        self._snapshot = {
+            'plans': plans,
+            'active_plans': active_plans,
+            'by_key': by_key,
+            'etag': etag,
+            'source': source,
+            'loaded_at': time.time()
+        }
+        self._loaded_version = self._version
+        logger.info(f"Plan catalog loaded {len(plans)} plans ({len(active_plans)} active) "
+                    f"from {source} (etag {etag[:8]})")
+        return self._snapshot
+
+    def _current(self) -> Dict[str, Any]:
+        if self._generations:
+            self._generations.sync()
+        snapshot = self._snapshot
+        if (snapshot is not None and self._loaded_version == self._version
+                and time.time() - snapshot['loaded_at'] < self.ttl_seconds):
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if (snapshot is not None and self._loaded_version == self._version
+                    and time.time() - snapshot['loaded_at'] < self.ttl_seconds):
+                return snapshot
+            return self._load_locked()
+
+    def get_plans(self) -> List[Dict[str, Any]]:
+        """Return the active plans (the public listing)."""
+        return self._current()['active_plans']
+
+    def get_etag(self) -> str:
+        """Return a content hash of the active plans, suitable for an ETag header."""
+        return self._current()['etag']
+
+    def get_plan(self, plan_key: str) -> Optional[Dict[str, Any]]:
+        """Look up a plan by id or name, whether or not it is still active."""
+        if plan_key is None:
+            return None
+        return self._current()['by_key'].get(str(plan_key))
+
+    def get_limits(self, plan_key: str) -> Dict[str, Any]:
+        """Return the feature limits for a plan, falling back to the free plan."""
+        plan = self.get_plan(plan_key) or self.get_plan('free')
+        if plan and plan.get('limits') is not None:
+            return plan['limits']
+        return DEFAULT_PLANS[0]['limits']
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get catalog status for monitoring."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {'loaded': False}
+        return {
+            'loaded': True,
+            'plan_count': len(snapshot['plans']),
+            'active_plan_count': len(snapshot['active_plans']),
+            'source': snapshot['source'],
+            'etag': snapshot['etag'],
+            'age_seconds': round(time.time() - snapshot['loaded_at'], 1),
+            'ttl_seconds': self.ttl_seconds
+        }
@@ -0,0 +1,109 @@
+import os
+from typing import Optional, Dict, Any
+
+from utils.cache import TTLCache
+
+PROFILE_CACHE_TTL_SECONDS = int(os.environ.get('PROFILE_CACHE_TTL_SECONDS', '120'))
+PROFILE_CACHE_MAX_ENTRIES = int(os.environ.get('PROFILE_CACHE_MAX_ENTRIES', '5000'))
+
+
+def format_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a profiles row into the payload returned by GET /api/profile."""
+    return {
+        'id': profile.get('id'),
+        'email': profile.get('email'),
+        'first_name': profile.get('first_name'),
+        'last_name': profile.get('last_name'),
+        'display_name': f"{profile.get('first_name', '')} {profile.get('last_name', '')}".strip(),
+        'role': profile.get('role', 'user'),
+        'gender': profile.get('gender'),
+        'age': profile.get('age'),
+        'mobile_number': profile.get('mobile_number'),
+        'has_health_condition': profile.get('has_health_condition', False),
+        'health_conditions': profile.get('health_conditions', []),
+        'allergies': profile.get('allergies', []),
+        'dietary_preferences': profile.get('dietary_preferences', []),
+        'medical_history': profile.get('medical_history', []),
+        'emergency_contact': profile.get('emergency_contact', {}),
+        'currency': profile.get('currency'),
+        'country': profile.get('country'),
+        'state': profile.get('state'),
+        'city': profile.get('city'),
+        'address': profile.get('address'),
+        'postal_code': profile.get('postal_code'),
+        'payment_methods': profile.get('payment_methods', []),
+        'has_sickness': profile.get('has_sickness', False),
+        'sickness_type': profile.get('sickness_type', ''),
+        'date_of_birth': profile.get('date_of_birth'),
+        'weight': profile.get('weight'),
+        'height': profile.get('height'),
+        'created_at': profile.get('created_at'),
+        'updated_at': profile.get('updated_at')
+    }
+
+
+class ProfileCache:
+    """
+    Per-user cache of profiles rows and their pre-shaped API payload.
+
+    Writes go through put(..., changed=True) with the row returned by the
+    database, so this worker never serves a value older than its own last
+    update. Once share() connects the cache to the shared cache generations,
+    a profile write in any worker clears every other worker's profile cache
+    within CACHE_GENERATION_SYNC_SECONDS. Reads only check the generations at
+    that interval, so cache hits normally skip the database. Without the
+    generations table, other workers converge within the TTL.
+    """
+
+    GENERATION = 'profiles'
+
+    def __init__(self, ttl_seconds: int = PROFILE_CACHE_TTL_SECONDS,
+                 max_entries: int = PROFILE_CACHE_MAX_ENTRIES):
+        self._cache = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._generations = None
+
+    def share(self, generations):
+        """Publish writes to, and apply writes from, other workers through a CacheGenerations."""
+        self._generations = generations
+        generations.listen(self.GENERATION, lambda name: name == self.GENERATION, lambda _: self._cache.clear())
+
+    def _sync(self):
+        if self._generations:
+            self._generations.sync()
+
+    def _publish(self):
+        if self._generations:
+            self._generations.publish(self.GENERATION)
+
+    def get_row(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached profiles row for a user."""
+        self._sync()
+        entry = self._cache.get(user_id)
+        return entry['row'] if entry else None
+
+    def get_formatted(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached GET /api/profile payload for a user."""
+        self._sync()
+        entry = self._cache.get(user_id)
+        return entry['profile'] if entry else None
+
+    def put(self, user_id: str, row: Dict[str, Any], changed: bool = False) -> Dict[str, Any]:
+        """
+        Store a profiles row and return its shaped payload.
+
+        Pass changed=True after a write so other workers drop their copies.
+        """
+        profile = format_profile(row)
+        self._cache.set(user_id, {'row': row, 'profile': profile})
+        if changed:
+            self._publish()
+        return profile
+
+    def invalidate(self, user_id: str):
+        """Drop the cached profile for a user, here and in other workers."""
+        self._cache.delete(user_id)
+        self._publish()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get cache statistics for monitoring."""
+        return self._cache.get_status()
@@ -0,0 +1,169 @@
+import os
+import threading
+from datetime import datetime, date, timedelta
+from typing import Dict, Any, List, Optional
+
+# Days (counting today) whose buckets may still change, e.g. from late webhooks.
+# Anything older is treated as closed and cached for the life of the process.
+REVENUE_OPEN_DAYS = int(os.environ.get('REVENUE_OPEN_DAYS', '2'))
+REVENUE_PAGE_SIZE = 1000
+
+
+class RevenueAggregator:
+    """
+    Revenue totals from the revenue_daily rollup table
+    (see scripts/create_revenue_rollups.sql).
+
+    Closed days are fetched once and kept in memory, and only the open days are
+    re-read on each call. Daily, weekly and monthly buckets are all built from
+    the same per-day, per-currency totals.
+    """
+
+    def __init__(self, supabase_client, open_days: int = REVENUE_OPEN_DAYS):
+        self.supabase = supabase_client
+        self.open_days = max(1, open_days)
+        self._lock = threading.Lock()
+        # day (YYYY-MM-DD) -> currency -> {'total': float, 'count': int}
+        self._closed: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Closed days before this date have been loaded
+        self._closed_through: Optional[date] = None
+
+    def invalidate(self):
+        """Drop the closed-day cache, e.g. after a refund changes an old payment."""
+        with self._lock:
+            self._closed = {}
+            self._closed_through = None
+
+    def _fetch_days(self, start: Optional[date], end: Optional[date]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Read rollup rows with start <= day < end, paging past the row limit."""
+        days: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        offset = 0
+        while True:
+            query = self.supabase.table('revenue_daily').select('day, currency, total, transaction_count')
+            if start:
+                query = query.gte('day', start.isoformat())
+            if end:
+                query = query.lt('day', end.isoformat())
+            rows = query.order('day').range(offset, offset + REVENUE_PAGE_SIZE - 1).execute().data or []
+
+            for row in rows:
+                bucket = days.setdefault(str(row['day'])[:10], {})
+                bucket[row.get('currency') or 'USD'] = {
+                    'total': float(row.get('total') or 0),
+                    'count': int(row.get('transaction_count') or 0)
+                }
+            if len(rows) < REVENUE_PAGE_SIZE:
+                return days
+            offset += REVENUE_PAGE_SIZE
+
+    def get_daily_totals(self) -> tuple[Dict[str, Dict[str, Dict[str, Any]]] | None, str | None]:
+        """
+        Get per-day, per-currency totals for all time.
+
+        Returns:
+            tuple: (days, error_message). error_message is set when the rollup
+            table is not available so callers can fall back to raw transactions.
+        """
+        try:
+            cutoff = datetime.utcnow().date() - timedelta(days=self.open_days - 1)
+
+            with self._lock:
+                if self._closed_through is None or self._closed_through < cutoff:
+                    newly_closed = self._fetch_days(self._closed_through, cutoff)
+                    self._closed.update(newly_closed)
+                    self._closed_through = cutoff
+                closed = dict(self._closed)
+
+            closed.update(self._fetch_days(cutoff, None))
+            return closed, None
+        except Exception as e:
+            return None, f"Revenue rollups not available: {str(e)}"
+
+    def get_revenue_metrics(self, period: str = 'monthly', days: int = 30) -> tuple[dict | None, str | None]:
+        """
+        Bucket revenue for the last `days` days by period ('daily', 'weekly' or 'monthly').
+
+        Returns:
+            tuple: (metrics, error_message) in the /api/admin/metrics/revenue shape,
+            with a per-currency breakdown alongside each bucket.
+        """
+        daily, error = self.get_daily_totals()
+        if error:
+            return None, error
+
+        start_day = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d')
+        buckets: Dict[str, Dict[str, Any]] = {}
+        by_currency: Dict[str, float] = {}
+
+        for day, currencies in daily.items():
+            if day < start_day:
+                continue
+            day_date = datetime.strptime(day, '%Y-%m-%d')
+            if period == 'daily':
+                key = day
+            elif period == 'weekly':
+                key = day_date.strftime('%Y-W%W')
+            else:  # monthly
+                key = day_date.strftime('%Y-%m')
+
+            bucket = buckets.setdefault(key, {'period': key, 'revenue': 0.0, 'transactions': 0, 'by_currency': {}})
+            for currency, totals in currencies.items():
+                bucket['revenue'] += totals['total']
+                bucket['transactions'] += totals['count']
+                bucket['by_currency'][currency] = bucket['by_currency'].get(currency, 0.0) + totals['total']
+                by_currency[currency] = by_currency.get(currency, 0.0) + totals['total']
+
+        revenue_list: List[Dict[str, Any]] = sorted(buckets.values(), key=lambda x: x['period'])
+
+        # Calculate monthly growth if we have enough data
+        monthly_growth = 0
+        if len(revenue_list) >= 2 and period == 'monthly':
+            current_month = revenue_list[-1]['revenue']
+            previous_month = revenue_list[-2]['revenue']
+            if previous_month > 0:
+                monthly_growth = ((current_month - previous_month) / previous_month) * 100
+
+        return {
+            'period': period,
+            'revenue_data': revenue_list,
+            'total_revenue': sum(bucket['revenue'] for bucket in revenue_list),
+            'revenue_by_currency': by_currency,
+            'monthly_growth': monthly_growth
+        }, None
+
+    def get_revenue_summary(self) -> tuple[dict | None, str | None]:
+        """
+        Get all-time and current-month revenue.
+
+        Returns:
+            tuple: ({'total_revenue', 'monthly_revenue', 'revenue_by_currency'}, error_message)
+        """
+        daily, error = self.get_daily_totals()
+        if error:
+            return None, error
+
+        current_month = datetime.utcnow().strftime('%Y-%m')
+        total_revenue = 0.0
+        monthly_revenue = 0.0
+        by_currency: Dict[str, float] = {}
+        for day, currencies in daily.items():
+            for currency, totals in currencies.items():
+                total_revenue += totals['total']
+                by_currency[currency] = by_currency.get(currency, 0.0) + totals['total']
+                if day.startswith(current_month):
+                    monthly_revenue += totals['total']
+
+        return {
+            'total_revenue': total_revenue,
+            'monthly_revenue': monthly_revenue,
+            'revenue_by_currency': by_currency
+        }, None
+
+    def get_status(self) -> Dict[str, Any]:
+        """Report cache state for monitoring."""
+        with self._lock:
+            return {
+                'closed_days_cached': len(self._closed),
+                'closed_through': self._closed_through.isoformat() if self._closed_through else None,
+                'open_days': self.open_days
+            }
@@ -1,8 +1,19 @@
 import os
 import json
+import hashlib
 from supabase import create_client, Client
 from werkzeug.datastructures import FileStorage
 from datetime import datetime
+from services.profile_cache import ProfileCache
+from services.cache_generations import CacheGenerations
+from services.activity_sketches import ActivitySketchStore
+from services.image_index import ImageIndex, content_addressed_path, image_variant_path
+from services.image_uploads import ImageUploadQueue
+from utils.file_utils import STORAGE_UPLOAD_MAX_BYTES, spool_base64, spool_stream
+from utils.image_utils import sniff_image_format
+
+# File extension for content-addressed image keys, by sniffed format
+IMAGE_FORMAT_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp'}
 
 class SupabaseService:
     def __init__(self, supabase_url: str, supabase_key: str = None):
@@ -15,6 +26,7 @@ class SupabaseService:
         """
         print(f"[DEBUG] Initializing Supabase client with URL: {supabase_url}")
         self.supabase_url = supabase_url  # Make supabase_url accessible as an attribute
+        self.profile_cache = ProfileCache()
         
         if not supabase_url:
             error_msg = "Supabase URL is required"
@@ -45,6 +57,11 @@ class SupabaseService:
             
             # Create the client with the correct schema
             self.supabase: Client = create_client(supabase_url, supabase_key)
+            self.cache_generations = CacheGenerations(self.supabase)
+            self.profile_cache.share(self.cache_generations)
+            self.activity_sketches = ActivitySketchStore(self.supabase)
+            self.image_index = ImageIndex(self.supabase)
+            self.image_uploads = ImageUploadQueue(self)
             
             # Store the key for verification
             self._service_role_key = supabase_key
@@ -89,108 +106,237 @@ class SupabaseService:
                 print(f"[ERROR] Error details: {e.details}")
             raise
 
-    def upload_file(self, file: FileStorage, bucket_name: str, file_path: str) -> tuple[str | None, str | None]:
+    def _store_object(self, body, bucket_name: str, file_path: str, content_type: str,
+                      upsert: bool = False) -> tuple[str | None, str | None]:
+        """Uploads bytes or a BufferedReader to Supabase Storage and returns its public URL."""
+        options = {"content-type": content_type}
+        if upsert:
+            options["upsert"] = "true"
+        response = self.supabase.storage.from_(bucket_name).upload(
+            path=file_path,
+            file=body,
+            file_options=options
+        )
+
+        # storage3 < 0.8 returns the httpx response; newer versions raise on failure
+        status_code = getattr(response, 'status_code', 200)
+        if status_code != 200:
+            return None, f"Upload failed with status {status_code}"
+
+        public_url = self.supabase.storage.from_(bucket_name).get_public_url(file_path)
+        return public_url, None
+
+    def _upload_spooled(self, spooled, bucket_name: str, file_path: str, content_type: str,
+                        upsert: bool = False, close: bool = True) -> tuple[str | None, str | None]:
+        """
+        Uploads a spooled temporary file to Supabase Storage and closes it (unless close=False).
+
+        storage3 streams BufferedReader bodies in chunks, so the file is handed
+        over as a reader on the temp file's descriptor rather than as bytes.
+        """
+        try:
+            with open(spooled.fileno(), 'rb', closefd=False) as reader:
+                return self._store_object(reader, bucket_name, file_path, content_type, upsert=upsert)
+        except Exception as e:
+            return None, f"Upload exception: {str(e)}"
+        finally:
+            if close:
+                spooled.close()
+
+    def upload_file(self, file: FileStorage, bucket_name: str, file_path: str,
+                    max_bytes: int = STORAGE_UPLOAD_MAX_BYTES) -> tuple[str | None, str | None]:
         """
         Uploads a file to Supabase Storage.
 
+        The request stream is copied to a temporary file in STORAGE_UPLOAD_CHUNK_BYTES
+        chunks and uploaded from there, so memory per upload doesn't grow with file size.
+
         Args:
             file (FileStorage): The file object from Flask's request.files.
             bucket_name (str): The name of the Supabase Storage bucket.
             file_path (str): The path within the bucket where the file will be stored.
+            max_bytes (int): Largest file accepted (STORAGE_UPLOAD_MAX_BYTES by default).
 
         Returns:
             tuple[str | None, str | None]: (public_url, None) on success, (None, error_message) on failure.
         """
         try:
-            # Read file content
-            file_content = file.read()
-            
-            # Upload to Supabase Storage
-            response = self.supabase.storage.from_(bucket_name).upload(file_path, file_content, {
-                "content-type": file.content_type
-            })
-            
-            if response.status_code == 200:
-                # Get public URL
-                public_url_response = self.supabase.storage.from_(bucket_name).get_public_url(file_path)
-                return public_url_response, None
+            spooled, size_or_error = spool_stream(file.stream, max_bytes=max_bytes)
+            if spooled is None:
+                return None, size_or_error
+
+            return self._upload_spooled(spooled, bucket_name, file_path,
+                                        file.content_type or 'application/octet-stream')
+        except Exception as e:
+            return None, str(e)
+
+    def store_content_addressed(self, spooled, size: int, content_hash: str, bucket_name: str, user_id: str,
+                                fallback_content_type: str, close: bool = True) -> tuple[str | None, str | None]:
+        """
+        Stores a spooled image at its content-addressed key unless the image index
+        already has it for this user. Closes spooled unless close=False (to retry with it).
+        """
+        existing = self.image_index.lookup(user_id, content_hash)
+        if existing:
+            if close:
+                spooled.close()
+            self.image_index.record(user_id, content_hash, existing['bucket'], existing['path'],
+                                    existing['public_url'], existing=True)
+            print(f"[INFO] Duplicate image {content_hash[:12]} for user {user_id}, reusing stored copy")
+            return existing['public_url'], None
+
+        image_format = sniff_image_format(spooled.read(16))
+        spooled.seek(0)
+        extension = IMAGE_FORMAT_EXTENSIONS.get(image_format, '')
+        content_type = f"image/{image_format.lower()}" if image_format else fallback_content_type
+        path = content_addressed_path(user_id, content_hash, extension)
+
+        public_url, error = self._upload_spooled(spooled, bucket_name, path, content_type, close=close)
+        already_stored = bool(error) and ('Duplicate' in error or 'already exists' in error or '409' in error)
+        if already_stored:
+            # Stored before the index knew about it (index missing, or a concurrent upload won)
+            public_url, error = self.supabase.storage.from_(bucket_name).get_public_url(path), None
+        if error:
+            return None, error
+
+        self.image_index.record(user_id, content_hash, bucket_name, path, public_url,
+                                content_type=content_type, size_bytes=size)
+        return public_url, None
+
+    def upload_image_deduplicated(self, file: FileStorage, bucket_name: str, user_id: str,
+                                  max_bytes: int = STORAGE_UPLOAD_MAX_BYTES) -> tuple[str | None, str | None]:
+        """
+        Uploads an image to content-addressed Storage, skipping the upload if this
+        user already stored the same bytes.
+
+        The key is the SHA-256 of the file, computed while it is spooled to disk,
+        plus an extension taken from the sniffed image format, so re-scans and
+        client retries of the same photo map to the same object.
+
+        Args:
+            file (FileStorage): The file object from Flask's request.files.
+            bucket_name (str): The name of the Supabase Storage bucket.
+            user_id (str): Owner of the image; duplicates are detected per user.
+            max_bytes (int): Largest file accepted (STORAGE_UPLOAD_MAX_BYTES by default).
+
+        Returns:
+            tuple[str | None, str | None]: (public_url, None) on success, (None, error_message) on failure.
+        """
+        try:
+            digest = hashlib.sha256()
+            spooled, size_or_error = spool_stream(file.stream, max_bytes=max_bytes, digest=digest)
+            if spooled is None:
+                return None, size_or_error
+            return self.store_content_addressed(spooled, size_or_error, digest.hexdigest(), bucket_name, user_id,
+                                                file.content_type or 'application/octet-stream')
+        except Exception as e:
+            return None, str(e)
+
+    def upload_base64_image_deduplicated(self, image_data: str, bucket_name: str, user_id: str,
+                                         max_bytes: int = STORAGE_UPLOAD_MAX_BYTES) -> tuple[str | None, str | None]:
+        """
+        Like upload_image_deduplicated, for base64 image data (with or without a data URL prefix).
+
+        Returns:
+            tuple[str | None, str | None]: (public_url, None) on success, (None, error_message) on failure.
+        """
+        try:
+            offset = image_data.index(',') + 1 if image_data.startswith('data:') else 0
+            digest = hashlib.sha256()
+            spooled, size_or_error = spool_base64(image_data, offset=offset, max_bytes=max_bytes, digest=digest)
+            if spooled is None:
+                return None, size_or_error
+            return self.store_content_addressed(spooled, size_or_error, digest.hexdigest(), bucket_name, user_id,
+                                                'image/jpeg')
+        except Exception as e:
+            return None, str(e)
+
+    def upload_image_variants(self, user_id: str, processed: dict,
+                              bucket_name: str = 'detection_images') -> tuple[dict | None, str | None]:
+        """
+        Stores the renditions from process_image_variants under deterministic keys.
+
+        Keys are detection_images/<user_id>/variants/<variant_key>/<name><extension>, so
+        re-submitting the same image reuses the stored set (via the image index)
+        and a retry after a partial failure overwrites rather than duplicates.
+
+        Args:
+            user_id (str): Owner of the image.
+            processed (dict): Result of utils.image_utils.process_image_variants.
+            bucket_name (str): The name of the Supabase Storage bucket.
+
+        Returns:
+            tuple[dict | None, str | None]: ({name: {'url', 'width', 'height'}}, None) on
+            success, (None, error_message) on failure.
+        """
+        try:
+            variant_key = processed['variant_key']
+            extension = processed.get('extension', '.jpg')
+            content_type = processed.get('mime_type', 'image/jpeg')
+            storage = self.supabase.storage.from_(bucket_name)
+            urls = {}
+            existing = self.image_index.lookup(user_id, variant_key)
+            if existing:
+                for name in processed['variants']:
+                    urls[name] = storage.get_public_url(image_variant_path(user_id, variant_key, name, extension))
+                self.image_index.record(user_id, variant_key, existing['bucket'], existing['path'],
+                                        existing['public_url'], existing=True)
+                print(f"[INFO] Duplicate image {processed['content_hash'][:12]} for user {user_id}, reusing stored variants")
             else:
-                return None, f"Upload failed with status {response.status_code}: {response.json()}"
+                for name, variant in processed['variants'].items():
+                    url, error = self._store_object(variant['bytes'], bucket_name,
+                                                    image_variant_path(user_id, variant_key, name, extension),
+                                                    content_type, upsert=True)
+                    if error:
+                        return None, f"Failed to upload {name} variant: {error}"
+                    urls[name] = url
+                largest = max(processed['variants'], key=lambda name: processed['variants'][name]['output_bytes'])
+                self.image_index.record(user_id, variant_key, bucket_name,
+                                        image_variant_path(user_id, variant_key, largest, extension),
+                                        urls[largest], content_type=content_type, size_bytes=processed['output_bytes'])
+
+            return {
+                name: {'url': urls[name], 'width': variant['width'], 'height': variant['height']}
+                for name, variant in processed['variants'].items()
+            }, None
         except Exception as e:
             return None, str(e)
 
-    def upload_base64_image(self, image_data: str, bucket_name: str, file_path: str) -> tuple[str | None, str | None]:
+    def upload_base64_image(self, image_data: str, bucket_name: str, file_path: str,
+                            max_bytes: int = STORAGE_UPLOAD_MAX_BYTES) -> tuple[str | None, str | None]:
         """
         Uploads a base64 encoded image to Supabase Storage.
 
+        The base64 text is decoded chunk by chunk into a temporary file, so the
+        decoded image is never held in memory alongside the string.
+
         Args:
             image_data (str): Base64 encoded image data (with or without data:image prefix).
             bucket_name (str): The name of the Supabase Storage bucket.
             file_path (str): The path within the bucket where the file will be stored.
+            max_bytes (int): Largest decoded image accepted (STORAGE_UPLOAD_MAX_BYTES by default).
 
         Returns:
             tuple[str | None, str | None]: (public_url, None) on success, (None, error_message) on failure.
         """
         try:
-            import base64
-            
-            print(f"[DEBUG] Input image_data type: {type(image_data)}")
-            print(f"[DEBUG] Input image_data length: {len(image_data) if image_data else 0}")
-            print(f"[DEBUG] Input starts with 'data:': {str(image_data).startswith('data:') if image_data else False}")
-            
             # Handle data URL format (data:image/jpeg;base64,...)
             if image_data.startswith('data:image'):
-                # Extract the actual base64 data
-                header, encoded = image_data.split(',', 1)
+                # Skip the header by offset rather than split(), which would copy the payload
+                offset = image_data.index(',') + 1
                 # Extract content type from header (e.g., "data:image/jpeg;base64")
-                content_type = header.split(';')[0].replace('data:', '')
-                print(f"[DEBUG] Detected content type: {content_type}")
-                print(f"[DEBUG] Base64 data length: {len(encoded)}")
+                content_type = image_data[5:offset - 1].split(';')[0]
             else:
                 # Assume it's just base64 data
-                encoded = image_data
+                offset = 0
                 content_type = 'image/jpeg'  # Default to JPEG
-                print(f"[DEBUG] Using default content type: {content_type}")
-            
-            # Decode base64 to bytes
-            try:
-                file_content = base64.b64decode(encoded)
-                print(f"[DEBUG] Decoded file size: {len(file_content)} bytes")
-            except Exception as decode_error:
-                print(f"[DEBUG] Base64 decode error: {decode_error}")
-                return None, f"Failed to decode base64 image: {decode_error}"
-            
-            # Upload to Supabase Storage
-            try:
-                print(f"[DEBUG] About to upload:")
-                print(f"[DEBUG] - bucket_name: {bucket_name}")
-                print(f"[DEBUG] - file_path: {file_path}")
-                print(f"[DEBUG] - file_content type: {type(file_content)}")
-                print(f"[DEBUG] - content_type: {content_type}")
-                
-                # Upload with correct syntax for storage3 v0.7.7
-                response = self.supabase.storage.from_(bucket_name).upload(
-                    path=file_path,
-                    file=file_content,
-                    file_options={"content-type": content_type, "upsert": True}
-                )
-                print(f"[DEBUG] Upload call completed")
-                
-                print(f"[DEBUG] Upload response type: {type(response)}")
-                print(f"[DEBUG] Upload status: {response.status_code if hasattr(response, 'status_code') else 'Unknown'}")
-                
-                # Check if upload was successful (should be httpx.Response with status 200)
-                if hasattr(response, 'status_code') and response.status_code == 200:
-                    # Get public URL
-                    public_url = self.supabase.storage.from_(bucket_name).get_public_url(file_path)
-                    print(f"[DEBUG] Generated public URL: {public_url}")
-                    return public_url, None
-                else:
-                    error_msg = f"Upload failed with status: {response.status_code if hasattr(response, 'status_code') else 'Unknown'}"
-                    return None, error_msg
-                    
-            except Exception as upload_error:
-                return None, f"Upload exception: {str(upload_error)}"
+
+            spooled, size_or_error = spool_base64(image_data, offset=offset, max_bytes=max_bytes)
+            if spooled is None:
+                return None, size_or_error
+            print(f"[DEBUG] Uploading {size_or_error} byte {content_type} image to {bucket_name}/{file_path}")
+
+            return self._upload_spooled(spooled, bucket_name, file_path, content_type, upsert=True)
         except Exception as e:
             print(f"Error uploading base64 image: {str(e)}")
             return None, str(e)
@@ -248,22 +394,42 @@ class SupabaseService:
         except Exception as e:
             raise Exception(f"Error storing AI session data: {str(e)}")
 
+    def record_activity(self, user_id: str, feature_name: str):
+        """
+        Count a user as active for a feature in the HyperLogLog activity sketches.
+
+        Never raises: activity metrics must not break the request that produced them.
+        """
+        try:
+            self.activity_sketches.record(user_id, feature_name)
+        except Exception as e:
+            print(f"[WARNING] Could not record activity for {feature_name}: {e}")
+
     def save_detection_history(self, user_id: str, recipe_type: str, suggestion: str = None,
                               instructions: str = None, ingredients: str = None, detected_foods: str = None,
                               analysis_id: str = None, youtube: str = None, google: str = None, resources: str = None,
-                              input_data: str = None, image_data: str = None
+                              input_data: str = None, image_data: str = None, image_url: str = None,
+                              image_variants: dict = None, image_upload_status: str = None
                             ) -> tuple[bool, str | None]:
         try:
-            # Handle image data - prevent database errors from large images
-            image_url = None
+            # Images live in Storage; the row only keeps the URL
+            if image_data and image_data.strip() and not image_url:
+                image_url, upload_error = self.upload_base64_image_deduplicated(image_data, 'detection_images', user_id)
+                if image_url:
+                    image_data = None
+                else:
+                    print(f"[WARNING] Could not move detection image to Storage: {upload_error}")
+            elif image_url:
+                image_data = None
+
+            # Inline fallback when Storage is unavailable - prevent database errors from large images
             if image_data and image_data.strip():
                 # Check if image data is too large for database storage
                 if len(image_data) > 20000:  # ~20KB limit to prevent index errors
-                    print(f"[INFO] Image data too large ({len(image_data)} chars), not storing in database")
-                    print(f"[INFO] Food detection will work without image storage")
+                    print(f"[WARNING] Image data too large ({len(image_data)} chars) to store inline, detection saved without image")
                     image_data = None  # Don't store large images that break the database
                 else:
-                    print(f"[INFO] Image data size acceptable ({len(image_data)} chars), storing in database")
+                    print(f"[INFO] Storing image inline ({len(image_data)} chars) until Storage is available")
             
             # Use direct table insert with correct schema
             insert_data = {
@@ -278,7 +444,10 @@ class SupabaseService:
                 'resources': resources,
                 'input_data': input_data,
                 'image_data': image_data,  # Keep base64 as fallback
-                'image_url': image_url     # Add the new image URL field
+                'image_url': image_url,    # Full-size image in Storage
+                'image_variants': image_variants,  # {medium, full: {url, width, height}}
+                'image_upload_status': image_upload_status,  # 'pending' until a deferred upload lands
+                'image_upload_requested_at': datetime.utcnow().isoformat() if image_upload_status else None
             }
             
             # Add analysis_id only if provided
@@ -288,10 +457,24 @@ class SupabaseService:
             insert_data = {k: v for k, v in insert_data.items() if v is not None}
             
             print(f"[DEBUG] Inserting detection history with data: {insert_data}")
-            result = self.supabase.table('detection_history').insert(insert_data).execute()
+            while True:
+                try:
+                    result = self.supabase.table('detection_history').insert(insert_data).execute()
+                    break
+                except Exception as e:
+                    # Columns not added yet (scripts/add_detection_image_variants.sql,
+                    # scripts/add_detection_image_upload_status.sql); save without them
+                    missing = next((column for column in ('image_variants', 'image_upload_status',
+                                                          'image_upload_requested_at')
+                                    if column in insert_data and column in str(e)), None)
+                    if missing is None:
+                        raise
+                    print(f"[WARNING] detection_history.{missing} missing, saving without it: {e}")
+                    insert_data.pop(missing)
             
             if result.data:
                 print(f"[DEBUG] Successfully inserted detection history: {result.data}")
+                self.record_activity(user_id, 'food_detection')
                 return True, None
             else:
                 error = "No data returned from insert"
@@ -451,6 +634,7 @@ class SupabaseService:
             if result.data and len(result.data) > 0:
                 # Get the inserted record (first item in the array)
                 inserted_data = result.data[0]
+                self.record_activity(user_id, 'meal_planning')
                 
                 # Return data in the format expected by frontend
                 return {
@@ -736,16 +920,118 @@ class SupabaseService:
         Returns:
             tuple: (profile_data, error_message)
         """
+        cached = self.profile_cache.get_row(user_id)
+        if cached is not None:
+            return cached, None
+
         try:
             result = self.supabase.table('profiles').select('*').eq('id', user_id).execute()
             
             if result.data and len(result.data) > 0:
+                self.profile_cache.put(user_id, result.data[0])
                 return result.data[0], None
             else:
                 return None, "Profile not found"
         except Exception as e:
             return None, str(e)
 
+    def get_profile_payload(self, user_id: str) -> tuple[dict | None, str | None]:
+        """
+        Get the shaped GET /api/profile payload for a user, creating a default
+        profile row if none exists. Cached payloads skip the database entirely;
+        profile writes in other workers drop them within a few seconds.
+
+        Args:
+            user_id (str): The user ID
+
+        Returns:
+            tuple: (profile_payload, error_message)
+        """
+        cached_profile = self.profile_cache.get_formatted(user_id)
+        if cached_profile is not None:
+            return cached_profile, None
+
+        try:
+            profile_result = self.supabase.table('profiles').select('*').eq('id', user_id).single().execute()
+            
+            if not profile_result.data:
+                # Create a default profile if none exists
+                default_profile = {
+                    'id': user_id,
+                    'email': '',  # Will be filled from auth
+                    'first_name': '',
+                    'last_name': '',
+                    'role': 'user',  # Default role
+                    'gender': '',
+                    'age': 0,
+                    'mobile_number': '',
+                    'has_health_condition': False,
+                    'health_conditions': [],
+                    'allergies': [],
+                    'dietary_preferences': [],
+                    'medical_history': [],
+                    'emergency_contact': {},
+                    'currency': 'NGN',
+                    'country': '',
+                    'state': '',
+                    'city': '',
+                    'address': '',
+                    'postal_code': '',
+                    'payment_methods': []
+                }
+                
+                # Try to get email from auth.users table
+                try:
+                    auth_result = self.supabase.auth.admin.get_user_by_id(user_id)
+                    if auth_result.user:
+                        default_profile['email'] = auth_result.user.email
+                except:
+                    pass
+                
+                # Insert default profile
+                insert_result = self.supabase.table('profiles').insert(default_profile).execute()
+                if insert_result.data:
+                    profile = insert_result.data[0]
+                else:
+                    return None, 'Failed to create profile'
+            else:
+                profile = profile_result.data
+        except Exception as e:
+            print(f"Error accessing profiles table: {str(e)}")
+            # Return a minimal profile if table doesn't exist
+            return {
+                'id': user_id,
+                'email': '',
+                'first_name': '',
+                'last_name': '',
+                'display_name': '',
+                'gender': '',
+                'age': 0,
+                'mobile_number': '',
+                'has_health_condition': False,
+                'health_conditions': [],
+                'allergies': [],
+                'dietary_preferences': [],
+                'medical_history': [],
+                'emergency_contact': {},
+                'currency': 'NGN',
+                'country': '',
+                'state': '',
+                'city': '',
+                'address': '',
+                'postal_code': '',
+                'payment_methods': [],
+                'has_sickness': False,
+                'sickness_type': '',
+                'date_of_birth': None,
+                'weight': 0,
+                'height': 0,
+                'created_at': None,
+                'updated_at': None
+            }, None
+
+        return self.profile_cache.put(user_id, profile), None
+
     def update_user_profile(self, user_id: str, update_data: dict) -> tuple[bool, str | None]:
         """
         Update user profile in the profiles table.
@@ -759,6 +1045,11 @@ class SupabaseService:
         """
         try:
             result = self.supabase.table('profiles').update(update_data).eq('id', user_id).execute()
+            if result.data:
+                self.profile_cache.put(user_id, result.data[0], changed=True)
+            else:
+                self.profile_cache.invalidate(user_id)
             return True, None
         except Exception as e:
+            self.profile_cache.invalidate(user_id)
             return False, str(e)
\ No newline at end of file
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+from typing import Dict, Any, List
+
+
+class UsageRollupService:
+    """
+    Reads the pre-aggregated daily usage rollups maintained by the triggers in
+    scripts/create_usage_rollups.sql.
+
+    Each day contributes one row per (source, feature), so a 30-day window is a
+    few dozen rows no matter how much raw activity there was. All-source totals
+    are summed from those rows here; distinct users per day across sources come
+    from count_daily_active_users.
+    """
+
+    def __init__(self, supabase_client):
+        self.supabase = supabase_client
+
+    def get_usage_metrics(self, days: int = 30) -> tuple[dict | None, str | None]:
+        """
+        Build the /api/admin/metrics/usage payload from the rollup tables.
+
+        Args:
+            days (int): Size of the reporting window in days.
+
+        Returns:
+            tuple: (metrics, error_message). error_message is set when the rollup
+            tables are missing so the caller can fall back to the raw tables.
+        """
+        try:
+            now = datetime.utcnow()
+            today = now.strftime('%Y-%m-%d')
+            start_date = (now - timedelta(days=days)).strftime('%Y-%m-%d')
+
+            result = self.supabase.table('usage_daily_rollups') \
+                .select('day, source, feature_name, event_count, active_users') \
+                .gte('day', start_date).execute()
+            rows: List[Dict[str, Any]] = result.data or []
+
+            active_result = self.supabase.rpc('count_active_users_since', {'p_start': start_date}).execute()
+            active_users_window = active_result.data or 0
+            if isinstance(active_users_window, list):
+                active_users_window = active_users_window[0] if active_users_window else 0
+
+            week_start = (now - timedelta(days=6)).strftime('%Y-%m-%d')
+            daily_result = self.supabase.rpc('count_daily_active_users', {'p_start': week_start}).execute()
+            daily_users = {str(row.get('day'))[:10]: row.get('users') or 0 for row in daily_result.data or []}
+        except Exception as e:
+            return None, f"Usage rollups not available: {str(e)}"
+
+        total_detections = 0
+        total_meal_plans = 0
+        active_users_today = 0
+        by_day: Dict[str, Dict[str, int]] = {}
+        tracked_usage: Dict[str, int] = {}
+
+        for row in rows:
+            day = str(row.get('day'))[:10]
+            source = row.get('source')
+            count = row.get('event_count') or 0
+            day_totals = by_day.setdefault(day, {'detections': 0, 'meal_plans': 0})
+
+            if source == 'detection_history':
+                total_detections += count
+                day_totals['detections'] += count
+                if day == today:
+                    active_users_today = row.get('active_users') or 0
+            elif source == 'meal_plans':
+                total_meal_plans += count
+                day_totals['meal_plans'] += count
+            elif source == 'usage_tracking':
+                feature = row.get('feature_name') or 'unknown'
+                tracked_usage[feature] = tracked_usage.get(feature, 0) + count
+
+        feature_usage = {
+            'food_detection': total_detections,
+            'meal_planning': total_meal_plans,
+            'nutrition_analysis': total_detections  # Assume same as detections
+        }
+        for feature, count in tracked_usage.items():
+            feature_usage[feature] = feature_usage.get(feature, 0) + count
+
+        # Daily usage for the last 7 days, newest first
+        daily_usage = []
+        for i in range(7):
+            date = (now - timedelta(days=i)).strftime('%Y-%m-%d')
+            day_totals = by_day.get(date, {'detections': 0, 'meal_plans': 0})
+            daily_usage.append({'date': date, **day_totals, 'users': daily_users.get(date, 0)})
+
+        return {
+            'total_detections': total_detections,
+            'total_meal_plans': total_meal_plans,
+            'active_users_today': active_users_today,
+            'active_users_week': active_users_window,
+            'feature_usage': feature_usage,
+            'daily_usage': daily_usage
+        }, None
@@ -0,0 +1,73 @@
+import os
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+FANOUT_MAX_WORKERS = int(os.environ.get('FANOUT_MAX_WORKERS', '16'))
+FANOUT_TIMEOUT_SECONDS = float(os.environ.get('FANOUT_TIMEOUT_SECONDS', '10'))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_fanout_executor() -> ThreadPoolExecutor:
+    """Get the shared thread pool used for fan-out queries."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=FANOUT_MAX_WORKERS, thread_name_prefix='fanout')
+    return _executor
+
+
+def fan_out(tasks: Dict[str, Callable[[], Any]],
+            timeout: float = FANOUT_TIMEOUT_SECONDS) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Run independent callables concurrently and wait for all of them under one deadline.
+
+    Each callable runs inside the caller's Flask app context. Tasks must not
+    call fan_out themselves, since nested calls share the same bounded pool.
+
+    Args:
+        tasks: Mapping of task name to a zero-argument callable.
+        timeout: Seconds to wait for the whole group before giving up.
+
+    Returns:
+        tuple: (results, errors) keyed by task name. A task appears in exactly one of them.
+    """
+    app = current_app._get_current_object() if has_app_context() else None
+
+    def in_context(fn: Callable[[], Any]) -> Callable[[], Any]:
+        if app is None:
+            return fn
+
+        def run():
+            with app.app_context():
+                return fn()
+        return run
+
+    executor = get_fanout_executor()
+    futures = {executor.submit(in_context(fn)): name for name, fn in tasks.items()}
+    done, pending = wait(futures, timeout=timeout)
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for future in done:
+        name = futures[future]
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            logger.warning(f"Fan-out task {name} failed: {e}")
+            errors[name] = str(e)
+    for future in pending:
+        name = futures[future]
+        future.cancel()
+        logger.warning(f"Fan-out task {name} timed out after {timeout}s")
+        errors[name] = f"Timed out after {timeout}s"
+
+    return results, errors
@@ -1,3 +1,15 @@
+import binascii
+import os
+import tempfile
+
+from utils.image_utils import IMAGE_HEADER_BYTES, IMAGE_MAX_PIXELS, inspect_image_header
+
+# Largest file accepted for upload to Supabase Storage
+STORAGE_UPLOAD_MAX_BYTES = int(os.environ.get('STORAGE_UPLOAD_MAX_BYTES', str(10 * 1024 * 1024)))
+# Bytes copied or decoded at a time while spooling an upload to disk
+STORAGE_UPLOAD_CHUNK_BYTES = int(os.environ.get('STORAGE_UPLOAD_CHUNK_BYTES', str(256 * 1024)))
+
+
 def allowed_file(filename: str) -> bool:
   """
   Checks if a file's extension is allowed.
@@ -12,3 +24,108 @@ def allowed_file(filename: str) -> bool:
   ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
   return '.' in filename and \
          filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+
+def check_image_upload(file, max_pixels: int = IMAGE_MAX_PIXELS) -> str | None:
+  """
+  Checks an uploaded image by its content rather than its name: the magic
+  bytes must match a supported format and the declared dimensions must be
+  within max_pixels. Only the header is read; the stream is left where it was.
+
+  Args:
+      file (FileStorage): The file object from Flask's request.files.
+      max_pixels (int): Largest width * height accepted (decompression bomb guard).
+
+  Returns:
+      str | None: None if the image is acceptable, otherwise the reason it isn't.
+  """
+  stream = file.stream
+  position = stream.tell()
+  try:
+    header = stream.read(IMAGE_HEADER_BYTES)
+    stream.seek(position)
+    _, error = inspect_image_header(header, source=stream, max_pixels=max_pixels)
+    return error
+  except Exception as e:
+    return f"Could not read image: {e}"
+  finally:
+    stream.seek(position)
+
+def spool_stream(stream, max_bytes: int = STORAGE_UPLOAD_MAX_BYTES,
+                 chunk_bytes: int = STORAGE_UPLOAD_CHUNK_BYTES, digest=None, target=None) -> tuple:
+  """
+  Copies a readable stream into an anonymous temporary file (or target), chunk by chunk.
+
+  Memory use is bounded by chunk_bytes however large the stream is.
+
+  Args:
+      stream: A binary file-like object (e.g. FileStorage.stream).
+      max_bytes (int): Maximum number of bytes accepted.
+      chunk_bytes (int): Bytes read per chunk.
+      digest: Optional hashlib object updated with every chunk.
+      target: Optional binary file to write into instead of a new temporary file.
+
+  Returns:
+      tuple: (temp_file, size) on success, (None, error_message) when the
+      stream is larger than max_bytes. The caller closes temp_file.
+  """
+  spooled = target if target is not None else tempfile.TemporaryFile()
+  size = 0
+  while True:
+    chunk = stream.read(chunk_bytes)
+    if not chunk:
+      break
+    size += len(chunk)
+    if size > max_bytes:
+      spooled.close()
+      return None, f"File exceeds maximum upload size of {max_bytes} bytes"
+    if digest is not None:
+      digest.update(chunk)
+    spooled.write(chunk)
+  spooled.seek(0)
+  return spooled, size
+
+
+def spool_base64(encoded: str, offset: int = 0, max_bytes: int = STORAGE_UPLOAD_MAX_BYTES,
+                 chunk_bytes: int = STORAGE_UPLOAD_CHUNK_BYTES, digest=None) -> tuple:
+  """
+  Decodes base64 text into an anonymous temporary file, chunk by chunk.
+
+  Only one decoded chunk is held in memory at a time, instead of the whole
+  decoded file next to the base64 string.
+
+  Args:
+      encoded (str): Base64 data.
+      offset (int): Index where the base64 data starts (e.g. after a data URL prefix).
+      max_bytes (int): Maximum decoded size accepted.
+      chunk_bytes (int): Decoded bytes per chunk.
+      digest: Optional hashlib object updated with the decoded bytes.
+
+  Returns:
+      tuple: (temp_file, size) on success, (None, error_message) on failure.
+  """
+  if any(c in encoded for c in ' \r\n\t'):
+    # Chunk boundaries must fall on 4-character groups
+    encoded, offset = ''.join(encoded[offset:].split()), 0
+  if (len(encoded) - offset) // 4 * 3 > max_bytes + 2:
+    return None, f"File exceeds maximum upload size of {max_bytes} bytes"
+
+  step = max(4, chunk_bytes // 3 * 4)
+  spooled = tempfile.TemporaryFile()
+  size = 0
+  try:
+    for start in range(offset, len(encoded), step):
+      decoded = binascii.a2b_base64(encoded[start:start + step])
+      size += len(decoded)
+      if digest is not None:
+        digest.update(decoded)
+      spooled.write(decoded)
+  except (binascii.Error, ValueError) as e:
+    spooled.close()
+    return None, f"Failed to decode base64 data: {e}"
+  if size > max_bytes:
+    spooled.close()
+    return None, f"File exceeds maximum upload size of {max_bytes} bytes"
+  spooled.seek(0)
+  return spooled, size
@@ -0,0 +1,248 @@
+import os
+import threading
+import time
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Worker processes per app process; 0 runs image jobs inline on the request thread
+IMAGE_POOL_WORKERS = int(os.environ.get('IMAGE_POOL_WORKERS', str(min(2, os.cpu_count() or 1))))
+# Jobs allowed to wait for a worker on top of the ones running
+IMAGE_POOL_MAX_PENDING = int(os.environ.get('IMAGE_POOL_MAX_PENDING', '8'))
+# How long a request waits for a free slot before the job is rejected
+IMAGE_POOL_QUEUE_WAIT_SECONDS = float(os.environ.get('IMAGE_POOL_QUEUE_WAIT_SECONDS', '2'))
+# How long a request waits for its job once submitted
+IMAGE_JOB_TIMEOUT_SECONDS = float(os.environ.get('IMAGE_JOB_TIMEOUT_SECONDS', '15'))
+
+# Recent job latencies kept for percentiles
+LATENCY_WINDOW = 500
+
+
+class ImagePoolFullError(Exception):
+    """Raised when every image worker slot stays busy for the whole queue wait."""
+
+
+class ImageJobTimeoutError(Exception):
+    """Raised when an image job does not finish within its timeout."""
+
+
+def _preload():
+    """Run in each worker so the first job doesn't pay for importing Pillow."""
+    import utils.image_utils  # noqa: F401
+
+
+class ImageWorkerPool:
+    """
+    Bounded process pool for CPU-bound image work.
+
+    Pillow work in request threads holds the GIL long enough to stall other
+    requests on the same worker, so jobs run in separate processes instead.
+    At most workers + max_pending jobs are in flight; callers beyond that wait
+    up to queue_wait_seconds for a slot and then get ImagePoolFullError, so a
+    burst of uploads sheds load instead of queueing without limit.
+
+    A job that times out keeps its slot until its worker finishes or dies.
+    On a timeout the pool is recycled: new jobs go to fresh processes, and
+    the old pool's processes are terminated once every other job on it has
+    had job_timeout_seconds to finish, which frees the stuck slots.
+    """
+
+    def __init__(self, workers: int = IMAGE_POOL_WORKERS, max_pending: int = IMAGE_POOL_MAX_PENDING,
+                 queue_wait_seconds: float = IMAGE_POOL_QUEUE_WAIT_SECONDS,
+                 job_timeout_seconds: float = IMAGE_JOB_TIMEOUT_SECONDS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_wait_seconds = queue_wait_seconds
+        self.job_timeout_seconds = job_timeout_seconds
+        self._slots = threading.BoundedSemaphore(max(1, workers) + max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._futures: Dict[Future, ProcessPoolExecutor] = {}
+        self._latencies_ms = deque(maxlen=LATENCY_WINDOW)
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'timed_out': 0,
+            'inline': 0,
+            'pool_restarts': 0,
+            'pool_recycles': 0,
+            'workers_killed': 0,
+            'peak_in_flight': 0
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # The app process runs background threads (cache refreshes, upload
+                    # workers, sweepers) even under sync gunicorn workers, and forking
+                    # a threaded process can deadlock the child, so never fork from here
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                    if context.get_start_method() == 'forkserver':
+                        context.set_forkserver_preload(['utils.image_utils'])
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                         initializer=_preload)
+        return self._executor
+
+    def _reset_executor(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self._stats['pool_restarts'] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _recycle(self, executor: ProcessPoolExecutor):
+        """Stop sending jobs to a pool with a stuck job and retire it in the background."""
+        with self._lock:
+            if self._executor is not executor:
+                return  # Already recycled by another timed-out job
+            self._executor = None
+            self._stats['pool_recycles'] += 1
+        threading.Thread(target=self._retire, args=(executor,), daemon=True, name='image-pool-retire').start()
+
+    def _retire(self, executor: ProcessPoolExecutor):
+        # shutdown() drops the executor's process table, so take it first
+        processes = list((getattr(executor, '_processes', None) or {}).values())
+        executor.shutdown(wait=False)
+        with self._lock:
+            futures = [future for future, owner in self._futures.items() if owner is executor]
+        # Jobs still running after this have outlived their callers' timeouts too
+        _, not_done = wait(futures, timeout=self.job_timeout_seconds)
+        if not not_done:
+            return
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        with self._lock:
+            self._stats['workers_killed'] += len(processes)
+        logger.warning(f"Terminated {len(processes)} image workers holding {len(not_done)} stuck jobs")
+
+    def _release(self, future: Future, started: float):
+        with self._lock:
+            self._futures.pop(future, None)
+            self._in_flight -= 1
+            self._latencies_ms.append((time.perf_counter() - started) * 1000)
+        self._slots.release()
+
+    def run(self, fn: Callable[..., Any], *args, timeout: Optional[float] = None) -> Any:
+        """
+        Run fn(*args) in a worker process and return its result.
+
+        fn and its arguments must be picklable (a module-level function).
+
+        Raises:
+            ImagePoolFullError: No slot freed up within queue_wait_seconds.
+            ImageJobTimeoutError: The job did not finish within the timeout.
+        """
+        if self.workers <= 0:
+            with self._lock:
+                self._stats['inline'] += 1
+            return fn(*args)
+
+        if not self._slots.acquire(timeout=self.queue_wait_seconds):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise ImagePoolFullError(f"Image workers busy ({self.workers} running, {self.max_pending} queued)")
+
+        started = time.perf_counter()
+        with self._lock:
+            self._in_flight += 1
+            self._stats['submitted'] += 1
+            self._stats['peak_in_flight'] = max(self._stats['peak_in_flight'], self._in_flight)
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._release(None, started)
+            self._reset_executor(executor)
+            logger.warning(f"Image pool unavailable, running job inline: {e}")
+            with self._lock:
+                self._stats['inline'] += 1
+            return fn(*args)
+        with self._lock:
+            self._futures[future] = executor
+        future.add_done_callback(lambda done: self._release(done, started))
+
+        timeout = self.job_timeout_seconds if timeout is None else timeout
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self._stats['timed_out'] += 1
+            # A job that never started just leaves the queue; a running one may be hung
+            if not future.cancel():
+                self._recycle(executor)
+            raise ImageJobTimeoutError(f"Image processing timed out after {timeout}s")
+        except BrokenProcessPool as e:
+            # A worker died mid-job (e.g. killed for memory); start a fresh pool next time
+            self._reset_executor(executor)
+            with self._lock:
+                self._stats['failed'] += 1
+            raise RuntimeError(f"Image worker crashed: {e}")
+        except Exception:
+            with self._lock:
+                self._stats['failed'] += 1
+            raise
+
+        with self._lock:
+            self._stats['completed'] += 1
+        return result
+
+    def get_stats(self) -> dict:
+        """Get queue depth, throughput counters and job latency percentiles."""
+        with self._lock:
+            stats = dict(self._stats)
+            in_flight = self._in_flight
+            latencies = sorted(self._latencies_ms)
+
+        def percentile(fraction: float) -> float:
+            if not latencies:
+                return 0
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))], 2)
+
+        stats.update({
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'in_flight': in_flight,
+            'queue_depth': max(0, in_flight - self.workers),
+            'utilization_percent': round(in_flight / (max(1, self.workers) + self.max_pending) * 100, 2),
+            'latency_ms': {
+                'samples': len(latencies),
+                'avg': round(sum(latencies) / len(latencies), 2) if latencies else 0,
+                'p50': percentile(0.50),
+                'p95': percentile(0.95),
+                'p99': percentile(0.99),
+                'max': round(latencies[-1], 2) if latencies else 0
+            }
+        })
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: Optional[ImageWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_image_pool() -> ImageWorkerPool:
+    """Get the shared image worker pool for this process."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ImageWorkerPool()
+    return _pool
@@ -1,80 +1,605 @@
 import base64
+import binascii
+import hashlib
 import io
-from PIL import Image
+import threading
+import time
 import os
+from PIL import Image, features
 
-def compress_image(image_data: str, max_size: tuple = (800, 600), quality: int = 85) -> str:
+from utils.image_pool import ImagePoolFullError, get_image_pool
+
+# Formats accepted from clients, keyed by their leading magic bytes
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+
+# Bytes read from the start of an image to find its format and dimensions.
+# JPEG dimensions sit after any EXIF/ICC segments, which are almost always within this.
+IMAGE_HEADER_BYTES = int(os.environ.get('IMAGE_HEADER_BYTES', str(64 * 1024)))
+# Decompression bomb guard: images declaring more pixels than this are rejected
+# before decoding. 50 MP covers current phone sensors (48 MP).
+IMAGE_MAX_PIXELS = int(os.environ.get('IMAGE_MAX_PIXELS', str(50_000_000)))
+# Backstop for any path that opens images without inspect_image_header
+Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+
+# JPEG draft mode lets the decoder scale by 1/2, 1/4 or 1/8 while decoding.
+# Draft to at least this multiple of the target size so the final LANCZOS
+# resample still has enough pixels to produce a sharp result.
+JPEG_DRAFT_REDUCING_GAP = float(os.environ.get('JPEG_DRAFT_REDUCING_GAP', '2.0'))
+
+# Renditions stored for each detection image: (name, max (width, height), JPEG-equivalent quality).
+# History cards show medium; the detail page shows full, which keeps the previous 800x600.
+IMAGE_VARIANTS = (
+    ('medium', (400, 300), 80),
+    ('full', (800, 600), 85),
+)
+
+# Output encodings. quality_offset is added to the (JPEG-scale) quality passed in
+# so each format lands at roughly the same visual quality; AVIF and WebP reach
+# it at lower settings. scripts/benchmark_image_formats.py reports the result.
+OUTPUT_FORMATS = {
+    'JPEG': {'mime_type': 'image/jpeg', 'extension': '.jpg', 'quality_offset': 0},
+    'WEBP': {'mime_type': 'image/webp', 'extension': '.webp', 'quality_offset': -5},
+    'AVIF': {'mime_type': 'image/avif', 'extension': '.avif', 'quality_offset': -25},
+}
+# Format for stored images. Only set it to WEBP or AVIF if every client that
+# displays history images can decode that format.
+IMAGE_OUTPUT_FORMAT = os.environ.get('IMAGE_OUTPUT_FORMAT', 'JPEG').upper()
+
+_stats_lock = threading.Lock()
+_pipeline_stats = {
+    'processed': 0,
+    'failed': 0,
+    'input_bytes': 0,
+    'output_bytes': 0,
+    'total_ms': 0.0
+}
+
+
+def decode_image_payload(image_data: str) -> bytes:
+    """
+    Decode a base64 string or data URL into raw image bytes.
+
+    The data URL prefix is skipped with a memoryview slice instead of
+    split(','), so the payload is copied once (to ASCII bytes) rather than twice.
+    """
+    raw = image_data.encode('ascii') if isinstance(image_data, str) else bytes(image_data)
+    start = 0
+    if raw.startswith(b'data:'):
+        start = raw.index(b',') + 1
+    return binascii.a2b_base64(memoryview(raw)[start:])
+
+
+def sniff_image_format(header: bytes) -> str | None:
+    """Identify an image format from its first bytes, or None if unsupported."""
+    for signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+
+def decode_image_header(image_data: str, header_bytes: int = IMAGE_HEADER_BYTES) -> bytes:
+    """
+    Decode only the first header_bytes of a base64 string or data URL.
+
+    Used to inspect an image without decoding the whole payload.
+    """
+    raw = image_data.encode('ascii') if isinstance(image_data, str) else bytes(image_data)
+    start = raw.index(b',') + 1 if raw.startswith(b'data:') else 0
+    chars = -(-header_bytes // 3) * 4
+    # Line breaks don't count towards the 4-character groups, so drop them first
+    head = raw[start:start + chars + chars // 64 + 4].translate(None, b' \t\r\n')[:chars]
+    return binascii.a2b_base64(head[:len(head) - len(head) % 4])
+
+
+def _jpeg_dimensions(header: bytes) -> tuple | None:
+    """Walk JPEG segments to the start-of-frame marker holding the dimensions."""
+    offset = 2
+    while offset + 4 <= len(header):
+        if header[offset] != 0xFF:
+            return None
+        marker = header[offset + 1]
+        if marker == 0xFF:  # Fill byte
+            offset += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:  # Standalone markers
+            offset += 2
+            continue
+        # SOF0-SOF15, except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if offset + 9 > len(header):
+                return None
+            height = int.from_bytes(header[offset + 5:offset + 7], 'big')
+            width = int.from_bytes(header[offset + 7:offset + 9], 'big')
+            return width, height
+        offset += 2 + int.from_bytes(header[offset + 2:offset + 4], 'big')
+    return None
+
+
+def parse_image_header(header: bytes) -> dict | None:
+    """
+    Read the format and declared dimensions from an image's first bytes.
+
+    Returns:
+        dict | None: {'format', 'width', 'height'}, None for an unsupported
+        format. width and height are None when they aren't within header.
+    """
+    image_format = sniff_image_format(header[:16])
+    if image_format is None:
+        return None
+
+    size = None
+    if image_format == 'JPEG':
+        size = _jpeg_dimensions(header)
+    elif image_format == 'PNG' and len(header) >= 24 and header[12:16] == b'IHDR':
+        size = int.from_bytes(header[16:20], 'big'), int.from_bytes(header[20:24], 'big')
+    elif image_format == 'GIF' and len(header) >= 10:
+        size = int.from_bytes(header[6:8], 'little'), int.from_bytes(header[8:10], 'little')
+    elif image_format == 'WEBP' and len(header) >= 30:
+        chunk = header[12:16]
+        if chunk == b'VP8 ':
+            size = (int.from_bytes(header[26:28], 'little') & 0x3FFF,
+                    int.from_bytes(header[28:30], 'little') & 0x3FFF)
+        elif chunk == b'VP8L':
+            bits = int.from_bytes(header[21:25], 'little')
+            size = (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        elif chunk == b'VP8X':
+            size = int.from_bytes(header[24:27], 'little') + 1, int.from_bytes(header[27:30], 'little') + 1
+
+    width, height = size or (None, None)
+    return {'format': image_format, 'width': width, 'height': height}
+
+
+def inspect_image_header(header: bytes, source=None,
+                         max_pixels: int = IMAGE_MAX_PIXELS) -> tuple[dict | None, str | None]:
+    """
+    Check an image's format and declared size without decoding any pixels.
+
+    Args:
+        header: The first bytes of the image (IMAGE_HEADER_BYTES is enough in practice)
+        source: Optional full image (bytes or a seekable file) for Pillow to read
+            the size from when it isn't within header; Pillow only parses headers on open
+        max_pixels: Largest width * height accepted (decompression bomb guard)
+
+    Returns:
+        tuple: ({'format', 'width', 'height', 'pixels'}, None), or (None, error_message)
+        for unsupported formats, unreadable or zero dimensions, and images over max_pixels.
+    """
+    info = parse_image_header(header)
+    if info is None:
+        return None, "Unsupported or unrecognised image format"
+
+    if info['width'] is None and source is not None:
+        try:
+            with Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source) as image:
+                info['width'], info['height'] = image.size
+        except Image.DecompressionBombError as e:
+            return None, str(e)
+        except Exception:
+            pass
+    if not info['width'] or not info['height']:
+        return None, "Could not read image dimensions"
+
+    info['pixels'] = info['width'] * info['height']
+    if info['pixels'] > max_pixels:
+        return None, (f"Image is {info['width']}x{info['height']} ({info['pixels']} pixels), "
+                      f"over the {max_pixels} pixel limit")
+    return info, None
+
+
+def supported_output_formats() -> list:
+    """Output formats this Pillow build can encode, best compression first."""
+    available = []
+    for image_format, feature in (('AVIF', 'avif'), ('WEBP', 'webp')):
+        try:
+            if features.check(feature):
+                available.append(image_format)
+        except ValueError:
+            # Pillow older than 11.2 doesn't know the avif feature
+            pass
+    available.append('JPEG')
+    return available
+
+
+def stored_output_format(configured: str = IMAGE_OUTPUT_FORMAT) -> str:
+    """
+    The format stored images are encoded in: IMAGE_OUTPUT_FORMAT if this build
+    can encode it, JPEG otherwise.
+
+    Deliberately not negotiated per request: stored renditions are shared
+    through their URLs (and deduplicated by content), so they must be readable
+    by every client, not just the one that uploaded them.
+    """
+    return configured if configured in supported_output_formats() else 'JPEG'
+
+
+def _encode(image: Image.Image, output_format: str, quality: int) -> bytes:
+    """Encode an RGB/L image in one of OUTPUT_FORMATS at a JPEG-equivalent quality."""
+    quality = max(1, min(100, quality + OUTPUT_FORMATS[output_format]['quality_offset']))
+    buffer = io.BytesIO()
+    if output_format == 'WEBP':
+        image.save(buffer, format='WEBP', quality=quality, method=4)
+    elif output_format == 'AVIF':
+        image.save(buffer, format='AVIF', quality=quality, speed=8)
+    else:
+        image.save(buffer, format='JPEG', quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _to_rgb(image: Image.Image) -> Image.Image:
+    """Flatten transparency onto white and convert to a mode every output format accepts."""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # Create white background
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode == 'P':
+            image = image.convert('RGBA')
+        background.paste(image, mask=image.split()[-1] if image.mode in ('RGBA', 'LA') else None)
+        return background
+    if image.mode not in ('RGB', 'L'):
+        return image.convert('RGB')
+    return image
+
+
+def _record_stats(result: dict | None):
+    with _stats_lock:
+        if result is None:
+            _pipeline_stats['failed'] += 1
+            return
+        _pipeline_stats['processed'] += 1
+        _pipeline_stats['input_bytes'] += result['input_bytes']
+        _pipeline_stats['output_bytes'] += result['output_bytes']
+        _pipeline_stats['total_ms'] += result['timings_ms']['total']
+
+
+def get_pipeline_stats() -> dict:
+    """Get cumulative image pipeline statistics for monitoring."""
+    with _stats_lock:
+        stats = dict(_pipeline_stats)
+    processed = stats['processed']
+    stats['avg_ms'] = round(stats['total_ms'] / processed, 2) if processed else 0
+    stats['compression_ratio'] = round(stats['output_bytes'] / stats['input_bytes'], 3) if stats['input_bytes'] else 0
+    return stats
+
+
+def _open_for_resize(image_bytes: bytes, source_format: str, max_size: tuple, use_draft: bool) -> tuple:
+    """
+    Open and fully decode an image that will be shrunk to fit max_size.
+
+    Large JPEGs are decoded at reduced scale (draft mode), at no less than
+    JPEG_DRAFT_REDUCING_GAP times the final size.
+
+    Returns:
+        tuple: (image, original_size)
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    original_size = image.size
+    if use_draft and source_format == 'JPEG' and (original_size[0] > max_size[0] or original_size[1] > max_size[1]):
+        # Size the draft from the aspect-preserving target, not the bounding box,
+        # so portrait photos are reduced as much as landscape ones
+        scale = min(max_size[0] / original_size[0], max_size[1] / original_size[1]) * JPEG_DRAFT_REDUCING_GAP
+        image.draft(None, (int(original_size[0] * scale), int(original_size[1] * scale)))
+    image.load()  # Decode now; raises on truncated or corrupt data
+    return image, original_size
+
+
+def _process_image_job(image_data: str, max_size: tuple, quality: int, use_draft: bool,
+                       output_format: str = 'JPEG') -> dict:
+    """
+    The CPU-bound part of process_image. Runs in an image worker process, so it
+    returns the encoded bytes only and raises on failure.
+    """
+    started = time.perf_counter()
+    timings = {}
+    try:
+        image_bytes = decode_image_payload(image_data)
+    except (ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid base64 image data: {e}")
+    timings['decode'] = (time.perf_counter() - started) * 1000
+
+    header_info, header_error = inspect_image_header(image_bytes[:IMAGE_HEADER_BYTES], source=image_bytes)
+    if header_error:
+        raise ValueError(header_error)
+    source_format = header_info['format']
+
+    stage = time.perf_counter()
+    image, original_size = _open_for_resize(image_bytes, source_format, max_size, use_draft)
+    decoded_size = image.size
+    timings['open'] = (time.perf_counter() - stage) * 1000
+
+    stage = time.perf_counter()
+    image = _to_rgb(image)
+    if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
+        image.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=None)
+    timings['resize'] = (time.perf_counter() - stage) * 1000
+
+    stage = time.perf_counter()
+    output_bytes = _encode(image, output_format, quality)
+    timings['encode'] = (time.perf_counter() - stage) * 1000
+    timings['total'] = (time.perf_counter() - started) * 1000
+
+    return {
+        'bytes': output_bytes,
+        'format': output_format,
+        'mime_type': OUTPUT_FORMATS[output_format]['mime_type'],
+        'extension': OUTPUT_FORMATS[output_format]['extension'],
+        'source_format': source_format,
+        'width': image.size[0],
+        'height': image.size[1],
+        'original_width': original_size[0],
+        'original_height': original_size[1],
+        'decoded_width': decoded_size[0],
+        'decoded_height': decoded_size[1],
+        'input_bytes': len(image_bytes),
+        'output_bytes': len(output_bytes),
+        'timings_ms': timings
+    }
+
+
+def _reject_bad_header(image_data: str):
+    """
+    Raise ValueError for payloads whose header is already disqualifying, before
+    a worker slot is taken or the full payload decoded. Headers that don't
+    show the dimensions are left to the worker, which has the whole image.
+    """
+    try:
+        header = decode_image_header(image_data)
+    except (ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid base64 image data: {e}")
+    info = parse_image_header(header)
+    if info is None or info['width'] is not None:
+        _, error = inspect_image_header(header)
+        if error:
+            raise ValueError(error)
+
+
+def process_image(image_data: str, max_size: tuple = (800, 600), quality: int = 85,
+                  use_draft: bool = True, offload: bool = True,
+                  output_format: str = 'JPEG') -> tuple[dict | None, str | None]:
+    """
+    Decode, validate, convert, resize and re-encode an image in a single pass.
+
+    Large JPEGs are decoded at reduced scale (draft mode) close to the target
+    size, then resampled with LANCZOS, so a 12 MP photo is never fully decoded.
+    The work runs in the shared image worker pool (utils.image_pool) so it
+    doesn't hold the GIL on the request thread.
+
+    Args:
+        image_data: Base64 encoded image string or data URL
+        max_size: Maximum dimensions (width, height)
+        quality: JPEG-equivalent quality (1-100), adjusted per output format
+        use_draft: Allow reduced-scale JPEG decoding (disable to benchmark full decodes)
+        offload: Run in the image worker pool instead of the calling thread
+        output_format: One of OUTPUT_FORMATS (see stored_output_format)
+
+    Returns:
+        tuple: (result, error_message). result holds the encoded image as 'data'
+        (base64) and 'bytes', plus 'format', 'mime_type', 'extension', 'width', 'height',
+        'original_width', 'original_height', 'decoded_width', 'decoded_height'
+        (size after draft decoding), 'input_bytes', 'output_bytes' and
+        per-stage 'timings_ms' ('wait' is time spent queued for a worker).
+
+    Raises:
+        ImagePoolFullError: The worker pool stayed full; callers should shed
+        load (e.g. respond 503) rather than retry immediately.
+    """
+    started = time.perf_counter()
+    try:
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        _reject_bad_header(image_data)
+        if offload:
+            result = get_image_pool().run(_process_image_job, image_data, max_size, quality, use_draft, output_format)
+        else:
+            result = _process_image_job(image_data, max_size, quality, use_draft, output_format)
+    except ImagePoolFullError:
+        _record_stats(None)
+        raise
+    except Exception as e:
+        _record_stats(None)
+        return None, str(e)
+
+    result['data'] = base64.b64encode(result['bytes']).decode('ascii')
+    timings = result['timings_ms']
+    elapsed = (time.perf_counter() - started) * 1000
+    if offload:
+        timings['wait'] = max(0.0, elapsed - timings['total'])
+    timings['total'] = elapsed
+    result['timings_ms'] = {name: round(value, 2) for name, value in timings.items()}
+    _record_stats(result)
+    return result, None
+
+
+def variant_set_key(content_hash: str, variants: tuple = IMAGE_VARIANTS, output_format: str = 'JPEG') -> str:
+    """
+    Deterministic id for one image rendered with one set of variant specs.
+
+    Changing IMAGE_VARIANTS or the output format yields new keys, so stale
+    renditions are never reused.
+    """
+    spec = ';'.join(f"{name}:{size[0]}x{size[1]}:q{quality}" for name, size, quality in variants)
+    if output_format != 'JPEG':
+        # JPEG keys predate output formats; keep them stable
+        spec += f";{output_format}"
+    return hashlib.sha256(f"{content_hash}|{spec}".encode('ascii')).hexdigest()
+
+
+def _process_variants_job(image_data: str, variants: tuple, use_draft: bool, output_format: str = 'JPEG') -> dict:
+    """
+    The CPU-bound part of process_image_variants, run in an image worker process.
+
+    The source is decoded once, at draft scale for the largest variant, and
+    each smaller variant is resampled from the next larger one.
+    """
+    started = time.perf_counter()
+    timings = {}
+    try:
+        image_bytes = decode_image_payload(image_data)
+    except (ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid base64 image data: {e}")
+    content_hash = hashlib.sha256(image_bytes).hexdigest()
+    timings['decode'] = (time.perf_counter() - started) * 1000
+
+    header_info, header_error = inspect_image_header(image_bytes[:IMAGE_HEADER_BYTES], source=image_bytes)
+    if header_error:
+        raise ValueError(header_error)
+    source_format = header_info['format']
+
+    # Largest variant first, so each one can be resampled from the previous
+    variants = sorted(variants, key=lambda variant: variant[1][0] * variant[1][1], reverse=True)
+
+    stage = time.perf_counter()
+    image, original_size = _open_for_resize(image_bytes, source_format, variants[0][1], use_draft)
+    timings['open'] = (time.perf_counter() - stage) * 1000
+
+    stage = time.perf_counter()
+    image = _to_rgb(image)
+    rendered = {}
+    previous = None
+    output_total = 0
+    for name, max_size, quality in variants:
+        if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
+            # In place: the larger variant has already been encoded
+            image.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=None)
+        elif previous is not None:
+            # Source already fits; reuse the larger variant's encoding instead of re-encoding
+            rendered[name] = previous
+            continue
+        encoded = _encode(image, output_format, quality)
+        rendered[name] = {
+            'bytes': encoded,
+            'width': image.size[0],
+            'height': image.size[1],
+            'output_bytes': len(encoded)
+        }
+        previous = rendered[name]
+        output_total += len(encoded)
+    timings['variants'] = (time.perf_counter() - stage) * 1000
+    timings['total'] = (time.perf_counter() - started) * 1000
+
+    return {
+        'content_hash': content_hash,
+        'format': output_format,
+        'mime_type': OUTPUT_FORMATS[output_format]['mime_type'],
+        'extension': OUTPUT_FORMATS[output_format]['extension'],
+        'source_format': source_format,
+        'original_width': original_size[0],
+        'original_height': original_size[1],
+        'input_bytes': len(image_bytes),
+        'output_bytes': output_total,
+        'variants': rendered,
+        'timings_ms': timings
+    }
+
+
+def process_image_variants(image_data: str, variants: tuple = IMAGE_VARIANTS, use_draft: bool = True,
+                           offload: bool = True, output_format: str = 'JPEG') -> tuple[dict | None, str | None]:
+    """
+    Render every size in variants (medium and full by default) from one decode.
+
+    Args:
+        image_data: Base64 encoded image string or data URL
+        variants: (name, (max_width, max_height), jpeg_equivalent_quality) tuples
+        use_draft: Allow reduced-scale JPEG decoding
+        offload: Run in the image worker pool instead of the calling thread
+        output_format: One of OUTPUT_FORMATS (see stored_output_format)
+
+    Returns:
+        tuple: (result, error_message). result holds 'variants' keyed by name,
+        each with encoded 'bytes', 'width', 'height' and 'output_bytes', plus
+        'content_hash' (SHA-256 of the source bytes), 'variant_key' (see
+        variant_set_key), 'format', 'mime_type', 'extension', 'source_format', 'original_width', 'original_height',
+        'input_bytes', 'output_bytes' and 'timings_ms'.
+
+    Raises:
+        ImagePoolFullError: The worker pool stayed full.
+    """
+    started = time.perf_counter()
+    try:
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        _reject_bad_header(image_data)
+        if offload:
+            result = get_image_pool().run(_process_variants_job, image_data, variants, use_draft, output_format)
+        else:
+            result = _process_variants_job(image_data, variants, use_draft, output_format)
+    except ImagePoolFullError:
+        _record_stats(None)
+        raise
+    except Exception as e:
+        _record_stats(None)
+        return None, str(e)
+
+    result['variant_key'] = variant_set_key(result['content_hash'], variants, output_format)
+    timings = result['timings_ms']
+    elapsed = (time.perf_counter() - started) * 1000
+    if offload:
+        timings['wait'] = max(0.0, elapsed - timings['total'])
+    timings['total'] = elapsed
+    result['timings_ms'] = {name: round(value, 2) for name, value in timings.items()}
+    _record_stats(result)
+    return result, None
+
+
+def compress_image(image_data: str, max_size: tuple = (800, 600), quality: int = 85,
+                   output_format: str = 'JPEG') -> str:
     """
     Compress an image from base64 string and return compressed base64 string.
-    
+
     Args:
         image_data: Base64 encoded image string
         max_size: Maximum dimensions (width, height)
-        quality: JPEG quality (1-100)
-    
+        quality: JPEG-equivalent quality (1-100)
+        output_format: One of OUTPUT_FORMATS
+
     Returns:
         Compressed base64 encoded image string
     """
     try:
-        # Remove data URL prefix if present
-        if image_data.startswith('data:image'):
-            image_data = image_data.split(',')[1]
-        
-        # Decode base64
-        image_bytes = base64.b64decode(image_data)
-        
-        # Open image with PIL
-        image = Image.open(io.BytesIO(image_bytes))
-        
-        # Convert to RGB if necessary (for JPEG compression)
-        if image.mode in ('RGBA', 'LA', 'P'):
-            # Create white background
-            background = Image.new('RGB', image.size, (255, 255, 255))
-            if image.mode == 'P':
-                image = image.convert('RGBA')
-            background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-            image = background
-        
-        # Resize if larger than max_size
-        if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
-            image.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        # Compress and convert to base64
-        buffer = io.BytesIO()
-        image.save(buffer, format='JPEG', quality=quality, optimize=True)
-        compressed_bytes = buffer.getvalue()
-        
-        # Encode back to base64
-        compressed_base64 = base64.b64encode(compressed_bytes).decode('utf-8')
-        
-        return compressed_base64
-        
-    except Exception as e:
-        print(f"Error compressing image: {e}")
+        result, error = process_image(image_data, max_size=max_size, quality=quality, output_format=output_format)
+    except ImagePoolFullError as e:
+        result, error = None, str(e)
+    if error:
+        print(f"Error compressing image: {error}")
         return image_data  # Return original if compression fails
+    return result['data']
 
-def validate_image_data(image_data: str) -> bool:
+def validate_image_data(image_data: str, max_pixels: int = IMAGE_MAX_PIXELS, deep: bool = False) -> bool:
     """
     Validate if the image data is a valid base64 encoded image.
-    
+
+    Only the header is decoded: the format must be supported and the declared
+    dimensions within max_pixels. Pass deep=True to also decode the whole
+    payload and run Pillow's verify() (catches truncated or corrupt data).
+
     Args:
         image_data: Base64 encoded image string
-    
+        max_pixels: Largest width * height accepted
+        deep: Also verify the full image
+
     Returns:
         True if valid, False otherwise
     """
     try:
-        # Remove data URL prefix if present
-        if image_data.startswith('data:image'):
-            image_data = image_data.split(',')[1]
-        
-        # Try to decode base64
-        image_bytes = base64.b64decode(image_data)
-        
-        # Try to open with PIL to validate it's an image
-        image = Image.open(io.BytesIO(image_bytes))
-        image.verify()  # Verify the image
-        
+        header = decode_image_header(image_data)
+        parsed = parse_image_header(header)
+        source = None
+        if deep or (parsed is not None and parsed['width'] is None):
+            # Dimensions beyond the header window: let Pillow find them in the full payload
+            source = decode_image_payload(image_data)
+        _, error = inspect_image_header(header, source=source, max_pixels=max_pixels)
+        if error:
+            raise ValueError(error)
+
+        if deep:
+            image = Image.open(io.BytesIO(source))
+            image.verify()  # Verify the image
+
         return True
     except Exception as e:
         print(f"Invalid image data: {e}")
@@ -83,24 +608,19 @@ def validate_image_data(image_data: str) -> bool:
 def get_image_info(image_data: str) -> dict:
     """
     Get information about an image from base64 data.
-    
+
     Args:
         image_data: Base64 encoded image string
-    
+
     Returns:
         Dictionary with image information
     """
     try:
-        # Remove data URL prefix if present
-        if image_data.startswith('data:image'):
-            image_data = image_data.split(',')[1]
-        
-        # Decode base64
-        image_bytes = base64.b64decode(image_data)
-        
+        image_bytes = decode_image_payload(image_data)
+
         # Open image with PIL
         image = Image.open(io.BytesIO(image_bytes))
-        
+
         return {
             'format': image.format,
             'mode': image.mode,
@@ -110,4 +630,4 @@ def get_image_info(image_data: str) -> dict:
         }
     except Exception as e:
         print(f"Error getting image info: {e}")
-        return {} 
\ No newline at end of file
+        return {}
@@ -0,0 +1,176 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A compute function returns (value, cacheable). Uncacheable results, such as
+# error responses, are handed to the caller but never stored.
+Compute = Callable[[], Tuple[Any, bool]]
+
+
+class StaleWhileRevalidateCache:
+    """
+    Thread-safe cache that keeps serving an entry while it is being refreshed.
+
+    An entry is fresh for fresh_seconds, then stale for another stale_seconds.
+    A stale read returns the old value immediately and refreshes it on a
+    background thread. Only one computation per key runs at a time: concurrent
+    misses wait for the first caller's result instead of recomputing it.
+
+    Each purge bumps a generation counter; a computation that started before
+    the purge is handed to its caller but not stored, so a slow refresh can't
+    put pre-purge data back into the cache.
+    """
+
+    def __init__(self, fresh_seconds: float = 30, stale_seconds: float = 300,
+                 max_entries: int = 500, max_workers: int = 2, wait_seconds: float = 30):
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.max_workers = max_workers
+        self.wait_seconds = wait_seconds
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'refresh_failures': 0,
+                       'discarded': 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='swr-refresh')
+            return self._executor
+
+    def _store(self, key: Hashable, value: Any, generation: int) -> bool:
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def _finish(self, key: Hashable):
+        with self._lock:
+            event = self._inflight.pop(key, None)
+        if event:
+            event.set()
+
+    def _refresh(self, key: Hashable, refresh: Compute, generation: int):
+        try:
+            value, cacheable = refresh()
+            if cacheable:
+                stored = self._store(key, value, generation)
+                with self._lock:
+                    self._stats['refreshes' if stored else 'discarded'] += 1
+            else:
+                with self._lock:
+                    self._stats['refresh_failures'] += 1
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {e}")
+            with self._lock:
+                self._stats['refresh_failures'] += 1
+        finally:
+            self._finish(key)
+
+    def get(self, key: Hashable, compute: Compute, refresh: Optional[Compute] = None) -> Tuple[Any, str, float]:
+        """
+        Get a value, computing or refreshing it as needed.
+
+        Args:
+            key: Cache key.
+            compute: Produces the value in the caller's thread on a miss.
+            refresh: Produces the value on a background thread for stale
+                entries; must not depend on the caller's context. Defaults to compute.
+
+        Returns:
+            tuple: (value, state, age_seconds) where state is 'HIT', 'STALE' or 'MISS'.
+        """
+        start_refresh = False
+        leader = False
+        with self._lock:
+            generation = self._generation
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                age = time.monotonic() - stored_at
+                if age < self.fresh_seconds:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value, 'HIT', age
+                if age < self.fresh_seconds + self.stale_seconds:
+                    self._stats['stale_hits'] += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = threading.Event()
+                        start_refresh = True
+                else:
+                    del self._entries[key]
+                    entry = None
+
+            if entry is None:
+                self._stats['misses'] += 1
+                event = self._inflight.get(key)
+                if event is None:
+                    self._inflight[key] = threading.Event()
+                    leader = True
+
+        if entry is not None:
+            if start_refresh:
+                try:
+                    self._get_executor().submit(self._refresh, key, refresh or compute, generation)
+                except Exception as e:
+                    logger.warning(f"Could not schedule refresh of {key}: {e}")
+                    self._finish(key)
+            return value, 'STALE', age
+
+        if not leader:
+            # Someone else is computing this key; use their result if it lands in time
+            event.wait(self.wait_seconds)
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                return entry[1], 'HIT', time.monotonic() - entry[0]
+            value, _ = compute()
+            return value, 'MISS', 0.0
+
+        try:
+            value, cacheable = compute()
+            if cacheable and not self._store(key, value, generation):
+                with self._lock:
+                    self._stats['discarded'] += 1
+            return value, 'MISS', 0.0
+        finally:
+            self._finish(key)
+
+    def purge(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Remove every entry, or those whose key matches predicate. Returns the number removed."""
+        with self._lock:
+            self._generation += 1
+            if predicate is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get cache statistics for monitoring."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'fresh_seconds': self.fresh_seconds,
+                'stale_seconds': self.stale_seconds,
+                'refreshing': len(self._inflight),
+                'generation': self._generation,
+                **self._stats
+            }
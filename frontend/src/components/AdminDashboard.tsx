@@ -25,6 +25,7 @@ import {
   CreditCard,
   FileText,
   BarChart,
+  Calendar,
   X
 } from 'lucide-react';
 import { useToast } from '@/hooks/use-toast';
@@ -69,6 +70,11 @@ interface UserDetails {
   detection_history: any[];
   meal_plans: any[];
   usage_tracking: any[];
+  summary?: {
+    counts: Record<string, number>;
+    last_activity: Record<string, string | null>;
+  };
+  missing_sections?: string[];
 }
 
 const AdminDashboard: React.FC = () => {
@@ -226,6 +232,10 @@ const AdminDashboard: React.FC = () => {
     }
   };
 
+  // Totals come from the summary counts; the lists only hold the most recent records
+  const userRecordCount = (user: UserDetails, type: 'detections' | 'meal_plans' | 'usage', recent: any[]) =>
+    user.summary?.counts?.[type] ?? recent.length;
+
   // Export subscriptions
   const exportSubscriptions = async () => {
     try {
@@ -833,6 +843,12 @@ const AdminDashboard: React.FC = () => {
             
             {selectedUser && (
               <div className="space-y-6">
+                {selectedUser.missing_sections && selectedUser.missing_sections.length > 0 && (
+                  <p className="text-sm text-amber-600">
+                    Some sections could not be loaded and may be incomplete: {selectedUser.missing_sections.join(', ')}
+                  </p>
+                )}
+
                 {/* Profile Information */}
                 <Card>
                   <CardHeader>
@@ -910,7 +926,7 @@ const AdminDashboard: React.FC = () => {
                   <CardHeader>
                     <CardTitle className="flex items-center gap-2">
                       <FileText className="h-5 w-5" />
-                      Detection History ({selectedUser.detection_history.length})
+                      Detection History ({userRecordCount(selectedUser, 'detections', selectedUser.detection_history)})
                     </CardTitle>
                   </CardHeader>
                   <CardContent>
@@ -929,12 +945,38 @@ const AdminDashboard: React.FC = () => {
                   </CardContent>
                 </Card>
 
+                {/* Meal Plans */}
+                <Card>
+                  <CardHeader>
+                    <CardTitle className="flex items-center gap-2">
+                      <Calendar className="h-5 w-5" />
+                      Meal Plans ({userRecordCount(selectedUser, 'meal_plans', selectedUser.meal_plans)})
+                    </CardTitle>
+                  </CardHeader>
+                  <CardContent>
+                    <div className="space-y-2 max-h-40 overflow-y-auto">
+                      {selectedUser.meal_plans.map((plan, index) => (
+                        <div key={index} className="flex items-center justify-between p-2 bg-gray-50 rounded">
+                          <div>
+                            <p className="text-sm font-medium">{plan.name || 'Untitled plan'}</p>
+                            <p className="text-xs text-gray-500">
+                              {plan.start_date ? new Date(plan.start_date).toLocaleDateString() : 'N/A'}
+                              {' - '}
+                              {plan.end_date ? new Date(plan.end_date).toLocaleDateString() : 'N/A'}
+                            </p>
+                          </div>
+                        </div>
+                      ))}
+                    </div>
+                  </CardContent>
+                </Card>
+
                 {/* Usage Tracking */}
                 <Card>
                   <CardHeader>
                     <CardTitle className="flex items-center gap-2">
                       <BarChart className="h-5 w-5" />
-                      Usage Tracking
+                      Usage Tracking ({userRecordCount(selectedUser, 'usage', selectedUser.usage_tracking)})
                     </CardTitle>
                   </CardHeader>
                   <CardContent>
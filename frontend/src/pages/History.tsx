@@ -36,6 +36,8 @@ interface SharedRecipe {
   input_data?: string // Image URL for food detection entries
   image_data?: string // Base64 encoded compressed image (fallback)
   image_url?: string // Supabase Storage URL for the uploaded image
+  image_variants?: Record<"medium" | "full", { url: string; width: number; height: number }> // Resized copies in Supabase Storage
+  image_upload_status?: "pending" | "uploaded" | "failed" // Set while the image is uploaded after the detection is saved
 }
 
 export default function HistoryPage() {
@@ -404,6 +406,7 @@ function HistoryCard({ item, onCardClick, onViewDetails, onDeleteRecord, isDelet
 
   // Check if this is a food detection with an image
   const hasImage = item.recipe_type === "food_detection" && (
+    item.image_variants?.medium?.url ||
     item.image_url || 
     (item.input_data && item.input_data.startsWith('http')) || 
     (item.image_data && item.image_data.startsWith('data:image'))
@@ -411,7 +414,11 @@ function HistoryCard({ item, onCardClick, onViewDetails, onDeleteRecord, isDelet
 
   // Get image source - prioritize Supabase Storage URL, then fallback to base64/input_data
   const getImageSrc = () => {
-    // First priority: Supabase Storage URL
+    // First priority: medium variant, sized for this card
+    if (item.image_variants?.medium?.url) {
+      return item.image_variants.medium.url
+    }
+    // Then the full-size Supabase Storage URL
     if (item.image_url) {
       return item.image_url
     }